@@ -0,0 +1,256 @@
+import fnmatch
+import logging
+import os
+import threading
+from time import monotonic, process_time, time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# 没有客户端时的心跳采样周期（秒），只需满足历史记录
+DEFAULT_IDLE_INTERVAL = 30.0
+# 最后一次请求后多少秒视为无人查看
+DEFAULT_IDLE_AFTER = 60.0
+# 指标剧烈变化后保持快速采样的秒数（滞回），之后逐步放慢
+DEFAULT_HOLD = 10.0
+# 每次平稳的采样后周期放大的倍数
+BACKOFF_FACTOR = 1.5
+# 两次采样之间变化超过阈值即视为剧烈变化，序列名支持通配符
+DEFAULT_THRESHOLDS = {
+    'cpu.total': 10.0,
+    'cpu.temperature': 3.0,
+    'memory.percent': 5.0,
+    'gpu.*.load': 15.0,
+    'gpu.*.temperature': 3.0,
+}
+# 客户端通过 ActivityFile 通知主进程时，主进程检查的周期（秒）
+ACTIVITY_POLL = 0.5
+# worker更新活动文件的最小间隔（秒）
+ACTIVITY_TOUCH_INTERVAL = 1.0
+
+MODES = ('fast', 'active', 'idle')
+
+
+def parse_thresholds(text: Optional[str]) -> Dict[str, float]:
+    """解析 'cpu.total=10,gpu.*.load=15' 形式的阈值配置，未配置时使用默认阈值"""
+    if not text:
+        return dict(DEFAULT_THRESHOLDS)
+    thresholds = {}
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        try:
+            if name.strip() and float(value) > 0:
+                thresholds[name.strip()] = float(value)
+        except ValueError:
+            logging.warning(f"忽略无效的变化阈值配置: {item}")
+    return thresholds
+
+
+class ActivityFile:
+    """多进程模式下worker通过共享目录中的文件修改时间告知主进程有客户端在访问"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._touched = 0.0
+
+    def touch(self):
+        now = monotonic()
+        if now - self._touched < ACTIVITY_TOUCH_INTERVAL:
+            return
+        self._touched = now
+        try:
+            with open(self.path, 'a'):
+                os.utime(self.path)
+        except OSError:
+            pass
+
+    def age(self) -> Optional[float]:
+        """距最后一次活动的秒数，从未有活动时返回None"""
+        try:
+            return max(0.0, time() - os.stat(self.path).st_mtime)
+        except OSError:
+            return None
+
+
+class AdaptiveRate:
+    """根据客户端活动与指标变化调整采样周期
+
+    - idle：最近 idle_after 秒内没有面板/API请求、也没有SSE连接，按 idle_interval 心跳采样；
+    - active：有客户端时，平稳状态下周期在 base_interval 与 max_interval 之间逐步放慢；
+    - fast：任一监控序列两次采样间的变化超过阈值时立即切到 min_interval，
+      保持 hold 秒没有新的剧烈变化后再按 BACKOFF_FACTOR 逐步放慢（滞回，避免来回切换）。
+    客户端连接时立即唤醒采样线程，不等待当前的长周期结束。各模式下本进程的CPU占用
+    分别累计，用于核对降频节省的开销。
+    """
+
+    def __init__(self, sampler, base_interval: float, min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, idle_interval: float = DEFAULT_IDLE_INTERVAL,
+                 idle_after: float = DEFAULT_IDLE_AFTER, hold: float = DEFAULT_HOLD,
+                 thresholds: Optional[Dict[str, float]] = None,
+                 has_subscribers: Optional[Callable[[], bool]] = None,
+                 activity_file: Optional[ActivityFile] = None,
+                 on_idle: Optional[Callable[[bool], None]] = None):
+        self.sampler = sampler
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval or max(0.25, base_interval / 2), base_interval)
+        self.max_interval = max(max_interval or base_interval * 2, base_interval)
+        self.idle_interval = max(idle_interval, self.max_interval)
+        self.idle_after = idle_after
+        self.hold = hold
+        self.thresholds = dict(DEFAULT_THRESHOLDS if thresholds is None else thresholds)
+        self.has_subscribers = has_subscribers
+        self.activity_file = activity_file
+        self.on_idle = on_idle
+
+        self.mode = 'active'
+        self.interval = base_interval
+        self._last_client = monotonic()
+        self._last_change: Optional[float] = None
+        self._last_values: Dict[str, float] = {}
+        self._matches: Dict[str, Optional[float]] = {}
+        self._change: Optional[Tuple[str, float]] = None
+        self._lock = threading.Lock()
+        self._mode_started = (monotonic(), process_time())
+        self._usage = {mode: {'seconds': 0.0, 'cpu_seconds': 0.0, 'samples': 0, 'entered': 0} for mode in MODES}
+        self._usage['active']['entered'] = 1
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- 客户端活动 ----
+
+    def client_active(self):
+        """有面板或API请求时调用；空闲状态下立即恢复正常采样"""
+        self._last_client = monotonic()
+        if self.mode == 'idle':
+            with self._lock:
+                if self.mode == 'idle':
+                    logging.info("有客户端访问，恢复正常采样")
+                    self._switch('active', self.base_interval)
+
+    def _clients_active(self, now: float) -> bool:
+        if self.has_subscribers is not None and self.has_subscribers():
+            self._last_client = now
+            return True
+        if self.activity_file is not None:
+            age = self.activity_file.age()
+            if age is not None and age < now - self._last_client:
+                self._last_client = now - age
+        return now - self._last_client < self.idle_after
+
+    def _watch(self):
+        while not self._stop.wait(ACTIVITY_POLL):
+            if self.mode == 'idle' and self._clients_active(monotonic()):
+                self.client_active()
+
+    def start(self):
+        """多进程模式下检查worker的活动文件，空闲时发现客户端即唤醒采样"""
+        if self.activity_file is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name='adaptive-watch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- 指标变化 ----
+
+    def _threshold(self, name: str) -> Optional[float]:
+        if name not in self._matches:
+            threshold = self.thresholds.get(name)
+            if threshold is None:
+                for pattern, value in self.thresholds.items():
+                    if fnmatch.fnmatchcase(name, pattern):
+                        threshold = value
+                        break
+            self._matches[name] = threshold
+        return self._matches[name]
+
+    def _score(self, points: Iterable[Tuple[str, float]]) -> Tuple[float, Optional[Tuple[str, float]]]:
+        """各监控序列变化量与阈值之比的最大值（>=1 表示剧烈变化）及变化最大的序列"""
+        score = 0.0
+        change = None
+        last = self._last_values
+        for name, value in points:
+            threshold = self._threshold(name)
+            if threshold is None:
+                continue
+            previous = last.get(name)
+            last[name] = value
+            if previous is not None:
+                ratio = abs(value - previous) / threshold
+                if ratio > score:
+                    score = ratio
+                    change = (name, round(value - previous, 2))
+        return score, change
+
+    def observe(self, points: Iterable[Tuple[str, float]]):
+        """每个快照之后调用，决定下一次采样的周期"""
+        now = monotonic()
+        score, change = self._score(points)
+        with self._lock:
+            self._usage[self.mode]['samples'] += 1
+            if score >= 1:
+                self._last_change = now
+                self._change = change
+                if self.mode != 'fast':
+                    logging.info(f"指标剧烈变化（{self._change[0]} {self._change[1]:+}），加快采样")
+                self._switch('fast', self.min_interval)
+                return
+            if self._last_change is not None and now - self._last_change < self.hold:
+                return
+            idle = not self._clients_active(now)
+            ceiling = self.idle_interval if idle else self.max_interval
+            mode = 'idle' if idle else 'active'
+            interval = min(ceiling, self.interval * BACKOFF_FACTOR)
+            if not idle and self.mode == 'idle':
+                interval = self.base_interval
+            if mode != self.mode and mode == 'idle':
+                logging.info(f"{self.idle_after:.0f} 秒内无客户端访问，采样周期放慢至 {self.idle_interval:.0f} 秒")
+            self._switch(mode, interval)
+
+    def _switch(self, mode: str, interval: float):
+        if mode != self.mode:
+            now, cpu = monotonic(), process_time()
+            started, started_cpu = self._mode_started
+            usage = self._usage[self.mode]
+            usage['seconds'] += now - started
+            usage['cpu_seconds'] += cpu - started_cpu
+            self._usage[mode]['entered'] += 1
+            self._mode_started = (now, cpu)
+            was_idle, self.mode = self.mode == 'idle', mode
+            if self.on_idle is not None and was_idle != (mode == 'idle'):
+                try:
+                    self.on_idle(mode == 'idle')
+                except Exception as e:
+                    logging.error(f"切换空闲状态失败: {str(e)}")
+        if interval != self.interval:
+            self.interval = interval
+            self.sampler.set_interval(interval)
+
+    def status(self) -> Dict[str, Any]:
+        """当前模式、周期与各模式下本进程的平均CPU占用"""
+        now, cpu = monotonic(), process_time()
+        with self._lock:
+            started, started_cpu = self._mode_started
+            modes = {}
+            for mode, usage in self._usage.items():
+                seconds, cpu_seconds = usage['seconds'], usage['cpu_seconds']
+                if mode == self.mode:
+                    seconds += now - started
+                    cpu_seconds += cpu - started_cpu
+                modes[mode] = {
+                    'seconds': round(seconds, 1),
+                    'cpu_seconds': round(cpu_seconds, 3),
+                    'cpu_percent': round(cpu_seconds / seconds * 100, 3) if seconds > 0 else None,
+                    'samples': usage['samples'],
+                    'entered': usage['entered'],
+                }
+            return {
+                'mode': self.mode,
+                'interval': round(self.interval, 3),
+                'base_interval': self.base_interval,
+                'min_interval': self.min_interval,
+                'max_interval': self.max_interval,
+                'idle_interval': self.idle_interval,
+                'last_client': round(now - self._last_client, 1),
+                'last_change': dict(zip(('series', 'delta'), self._change)) if self._change else None,
+                'modes': modes,
+            }
@@ -0,0 +1,199 @@
+"""轻量Agent：在本机采集硬件信息，批量推送到中心节点（hub）
+
+用法:
+    python agent.py --hub http://hub-host:5000 --interval 5
+    python agent.py --hub http://127.0.0.1:5000 --name node-1   # 本机模拟多台主机
+"""
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import platform
+import socket
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from hardware_info import HardwareInfo
+from history import extract_series
+from sampler import Sampler, Snapshot
+
+DEFAULT_PUSH_INTERVAL = 5.0
+DEFAULT_BATCH = 3
+# 中心不可达时最多缓存多少个样本，超出后丢弃最旧的
+DEFAULT_BUFFER = 720
+PUSH_PATH = '/api/hub/push'
+
+
+class Pusher:
+    """把快照压缩成按列编码的样本，批量gzip后通过长连接推送
+
+    每 batch 个快照推送一次，推送在独立线程中进行，中心响应慢不影响采样；
+    推送失败时保留样本（最多 buffer 个），下次连同新样本一起重试。
+    每个样本带递增的序号，推送成功后只移除序号不超过已发送最后一个的样本：
+    推送期间缓冲区满、最旧的样本被挤出时，也不会误删尚未发送的新样本。
+    """
+
+    def __init__(self, hub_url: str, name: str, hardware_info: HardwareInfo, batch: int = DEFAULT_BATCH,
+                 buffer: int = DEFAULT_BUFFER, token: Optional[str] = None, timeout: float = 10):
+        parts = urlsplit(hub_url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc or parts.path
+        self.path = (parts.path.rstrip('/') if parts.netloc else '') + PUSH_PATH
+        self.name = name
+        self.hardware_info = hardware_info
+        self.batch = max(1, batch)
+        self.token = token
+        self.timeout = timeout
+        # (序号, 时间戳, {序列名: 值})
+        self._pending: deque = deque(maxlen=buffer)
+        self._seq = 0
+        self._latest: Optional[Snapshot] = None
+        self._send_inventory = True
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.pushes = 0
+        self.failures = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='hub-pusher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            self._ready.wait()
+            self._ready.clear()
+            if self._stop.is_set():
+                break
+            if self.flush():
+                backoff = 1.0
+            else:
+                # 中心不可达时退避，样本继续在缓冲区中累积
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def add(self, snapshot: Snapshot):
+        """采样器监听器：缓存样本，攒够一批后推送"""
+        with self._lock:
+            self._seq += 1
+            self._pending.append((self._seq, snapshot.timestamp, dict(extract_series(snapshot.data))))
+            self._latest = snapshot
+            if len(self._pending) >= self.batch:
+                self._ready.set()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._connection = cls(self.netloc, timeout=self.timeout)
+        return self._connection
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def build(self, samples: List, latest: Optional[Snapshot]) -> Dict[str, Any]:
+        """按列编码：序列名只出现一次，每个样本为 [时间戳, 值...]"""
+        names = list(dict.fromkeys(name for _, values in samples for name in values))
+        payload: Dict[str, Any] = {
+            'host': self.name,
+            'series': names,
+            'samples': [[round(timestamp, 3)] + [values.get(name) for name in names] for timestamp, values in samples],
+        }
+        if latest is not None:
+            payload['latest'] = latest.data
+        if self._send_inventory:
+            payload['inventory'] = self.hardware_info.get_inventory()
+        return payload
+
+    def flush(self) -> bool:
+        with self._lock:
+            samples = list(self._pending)
+            latest = self._latest
+        if not samples:
+            return True
+        last_sent = samples[-1][0]
+        samples = [(timestamp, values) for _, timestamp, values in samples]
+        body = gzip.compress(json.dumps(self.build(samples, latest), separators=(',', ':'), default=str).encode('utf-8'), 5)
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+        }
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        # 长连接可能已被中心关闭，重连后再试一次
+        for attempt in range(2):
+            try:
+                connection = self._connect()
+                connection.request('POST', self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                reply = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self._close()
+                if response.status != 200:
+                    raise OSError(f"HTTP {response.status}: {reply[:200].decode('utf-8', errors='replace')}")
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self._close()
+                if attempt == 1:
+                    self.failures += 1
+                    logging.warning(f"推送到中心失败（已缓存 {len(samples)} 个样本）: {str(e)}")
+                    return False
+        try:
+            self._send_inventory = bool(json.loads(reply).get('need_inventory'))
+        except ValueError:
+            pass
+        with self._lock:
+            # 只移除已发送的样本，推送期间新加入的保留到下一批
+            while self._pending and self._pending[0][0] <= last_sent:
+                self._pending.popleft()
+        self.pushes += 1
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='硬件监控Agent，把本机数据推送到中心节点')
+    parser.add_argument('--hub', default=os.environ.get('MONITOR_HUB_URL'), required='MONITOR_HUB_URL' not in os.environ,
+                        help='中心节点地址，如 http://hub-host:5000')
+    parser.add_argument('--name', default=os.environ.get('MONITOR_AGENT_NAME') or platform.node() or socket.gethostname(),
+                        help='主机名，默认为本机hostname；本机运行多个Agent测试时需各不相同')
+    parser.add_argument('--interval', type=float, default=float(os.environ.get('MONITOR_INTERVAL', DEFAULT_PUSH_INTERVAL)),
+                        help='采样周期（秒）')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='每次推送包含的样本数')
+    parser.add_argument('--token', default=os.environ.get('MONITOR_HUB_TOKEN'), help='推送认证令牌')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    hardware_info = HardwareInfo(inventory_cache=os.environ.get('MONITOR_INVENTORY_CACHE'))
+    sampler = Sampler(hardware_info, interval=args.interval, recent=1)
+    pusher = Pusher(args.hub, args.name, hardware_info, batch=args.batch, token=args.token)
+    sampler.subscribe(pusher.add)
+    logging.info(f"Agent {args.name} 启动，每 {args.interval:g} 秒采样，每 {args.batch} 个样本推送到 {args.hub}")
+    pusher.start()
+    sampler.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop(timeout=5)
+        pusher.stop(timeout=5)
+        pusher.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+import fnmatch
+import json
+import logging
+import operator
+import queue
+import re
+import threading
+import urllib.request
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import instrumentation
+
+# 有多个实例的数据源：gpu.temperature 等价于 gpu.*.temperature，每块GPU单独告警
+MULTI_INSTANCE = ('gpu', 'disk')
+# 序列超过该秒数没有新数据（如卸载的磁盘）时自动解除告警
+DEFAULT_STALE_AFTER = 300
+DEFAULT_WEBHOOK_TIMEOUT = 5
+DEFAULT_WEBHOOK_QUEUE = 100
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+AGGREGATIONS = ('avg', 'min', 'max')
+UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+# [名称:] 序列 [聚合(窗口)] 比较符 阈值 [for 持续时间] [clear 解除阈值]
+RULE_RE = re.compile(
+    r'^\s*(?:(?P<name>[\w.\-]+)\s*:\s+)?'
+    r'(?P<selector>(?:[\w.*\-]|\[[^\]]*\])+)\s*'
+    r'(?:(?P<agg>[a-z]+)\((?P<window>[\d.]+[smh]?)\)\s*)?'
+    r'(?P<op>>=|<=|>|<)\s*(?P<threshold>-?[\d.]+)'
+    r'(?:\s+for\s+(?P<for_>[\d.]+[smh]?))?'
+    r'(?:\s+clear\s+(?P<clear>-?[\d.]+))?\s*$'
+)
+DURATION_RE = re.compile(r'^([\d.]+)([smh]?)$')
+
+
+class RuleError(ValueError):
+    """告警规则格式错误"""
+
+
+def parse_duration(text: str) -> float:
+    """解析 30s / 5m / 1h / 纯数字（秒）"""
+    match = DURATION_RE.match(text.strip())
+    if not match:
+        raise RuleError(f"无法解析时长: {text}")
+    try:
+        return float(match.group(1)) * UNITS[match.group(2)]
+    except ValueError:
+        raise RuleError(f"无法解析时长: {text}")
+
+
+def selector_pattern(selector: str) -> str:
+    """把规则中的选择器转换为序列名模式
+
+    disk[/data].percent -> disk./data.percent，gpu.temperature -> gpu.*.temperature
+    """
+    if '[' in selector:
+        return re.sub(r'\[([^\]]*)\]', r'.\1', selector)
+    parts = selector.split('.')
+    if len(parts) == 2 and parts[0] in MULTI_INSTANCE and '*' not in selector:
+        return f'{parts[0]}.*.{parts[1]}'
+    return selector
+
+
+class Rule:
+    """解析后的一条告警规则，解析只在加载时进行一次"""
+
+    def __init__(self, text: str):
+        match = RULE_RE.match(text)
+        if not match:
+            raise RuleError(f"无法解析告警规则: {text}")
+        self.text = text.strip()
+        self.expr = self.text if not match.group('name') else self.text.split(':', 1)[1].strip()
+        self.name = match.group('name') or self.expr
+        self.selector = match.group('selector')
+        self.pattern = selector_pattern(self.selector)
+        self.wildcard = any(c in self.pattern for c in '*?')
+        self.agg = match.group('agg')
+        if self.agg is not None and self.agg not in AGGREGATIONS:
+            raise RuleError(f"不支持的聚合函数 {self.agg}，可用: {', '.join(AGGREGATIONS)}")
+        self.window = parse_duration(match.group('window')) if match.group('window') else 0.0
+        self.op = match.group('op')
+        self.compare = OPERATORS[self.op]
+        try:
+            self.threshold = float(match.group('threshold'))
+            # 未指定clear时没有滞回，越过阈值即解除
+            self.clear = float(match.group('clear')) if match.group('clear') else self.threshold
+        except ValueError:
+            raise RuleError(f"阈值不是数字: {text}")
+        if self.clear != self.threshold and self.compare(self.clear, self.threshold):
+            raise RuleError(f"解除阈值应在告警阈值的另一侧（{self.op} {self.threshold:g}）: {text}")
+        self.duration = parse_duration(match.group('for_')) if match.group('for_') else 0.0
+
+    def matches(self, series: str) -> bool:
+        if self.wildcard:
+            return fnmatch.fnmatchcase(series, self.pattern)
+        return series == self.pattern
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'expr': self.expr,
+            'series': self.pattern,
+            'aggregation': self.agg,
+            'window': self.window or None,
+            'op': self.op,
+            'threshold': self.threshold,
+            'clear': self.clear,
+            'for': self.duration,
+        }
+
+
+class Instance:
+    """一条规则在一个序列上的状态：滑动窗口、待触发时间与是否告警中"""
+
+    __slots__ = ('rule', 'series', 'points', 'total', 'extremes', 'value',
+                 'pending_since', 'firing', 'since', 'last_seen', 'better')
+
+    def __init__(self, rule: Rule, series: str):
+        self.rule = rule
+        self.series = series
+        self.points: deque = deque()
+        self.total = 0.0
+        # min/max用单调队列，窗口滑动时均摊O(1)
+        self.extremes: deque = deque()
+        self.better = operator.le if rule.agg == 'max' else operator.ge
+        self.value: Optional[float] = None
+        self.pending_since: Optional[float] = None
+        self.firing = False
+        self.since: Optional[float] = None
+        self.last_seen = 0.0
+
+    def update(self, timestamp: float, value: float) -> float:
+        rule = self.rule
+        self.last_seen = timestamp
+        if rule.agg is None:
+            self.value = value
+            return value
+        cutoff = timestamp - rule.window
+        if rule.agg == 'avg':
+            points = self.points
+            points.append((timestamp, value))
+            self.total += value
+            while points[0][0] < cutoff:
+                self.total -= points.popleft()[1]
+            self.value = self.total / len(points)
+        else:
+            extremes = self.extremes
+            better = self.better
+            while extremes and better(extremes[-1][1], value):
+                extremes.pop()
+            extremes.append((timestamp, value))
+            while extremes[0][0] < cutoff:
+                extremes.popleft()
+            self.value = extremes[0][1]
+        return self.value
+
+    def step(self, timestamp: float, value: float) -> Optional[str]:
+        """推进状态机，返回 'firing'/'resolved' 或 None"""
+        rule = self.rule
+        if self.firing:
+            # 滞回：回到解除阈值另一侧才解除
+            if not rule.compare(value, rule.clear):
+                self.firing = False
+                self.pending_since = None
+                return 'resolved'
+            return None
+        if rule.compare(value, rule.threshold):
+            if self.pending_since is None:
+                self.pending_since = timestamp
+            if timestamp - self.pending_since >= rule.duration:
+                self.firing = True
+                self.since = timestamp
+                return 'firing'
+        else:
+            self.pending_since = None
+        return None
+
+    def event(self, state: str, timestamp: float) -> Dict[str, Any]:
+        rule = self.rule
+        return {
+            'rule': rule.name,
+            'expr': rule.expr,
+            'series': self.series,
+            'state': state,
+            'value': round(self.value, 3) if self.value is not None else None,
+            'threshold': rule.threshold,
+            'since': self.since,
+            'timestamp': timestamp,
+        }
+
+
+class AlertEngine:
+    """进程内告警规则引擎
+
+    每次采集后用本次的序列值增量求值：序列名到规则的匹配结果按名称缓存，每个点只
+    查一次字典，只对匹配的规则推进状态机；聚合窗口用滑动累加/单调队列维护，不回读历史。
+    状态变化（firing/resolved）发送给所有 sink。
+    """
+
+    def __init__(self, rules: Iterable[Rule] = (), stale_after: float = DEFAULT_STALE_AFTER):
+        self.rules: List[Rule] = list(rules)
+        self.stale_after = stale_after
+        self._sinks: List[Callable[[Dict[str, Any]], None]] = []
+        # 序列名 -> 匹配该序列的规则实例，新序列第一次出现时匹配一次
+        self._routes: Dict[str, List[Instance]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self.evaluations = 0
+
+    def add_sink(self, sink: Callable[[Dict[str, Any]], None]):
+        self._sinks.append(sink)
+
+    def _route(self, series: str) -> List[Instance]:
+        instances = self._routes[series] = [Instance(rule, series) for rule in self.rules if rule.matches(series)]
+        return instances
+
+    def evaluate(self, timestamp: float, points: Iterable[Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """用一次采集的 (序列名, 值) 求值，返回本次产生的状态变化"""
+        if not self.rules:
+            return []
+        started = monotonic()
+        events = []
+        routes = self._routes
+        last_seen = self._last_seen
+        evaluations = 0
+        with self._lock:
+            for series, value in points:
+                last_seen[series] = timestamp
+                instances = routes.get(series)
+                if instances is None:
+                    instances = self._route(series)
+                for instance in instances:
+                    state = instance.step(timestamp, instance.update(timestamp, value))
+                    if state is not None:
+                        events.append(instance.event(state, timestamp))
+                evaluations += len(instances)
+            self.evaluations += evaluations
+            if timestamp - self._last_sweep >= self.stale_after / 10:
+                self._last_sweep = timestamp
+                events.extend(self._sweep(timestamp))
+        instrumentation.observe('alerts', 'evaluate', monotonic() - started)
+        for event in events:
+            self._emit(event)
+        return events
+
+    def _sweep(self, timestamp: float) -> List[Dict[str, Any]]:
+        """清理长时间没有数据的序列，告警中的直接解除"""
+        events = []
+        for series, seen in list(self._last_seen.items()):
+            if timestamp - seen <= self.stale_after:
+                continue
+            del self._last_seen[series]
+            for instance in self._routes.pop(series, ()):
+                if instance.firing:
+                    event = instance.event('resolved', timestamp)
+                    event['reason'] = 'no data'
+                    events.append(event)
+        return events
+
+    def _instances(self) -> Iterable[Instance]:
+        for instances in self._routes.values():
+            yield from instances
+
+    def _emit(self, event: Dict[str, Any]):
+        for sink in self._sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                instrumentation.record_exception('alerts.sink')
+                logging.error(f"告警发送失败: {str(e)}")
+
+    def active(self) -> List[Dict[str, Any]]:
+        """当前告警中的实例"""
+        with self._lock:
+            firing = [instance for instance in self._instances() if instance.firing]
+            return [instance.event('firing', instance.last_seen) for instance in firing]
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """已越过阈值、还在等待持续时间的实例"""
+        with self._lock:
+            waiting = [instance for instance in self._instances()
+                       if not instance.firing and instance.pending_since is not None]
+            return [{**instance.event('pending', instance.last_seen), 'since': instance.pending_since}
+                    for instance in waiting]
+
+
+def parse_rules(text: str) -> List[Rule]:
+    """解析多条规则（换行或分号分隔，# 开头为注释），格式错误的规则记录日志后跳过"""
+    rules = []
+    for line in re.split(r'[\n;]', text or ''):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        try:
+            rules.append(Rule(line))
+        except RuleError as e:
+            logging.error(str(e))
+    return rules
+
+
+def load_rules(text: Optional[str] = None, path: Optional[str] = None) -> List[Rule]:
+    """合并环境变量中的规则与规则文件"""
+    sources = [text or '']
+    if path:
+        try:
+            with open(path, encoding='utf-8') as f:
+                sources.append(f.read())
+        except OSError as e:
+            logging.error(f"读取告警规则文件失败: {str(e)}")
+    return parse_rules('\n'.join(sources))
+
+
+def log_sink(event: Dict[str, Any]):
+    if event['state'] == 'firing':
+        logging.warning(f"告警触发 [{event['rule']}] {event['series']} = {event['value']}（阈值 {event['threshold']:g}）")
+    else:
+        logging.info(f"告警解除 [{event['rule']}] {event['series']} = {event['value']}")
+
+
+class WebhookSink:
+    """把告警事件以JSON POST到指定地址
+
+    发送在独立线程中进行，队列满时丢弃新事件，Webhook慢或不可达不影响采样。
+    """
+
+    def __init__(self, url: str, timeout: float = DEFAULT_WEBHOOK_TIMEOUT, queue_size: int = DEFAULT_WEBHOOK_QUEUE):
+        self.url = url
+        self.timeout = timeout
+        self.dropped = 0
+        self.failures = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+        self._thread.start()
+
+    def __call__(self, event: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            body = json.dumps(event, ensure_ascii=False, default=str).encode('utf-8')
+            request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+            except Exception as e:
+                self.failures += 1
+                instrumentation.record_exception('alerts.webhook')
+                logging.warning(f"告警Webhook发送失败: {str(e)}")
@@ -1,17 +1,251 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, Response, jsonify, request, g
 from hardware_info import HardwareInfo
+from scheduler import parse_intervals
+from sampler import Sampler, DEFAULT_INTERVAL, parse_seq
+from history import HistoryStore, DEFAULT_CAPACITY, extract_series
+from rollup import RollupStore
+from storage import SegmentStore
+from stream import Broadcaster
+from payload import PayloadCache
+from hub import Hub, PushError, decode_push
+from metrics import MetricsCache, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from alerts import AlertEngine, WebhookSink, load_rules, log_sink
+from adaptive import (AdaptiveRate, ActivityFile, parse_thresholds, DEFAULT_IDLE_INTERVAL, DEFAULT_IDLE_AFTER,
+                      DEFAULT_HOLD)
+from assets import AssetManifest, CACHE_CONTROL as ASSET_CACHE_CONTROL
+from process_collector import select_top
+from cgroup_collector import select_cgroups
+from hwmon import core_temperatures
+from shared_snapshot import (SharedSampler, SnapshotPublisher, PrimaryClient, INVENTORY_SLOT, PROCESSES_SLOT, CGROUPS_SLOT,
+                             DEFAULT_CAPACITY as SHARED_CAPACITY)
+import instrumentation
+from time import time, monotonic
+import functools
+import hashlib
+import threading
 import traceback
 import logging
+import atexit
+import copy
+import json
+import os
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 app = Flask(__name__, 
             static_folder='static',  # 显式指定静态文件夹
             template_folder='templates')  # 显式指定模板文件夹
-hardware_info = HardwareInfo()
+# 由 serve.py 以多进程方式启动时：primary 进程负责采集，把快照写入共享内存；
+# worker 进程只读取共享快照处理请求，不创建 HardwareInfo，也不做任何采集
+ROLE = os.environ.get('MONITOR_ROLE', '')
+IS_WORKER = ROLE == 'worker'
+SHARED_DIR = os.environ.get('MONITOR_SHARED_DIR')
+INTERVAL = float(os.environ.get('MONITOR_INTERVAL', DEFAULT_INTERVAL))
+
+if IS_WORKER:
+    hardware_info = None
+    sampler = SharedSampler(SHARED_DIR, interval=INTERVAL)
+    primary = PrimaryClient(SHARED_DIR)
+else:
+    hardware_info = HardwareInfo.from_env()
+    # 后台采样器，所有请求共享同一份快照
+    sampler = Sampler(hardware_info, interval=INTERVAL,
+                      intervals=parse_intervals(os.environ.get('MONITOR_COLLECTOR_INTERVALS')))
+    primary = None
+# 服务端指标历史，每个序列保存最近 MONITOR_HISTORY_SIZE 个采样点；多进程模式下只在primary中记录，
+# worker把 /api/history 转发给primary（各序列按需分配，worker中的空存储不占内存）
+history = HistoryStore(capacity=int(os.environ.get('MONITOR_HISTORY_SIZE', DEFAULT_CAPACITY)))
+# 多分辨率聚合（10秒/1分钟/15分钟），用于查看数小时到数天的趋势
+rollups = RollupStore(raw=history, raw_resolution=sampler.interval)
+
+# 设置 MONITOR_DATA_DIR 时把每个样本追加写入磁盘，进程重启后回放恢复趋势
+# 多进程模式下只由primary写入磁盘
+storage = None
+if os.environ.get('MONITOR_DATA_DIR') and not IS_WORKER:
+    storage = SegmentStore(
+        os.environ['MONITOR_DATA_DIR'],
+        max_age=float(os.environ.get('MONITOR_RETENTION_DAYS', 7)) * 86400,
+        max_bytes=int(os.environ.get('MONITOR_STORAGE_MAX_MB', 2048)) * 1024 * 1024,
+    )
+    atexit.register(storage.flush)
+# 重启后回放最近多少小时的磁盘数据
+REPLAY_HOURS = float(os.environ.get('MONITOR_REPLAY_HOURS', 6))
+# 回放在后台线程中进行，不阻塞采样线程；回放完成前的新样本暂存于此，完成后按顺序写入（之后为None）
+_replay_pending = [] if storage is not None else None
+_replay_lock = threading.Lock()
+
+def replay_storage():
+    """从磁盘回放历史到内存，必须在记录新样本之前完成，否则聚合层会丢弃较早的样本"""
+    started = time()
+    storage.replay(
+        lambda timestamp, points: (history.record_points(timestamp, points),
+                                   rollups.record_points(timestamp, points)),
+        since=started - REPLAY_HOURS * 3600,
+    )
+    logging.info(f"已从磁盘恢复历史数据，耗时 {time() - started:.1f} 秒")
+
+def store_points(timestamp, points):
+    history.record_points(timestamp, points)
+    rollups.record_points(timestamp, points)
+    if storage is not None:
+        storage.append(timestamp, points)
+
+def replay_in_background():
+    global _replay_pending
+    try:
+        replay_storage()
+    except Exception as e:
+        logging.error(f"回放历史数据失败: {str(e)}")
+    with _replay_lock:
+        pending, _replay_pending = _replay_pending, None
+        for timestamp, points in pending:
+            store_points(timestamp, points)
+
+def defer_points(timestamp, points):
+    """回放尚未完成时暂存样本，返回是否已暂存"""
+    if _replay_pending is None:
+        return False
+    with _replay_lock:
+        if _replay_pending is None:
+            return False
+        _replay_pending.append((timestamp, points))
+        return True
+
+def record_history(snapshot):
+    points = list(extract_series(snapshot.data))
+    if not IS_WORKER and not defer_points(snapshot.timestamp, points):
+        store_points(snapshot.timestamp, points)
+    # 告警与自适应采样不依赖历史，回放期间照常处理
+    alert_engine.evaluate(snapshot.timestamp, points)
+    if adaptive is not None:
+        adaptive.observe(points)
+
+sampler.subscribe(record_history)
+if storage is not None:
+    threading.Thread(target=replay_in_background, name='history-replay', daemon=True).start()
+
+# SSE推送，每个快照只编码一次后分发给所有订阅者
+broadcaster = Broadcaster(sampler)
+# 编码/压缩后的完整与增量响应体缓存
+payload_cache = PayloadCache()
+# 告警规则：MONITOR_ALERT_RULES（分号或换行分隔）与 MONITOR_ALERT_RULES_FILE，每次采集后增量求值
+alert_engine = AlertEngine(load_rules(os.environ.get('MONITOR_ALERT_RULES'), os.environ.get('MONITOR_ALERT_RULES_FILE')))
+# 状态变化通过SSE推送给面板显示为横幅；多进程模式下每个worker为自己的SSE客户端求值，
+# 日志与Webhook只由primary发送，避免重复
+alert_engine.add_sink(lambda event: broadcaster.publish_event('alert', event))
+if not IS_WORKER:
+    alert_engine.add_sink(log_sink)
+    if os.environ.get('MONITOR_ALERT_WEBHOOK'):
+        alert_engine.add_sink(WebhookSink(os.environ['MONITOR_ALERT_WEBHOOK']))
+    if alert_engine.rules:
+        logging.info(f"已加载 {len(alert_engine.rules)} 条告警规则")
+
+# 自适应采样（MONITOR_ADAPTIVE=1）：无人查看时按心跳周期采集，客户端连接或指标剧烈变化时加快
+ADAPTIVE = os.environ.get('MONITOR_ADAPTIVE', '').lower() in ('1', 'true', 'yes')
+# 这些请求不算作有人在查看（Prometheus抓取、自监控、Agent推送、静态资源）
+PASSIVE_PREFIXES = ('/metrics', '/api/self', '/api/hub/push', '/assets/', '/static/')
+adaptive = None
+activity_file = ActivityFile(os.path.join(SHARED_DIR, 'activity')) if ADAPTIVE and SHARED_DIR and ROLE else None
+if ADAPTIVE and IS_WORKER:
+    # worker上有SSE连接时，每收到一个快照就刷新一次活动时间
+    sampler.subscribe(lambda snapshot: activity_file.touch() if broadcaster.subscriber_count else None)
+elif ADAPTIVE:
+    _gpu_interval_ms = hardware_info.gpu_collector.interval_ms
+    adaptive = AdaptiveRate(
+        sampler, INTERVAL,
+        min_interval=float(os.environ.get('MONITOR_MIN_INTERVAL', 0)) or None,
+        max_interval=float(os.environ.get('MONITOR_MAX_INTERVAL', 0)) or None,
+        idle_interval=float(os.environ.get('MONITOR_IDLE_INTERVAL', DEFAULT_IDLE_INTERVAL)),
+        idle_after=float(os.environ.get('MONITOR_IDLE_AFTER', DEFAULT_IDLE_AFTER)),
+        hold=float(os.environ.get('MONITOR_ADAPTIVE_HOLD', DEFAULT_HOLD)),
+        thresholds=parse_thresholds(os.environ.get('MONITOR_ADAPTIVE_THRESHOLDS')),
+        has_subscribers=lambda: broadcaster.subscriber_count > 0,
+        activity_file=activity_file,
+        # 空闲时nvidia-smi也按心跳周期输出
+        on_idle=lambda idle: hardware_info.gpu_collector.set_interval(
+            int(adaptive.idle_interval * 1000) if idle else _gpu_interval_ms),
+    )
+    adaptive.start()
+
+def get_inventory():
+    """静态硬件清单，worker从共享内存读取primary发布的清单"""
+    if IS_WORKER:
+        return sampler.shared(INVENTORY_SLOT, {})
+    return hardware_info.get_inventory()
+
+def cached_inventory():
+    """已采集的硬件清单，尚未就绪时返回None，不阻塞"""
+    if IS_WORKER:
+        return sampler.shared(INVENTORY_SLOT)
+    return hardware_info.cached_inventory()
+
+# Prometheus文本，每个快照最多渲染一次；硬件清单就绪前不输出清单中的标签
+metrics_cache = MetricsCache(cached_inventory)
+
+# primary把快照、进程表、cgroup与硬件清单写入共享内存，供worker读取
+publisher = None
+if ROLE == 'primary':
+    publisher = SnapshotPublisher(SHARED_DIR, int(float(os.environ.get('MONITOR_SHARED_SIZE_MB', 0)) * 1024 * 1024)
+                                  or SHARED_CAPACITY)
+    _published = {}
+
+    def publish_shared(snapshot):
+        publisher.publish_snapshot(snapshot)
+        for slot, collector in ((PROCESSES_SLOT, hardware_info.process_collector),
+                                (CGROUPS_SLOT, hardware_info.cgroup_collector)):
+            latest = collector.latest()
+            if latest is not _published.get(slot):
+                _published[slot] = latest
+                publisher.publish(slot, latest)
+
+    sampler.subscribe(publish_shared)
+    # 硬件清单可能需要数秒，在后台线程中采集完成后发布一次
+    threading.Thread(target=lambda: publisher.publish(INVENTORY_SLOT, hardware_info.get_inventory()),
+                     name='inventory-publisher', daemon=True).start()
+
+def primary_only(view):
+    """依赖primary进程状态的接口（中心节点、CPU窗口统计等），在worker中转发给primary"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not IS_WORKER:
+            return view(*args, **kwargs)
+        headers = dict(request.headers)
+        headers['X-Forwarded-For'] = request.remote_addr or ''
+        try:
+            status, response_headers, body = primary.request(
+                request.method, request.full_path if request.query_string else request.path,
+                body=request.get_data(cache=False) if request.method == 'POST' else None,
+                headers=headers,
+            )
+        except (OSError, ValueError) as e:
+            logging.error(f"转发请求到主进程失败: {str(e)}")
+            return jsonify({'error': '主进程不可用'}), 502
+        return Response(body, status=status, headers=response_headers)
+    return wrapper
+
+# 设置 MONITOR_HUB=1 时作为中心节点，接收各主机Agent推送的数据；多进程模式下只在primary中接收
+hub = None
+if os.environ.get('MONITOR_HUB') and not IS_WORKER:
+    hub = Hub(
+        capacity=int(os.environ.get('MONITOR_HUB_HISTORY_SIZE', 720)),
+        stale_after=float(os.environ.get('MONITOR_HUB_STALE_AFTER', 30)),
+    )
+HUB_TOKEN = os.environ.get('MONITOR_HUB_TOKEN')
+# 首次采集完成前，请求最多等待的秒数
+FIRST_SNAPSHOT_TIMEOUT = 10
+
+# 静态资源按内容哈希生成URL，可长期缓存
+assets = AssetManifest(os.path.join(app.root_path, 'static'),
+                       cdn_fallback=os.environ.get('MONITOR_VENDOR_CDN', '').lower() in ('1', 'true', 'yes'))
+# 面板页面引用的静态资源，内容变化时重新生成页面框架
+DASHBOARD_ASSETS = ('css/dashboard.css', 'vendor/chart.min.js', 'js/dashboard.js')
+# 页面框架中初始数据的占位符，每次请求替换为最新快照
+INITIAL_DATA_MARKER = '__MONITOR_INITIAL_DATA__'
+_dashboard_shell = None
+_dashboard_shell_lock = threading.Lock()
 
 # 在创建app后，添加自定义函数
-app.jinja_env.globals.update(min=min)
+app.jinja_env.globals.update(min=min, asset_url=assets.url)
 
 # 全局辅助函数
 def convert_to_number(value):
@@ -35,20 +269,19 @@ def safe_division(numerator, denominator, default=0):
     except (ValueError, TypeError):
         return default
 
-def prepare_template_data(data):
-    """准备模板数据"""
+def prepare_template_data(data, inventory):
+    """准备模板数据，data为实时快照，inventory为静态硬件清单"""
     # 提取CPU信息
     cpu_info = data.get('cpu', {})
     cpu_usage = cpu_info.get('usage_per_core', [])
     
     # 提取内存信息
     memory = data.get('memory', {})
+    memory_inventory = inventory.get('memory', {})
     
     # 提取温度信息
     temps = data.get('temperatures', {})
-    cpu_temps = [(int(key.split(" ")[-1]), key, val.get('value', 0)) for key, val in temps.items() if 'core' in key.lower()]
-    cpu_temps.sort(key=lambda x: x[0])
-    cpu_temps = [{"name": x[1], "value": x[2]} for x in cpu_temps]
+    cpu_temps = [{"name": name, "value": value} for _, name, value in core_temperatures(temps)]
     # 处理内存数据
     mem_total = convert_to_number(memory.get('total', 0))
     mem_used = convert_to_number(memory.get('used', 0))
@@ -57,24 +290,32 @@ def prepare_template_data(data):
     # 准备基础数据
     template_data = {
         'cpu_percent': cpu_info.get('total_usage', 0),
-        'cpu_name': cpu_info.get('name', 'Unknown CPU'),
-        'cpu_cores': cpu_info.get('cores', 0),
+        'cpu_name': inventory.get('cpu', {}).get('name', 'Unknown CPU'),
+        'cpu_cores': inventory.get('cpu', {}).get('cores', 0),
         'cpu_usage_per_core': cpu_usage,
         'cpu_temps': cpu_temps,
         'mem_percent': mem_percent,
         'mem_total': mem_total,
         'mem_used': mem_used,
+        'memory': {**memory_inventory, **memory},
         'temperatures': temps,
-        'gpu_info': data.get('gpu', []),
+        # 快照数据在请求间共享，下面会写入显存使用率，因此先复制
+        'gpu_info': copy.deepcopy(data.get('gpu', [])),
         'disks': data.get('disk', []),
-        'system': data.get('system', {})
+        'system': {**inventory.get('system', {}), **data.get('system', {})}
     }
     
     # 计算GPU内存使用率 - 增加错误处理
     try:
-        gpu_info = data.get('gpu', [])
+        gpu_info = template_data['gpu_info']
         if gpu_info:
             logging.info(f"GPU信息: {len(gpu_info)}个GPU设备")
+        
+        # 补充清单中的GPU名称
+        gpu_names = {gpu.get('id'): gpu.get('name') for gpu in inventory.get('gpu', [])}
+        for gpu in gpu_info:
+            if isinstance(gpu, dict) and gpu.get('id') in gpu_names:
+                gpu['name'] = gpu_names[gpu['id']]
             
         for i, gpu in enumerate(gpu_info):
             if isinstance(gpu, dict) and 'memory' in gpu:
@@ -92,16 +333,76 @@ def prepare_template_data(data):
     
     return template_data
 
+def dashboard_layout(data, inventory):
+    """决定页面结构的部分：核心数、GPU、挂载点、硬件清单等，变化时才重新渲染页面框架"""
+    return (
+        len((data.get('cpu') or {}).get('usage_per_core') or []),
+        len(data.get('temperatures') or {}),
+        tuple(gpu.get('id') for gpu in data.get('gpu') or [] if isinstance(gpu, dict)),
+        tuple((disk.get('mountpoint'), disk.get('device'), disk.get('available'))
+              for disk in data.get('disk') or [] if isinstance(disk, dict)),
+        id(inventory),
+        sampler.interval,
+        tuple(assets.url(name) for name in DASHBOARD_ASSETS),
+    )
+
+def dashboard_shell(snapshot):
+    """面板页面框架（按页面结构缓存的HTML），返回 (前半部分, 后半部分, 哈希)
+
+    框架中的数值来自生成时的快照，页面加载时由内嵌的最新快照立即覆盖，
+    因此只有核心数、GPU、挂载点等结构变化时才需要重新渲染模板。
+    """
+    global _dashboard_shell
+    if IS_WORKER:
+        inventory = get_inventory()
+    else:
+        inventory = hardware_info.cached_inventory() or {}
+    layout = dashboard_layout(snapshot.data, inventory)
+    shell = _dashboard_shell
+    if shell is not None and shell[0] == layout:
+        return shell[1:]
+    with _dashboard_shell_lock:
+        template_data = prepare_template_data(snapshot.data, inventory)
+        html = render_template('dashboard.html', refresh_interval_ms=int(sampler.interval * 1000),
+                               initial_data=INITIAL_DATA_MARKER, **template_data).encode('utf-8')
+        prefix, suffix = html.split(INITIAL_DATA_MARKER.encode(), 1)
+        digest = hashlib.sha256(html).hexdigest()[:12]
+        _dashboard_shell = (layout, prefix, suffix, digest)
+    return prefix, suffix, digest
+
+def render_dashboard():
+    """缓存的页面框架 + 内嵌最新快照，不等待采集，也不重新渲染模板"""
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return "硬件信息采集中，请稍后刷新", 503
+    prefix, suffix, digest = dashboard_shell(snapshot)
+    etag = f'"{digest}-{snapshot.seq}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    else:
+        # JSON中的 < 只会出现在字符串里，转义后不会提前结束<script>
+        response = Response(prefix + snapshot.json.replace(b'<', b'\\u003c') + suffix, mimetype='text/html')
+    response.headers['ETag'] = etag
+    return response
+
+def current_snapshot():
+    """获取最新快照，首次采集尚未完成时等待"""
+    return sampler.latest() or sampler.wait(FIRST_SNAPSHOT_TIMEOUT)
+
+@app.before_request
+def ensure_sampler():
+    g.request_started = monotonic()
+    sampler.start()
+    if not request.path.startswith(PASSIVE_PREFIXES):
+        if adaptive is not None:
+            adaptive.client_active()
+        elif activity_file is not None:
+            activity_file.touch()
+
 @app.route('/')
 def index():
     try:
-        # 获取硬件信息并准备数据
-        data = hardware_info.get_all_info()
-        template_data = prepare_template_data(data)
-        
-        logging.info(f"主页加载 - CPU: {template_data['cpu_name']}, 核心数: {len(template_data['cpu_usage_per_core'])}")
-        
-        return render_template('dashboard.html', **template_data)
+        return render_dashboard()
     except Exception as e:
         logging.error(f"主页加载错误: {str(e)}")
         logging.error(traceback.format_exc())
@@ -109,25 +410,283 @@ def index():
 
 @app.route('/api/hardware_info')
 def api_hardware_info():
-    """提供硬件信息API接口"""
-    hw_info = hardware_info.get_all_info()  # 重命名变量
-    return jsonify(hw_info)
+    """提供硬件信息API接口
+
+    响应带有 ETag（快照序号）与 X-Snapshot-Seq，序号形如 '<epoch>-<N>'，epoch每次启动不同。客户端可以：
+    - 发送 If-None-Match，快照未变化时得到304；
+    - 传 since_seq=<序号>，得到相对该快照的增量 {'seq', 'base', 'set', 'unset'}；其他启动的序号得到完整数据；
+    - 同时发送 If-None-Match 与 A-IM: delta（RFC 3229），得到226增量响应；
+    - 传 format=columnar，把磁盘、GPU等列表按列编码。
+    大于1KB的响应在客户端支持时gzip压缩。
+    """
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return Response('{"error": "硬件信息采集中"}', status=503, mimetype='application/json')
+
+    etag = f'W/"{snapshot.seq}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    delta_im = 'delta' in request.headers.get('A-IM', '')
+    base_version = parse_seq(request.args.get('since_seq'), sampler.epoch)
+    if base_version is None and delta_im and if_none_match:
+        base_version = parse_seq(if_none_match.split(',')[0].strip().lstrip('W/').strip('"'), sampler.epoch)
+    if etag in if_none_match or base_version == snapshot.version:
+        response = Response(status=304)
+        response.headers['ETag'] = etag
+        response.headers['X-Snapshot-Seq'] = snapshot.seq
+        return response
+
+    # 基准快照已被淘汰（或服务已重启）时返回完整数据
+    base = sampler.get(base_version) if base_version is not None and base_version < snapshot.version else None
+    body, compressed = payload_cache.body(
+        snapshot,
+        base,
+        columnar=request.args.get('format') == 'columnar',
+        accept_gzip='gzip' in request.headers.get('Accept-Encoding', ''),
+    )
+    status = 226 if base is not None and delta_im and request.args.get('since_seq') is None else 200
+    response = Response(body, status=status, mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['X-Snapshot-Seq'] = snapshot.seq
+    response.headers['Vary'] = 'Accept-Encoding, A-IM'
+    if base is not None:
+        response.headers['X-Delta-Base'] = base.seq
+        if status == 226:
+            response.headers['IM'] = 'delta'
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus文本格式的指标，直接返回按快照缓存的字节，不触发采集"""
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return Response('# 硬件信息采集中\n', status=503, mimetype='text/plain')
+    body, compressed = metrics_cache.body(snapshot, 'gzip' in request.headers.get('Accept-Encoding', ''))
+    response = Response(body, content_type=METRICS_CONTENT_TYPE)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events推送，每次采集完成后推送快照
+
+    断线重连时浏览器会带上Last-Event-ID，服务端从近期快照中补发错过的部分。
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscriber = broadcaster.subscribe(last_event_id)
+    return Response(broadcaster.stream(subscriber), mimetype='text/event-stream',
+                    headers={'X-Accel-Buffering': 'no'})
+
+@app.route('/api/inventory')
+def api_inventory():
+    """提供静态硬件清单，运行期间不变，页面加载时获取一次即可"""
+    return jsonify(get_inventory())
+
+@app.route('/api/history')
+@primary_only
+def api_history():
+    """按列返回服务端历史数据
+
+    参数: series 逗号分隔的序列名，支持通配符（如 cpu.core.*），缺省返回全部；
+    since/until 为Unix时间戳（秒）；step 为聚合步长（秒）。
+    指定 points 时从多分辨率聚合中选择合适的层级，返回每个序列的 min/max/avg/last，
+    downsample=lttb 时再降采样到最多 points 个点。
+    """
+    series = [name for name in request.args.get('series', '').split(',') if name]
+    points = request.args.get('points', type=int)
+    if points:
+        until = request.args.get('until', type=float) or time()
+        since = request.args.get('since', type=float) or until - 3600
+        return jsonify(rollups.query(
+            series or None, since, until,
+            points=max(3, points),
+            downsample=request.args.get('downsample'),
+        ))
+    return jsonify(history.query(
+        series or None,
+        since=request.args.get('since', type=float),
+        until=request.args.get('until', type=float),
+        step=request.args.get('step', type=float),
+    ))
+
+@app.route('/api/processes')
+def api_processes():
+    """按CPU、内存或I/O排序的前N个进程（sort=cpu|memory|io，limit最大50），不触发新的采集"""
+    sort = request.args.get('sort', 'cpu')
+    limit = request.args.get('limit', 20, type=int)
+    if IS_WORKER:
+        return jsonify(select_top(sampler.shared(PROCESSES_SLOT, {}), sort, limit))
+    return jsonify(hardware_info.process_collector.top(sort, limit))
+
+@app.route('/api/cgroups')
+def api_cgroups():
+    """cgroup v2 各容器/slice的资源占用（sort=cpu|memory|io|pids，limit最大50，prefix限定路径），不触发新的采集"""
+    sort = request.args.get('sort', 'cpu')
+    limit = request.args.get('limit', 20, type=int)
+    prefix = request.args.get('prefix', '')
+    latest = sampler.shared(CGROUPS_SLOT, {}) if IS_WORKER else hardware_info.cgroup_collector.latest()
+    return jsonify(select_cgroups(latest, sort, limit, prefix))
+
+@app.route('/api/alerts')
+def api_alerts():
+    """告警规则、告警中与等待持续时间的实例"""
+    return jsonify({
+        'rules': [rule.to_dict() for rule in alert_engine.rules],
+        'active': alert_engine.active(),
+        'pending': alert_engine.pending(),
+    })
+
+@app.route('/api/cpu')
+@primary_only
+def api_cpu():
+    """按指定窗口（秒）返回CPU使用率与时间占比，不触发新的采样"""
+    window = request.args.get('window', type=float)
+    return jsonify(hardware_info.cpu_collector.utilization(window))
+
+@app.route('/api/self')
+def api_self():
+    """监控程序自身的运行状况：各数据源与路由的耗时分位数、子进程/超时/异常计数、CPU与内存占用"""
+    report = instrumentation.registry.report()
+    if IS_WORKER:
+        # 采集相关的统计在primary中，worker附上自身的进程与路由统计
+        try:
+            status, _, body = primary.request('GET', '/api/self')
+            primary_report = json.loads(body) if status == 200 else {}
+        except (OSError, ValueError) as e:
+            logging.error(f"获取主进程状态失败: {str(e)}")
+            primary_report = {}
+        report['pid'] = os.getpid()
+        report['sse_subscribers'] = broadcaster.subscriber_count
+        return jsonify({**primary_report, 'worker': report})
+    report['scheduler'] = sampler.scheduler.status()
+    report['backends'] = hardware_info.backend_status()
+    report['adaptive'] = adaptive.status() if adaptive is not None else None
+    report['sse_subscribers'] = broadcaster.subscriber_count
+    report['history_bytes'] = history.nbytes + rollups.nbytes
+    if storage is not None:
+        report['storage'] = storage.stats()
+    return jsonify(report)
+
+@app.route('/api/hub/push', methods=['POST'])
+@primary_only
+def api_hub_push():
+    """接收Agent推送的批量样本（gzip压缩的JSON）"""
+    if hub is None:
+        return jsonify({'error': '未启用中心节点模式（MONITOR_HUB）'}), 404
+    if HUB_TOKEN and request.headers.get('Authorization') != f'Bearer {HUB_TOKEN}':
+        return jsonify({'error': '认证失败'}), 401
+    try:
+        payload = decode_push(request.get_data(cache=False), request.headers.get('Content-Encoding', ''))
+        # 多进程模式下请求由worker经Unix socket转发，客户端地址在X-Forwarded-For中
+        address = request.headers.get('X-Forwarded-For') if ROLE == 'primary' else None
+        return jsonify(hub.ingest(payload, address or request.remote_addr))
+    except PushError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/hub/hosts')
+@primary_only
+def api_hub_hosts():
+    """所有主机的总览"""
+    if hub is None:
+        return jsonify({'error': '未启用中心节点模式（MONITOR_HUB）'}), 404
+    hosts = hub.hosts()
+    return jsonify({'hosts': hosts, 'count': len(hosts)})
+
+@app.route('/api/hub/hosts/<name>')
+@primary_only
+def api_hub_host(name):
+    """单台主机的清单与最新快照"""
+    host = hub.host(name) if hub is not None else None
+    if host is None:
+        return jsonify({'error': '主机不存在'}), 404
+    return jsonify({
+        'host': host.name,
+        'address': host.address,
+        'inventory': host.inventory,
+        'latest': host.latest,
+        'last_seen': host.last_seen,
+        'stale': host.last_seen is None or time() - host.last_seen > hub.stale_after,
+    })
+
+@app.route('/api/hub/hosts/<name>/history')
+@primary_only
+def api_hub_host_history(name):
+    """单台主机的历史，参数同 /api/history"""
+    host = hub.host(name) if hub is not None else None
+    if host is None:
+        return jsonify({'error': '主机不存在'}), 404
+    series = [item for item in request.args.get('series', '').split(',') if item]
+    return jsonify(host.history.query(
+        series or None,
+        since=request.args.get('since', type=float),
+        until=request.args.get('until', type=float),
+        step=request.args.get('step', type=float),
+    ))
+
+@app.route('/fleet')
+@primary_only
+def fleet():
+    if hub is None:
+        return "未启用中心节点模式，请设置 MONITOR_HUB=1", 404
+    return render_template('fleet.html')
+
+@app.route('/fleet/<name>')
+@primary_only
+def fleet_host(name):
+    host = hub.host(name) if hub is not None else None
+    if host is None:
+        return "主机不存在", 404
+    return render_template('fleet_host.html', host=host.name, inventory=host.inventory or {})
 
 @app.route('/dashboard')
 def dashboard():
-    # 获取硬件信息并准备数据
-    data = hardware_info.get_all_info()
-    template_data = prepare_template_data(data)
-    
-    print("Dashboard路由访问")
-    return render_template('dashboard.html', **template_data)
+    return render_dashboard()
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """带内容哈希的静态资源，一年内不需要重新验证；客户端支持时返回启动时压缩好的gzip版本"""
+    item = assets.get(filename)
+    if item is None:
+        return "资源不存在", 404
+    if f'"{item.digest}"' in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    elif item.gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(item.gzipped, mimetype=item.mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(item.content, mimetype=item.mimetype)
+    response.headers['ETag'] = f'"{item.digest}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+    return response
 
 @app.after_request
 def add_header(response):
+    started = g.get('request_started')
+    if started is not None:
+        # SSE等流式响应只统计到响应头返回为止
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        instrumentation.observe('routes', rule, monotonic() - started)
+    if 'Cache-Control' in response.headers:
+        # 路由已设置缓存策略（如带哈希的静态资源）
+        return response
+    if 'ETag' in response.headers:
+        # 带ETag的响应允许缓存，但每次使用前必须重新验证
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
     return response
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    if hub is not None:
+        # Agent使用长连接推送，开发服务器需要HTTP/1.1才能保持连接
+        from werkzeug.serving import WSGIRequestHandler
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+    # 调试模式的重载器会再启动一个进程、重复初始化采集器，只在开发时通过 MONITOR_DEBUG=1 开启
+    debug = os.environ.get('MONITOR_DEBUG', '').lower() in ('1', 'true', 'yes')
+    app.run(debug=debug, threaded=True)
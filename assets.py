@@ -0,0 +1,141 @@
+"""静态资源：按内容哈希生成URL，启动时预先gzip压缩
+
+第三方库（Chart.js）随代码提交在 static/vendor 中，与其他静态文件一样带内容哈希、可离线使用。
+用法（升级第三方库时修改 VENDOR 中的版本，重新下载后提交）:
+    python assets.py vendor
+    python assets.py check     # 检查第三方库是否已就位，缺失时返回码为1
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import sys
+import threading
+import urllib.request
+from typing import Dict, Optional
+
+# 第三方库的本地路径与上游地址；只在本地文件缺失且显式允许CDN回退时页面才引用该地址
+VENDOR = {
+    'vendor/chart.min.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.5.1/dist/chart.umd.min.js',
+}
+URL_PREFIX = '/assets/'
+DIGEST_LENGTH = 12
+# 小于该大小的文件不压缩
+MIN_GZIP_BYTES = 1024
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class Asset:
+    """一个静态文件的内容、gzip版本与哈希"""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self.content = f.read()
+        self.digest = hashlib.sha256(self.content).hexdigest()[:DIGEST_LENGTH]
+        self.gzipped: Optional[bytes] = None
+        if len(self.content) >= MIN_GZIP_BYTES:
+            compressed = gzip.compress(self.content, 9, mtime=0)
+            if len(compressed) < len(self.content):
+                self.gzipped = compressed
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f'{stem}.{self.digest}{ext}'
+
+    @property
+    def url(self) -> str:
+        return URL_PREFIX + self.hashed_name
+
+
+class AssetManifest:
+    """静态目录的资源清单
+
+    URL中带内容哈希（如 /assets/js/dashboard.3f2a9c1d0b4e.js），内容变化时URL随之变化，
+    因此可以设置一年的 immutable 缓存。文件在首次引用时读取并压缩，之后只在修改时间变化时重新加载。
+    """
+
+    def __init__(self, directory: str, vendor: Optional[Dict[str, str]] = None, cdn_fallback: bool = False):
+        self.directory = directory
+        self.vendor = dict(VENDOR if vendor is None else vendor)
+        # 本地第三方库缺失时是否退回CDN（MONITOR_VENDOR_CDN=1 开启，默认只使用本地文件）
+        self.cdn_fallback = cdn_fallback
+        self._warned = set()
+        self._assets: Dict[str, Asset] = {}
+        self._hashed: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> Optional[Asset]:
+        path = os.path.join(self.directory, name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        asset = self._assets.get(name)
+        if asset is None or asset.mtime != mtime:
+            with self._lock:
+                asset = Asset(name, path)
+                self._assets[name] = asset
+                self._hashed[asset.hashed_name] = asset
+        return asset
+
+    def url(self, name: str) -> str:
+        """模板中引用静态资源的URL"""
+        asset = self._load(name)
+        if asset is not None:
+            return asset.url
+        if name not in self._warned:
+            self._warned.add(name)
+            if name in self.vendor:
+                fallback = f"，页面从CDN加载 {self.vendor[name]}" if self.cdn_fallback else ''
+                logging.warning(f"第三方库 static/{name} 不存在{fallback}；请执行 python assets.py vendor 并随代码部署")
+            else:
+                logging.warning(f"静态资源不存在: {name}")
+        if name in self.vendor and self.cdn_fallback:
+            return self.vendor[name]
+        return URL_PREFIX + name
+
+    def get(self, hashed_name: str) -> Optional[Asset]:
+        """按带哈希的文件名查找；多进程时页面可能由其他进程生成，未引用过的资源按文件名加载后校验哈希"""
+        asset = self._hashed.get(hashed_name)
+        if asset is None:
+            stem, ext = os.path.splitext(hashed_name)
+            stem, _, digest = stem.rpartition('.')
+            if not stem or '..' in hashed_name.split('/'):
+                return None
+            asset = self._load(stem + ext)
+            if asset is None or asset.digest != digest:
+                return None
+        return asset
+
+
+def download_vendor(directory: str):
+    for name, url in VENDOR.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+        with open(path, 'wb') as f:
+            f.write(content)
+        print(f"{name}: {len(content)} 字节 <- {url}，URL哈希 {Asset(name, path).digest}")
+
+
+def missing_vendor(directory: str):
+    """尚未下载到本地的第三方库"""
+    return [name for name in VENDOR if not os.path.isfile(os.path.join(directory, name))]
+
+
+if __name__ == '__main__':
+    static = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    if sys.argv[1:] == ['vendor']:
+        download_vendor(static)
+    elif sys.argv[1:] == ['check']:
+        missing = missing_vendor(static)
+        for name in missing:
+            print(f"缺少 static/{name}（{VENDOR[name]}），请执行 python assets.py vendor")
+        sys.exit(1 if missing else 0)
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,114 @@
+"""可选数据源的延迟加载
+
+pysensors、WMI、sysfs温度传感器、nvidia-smi、cpuinfo 等数据源都在第一次使用时才导入和初始化，
+导入模块、创建 HardwareInfo 时不做任何探测，启动时间与内存占用不受本机驱动状况影响。
+加载失败（未安装、没有驱动、没有权限）时记为不可用并保存原因，之后直接返回None、不再重复尝试；
+设置 retry_after 时过一段时间再试一次（如驱动安装后）。各数据源的状态见 /api/self 的 backends。
+"""
+import logging
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Optional
+
+import instrumentation
+
+STATES = ('unloaded', 'available', 'unavailable')
+
+
+class Unavailable(Exception):
+    """加载函数用来说明数据源不可用的原因（如未找到nvidia-smi），不计入异常统计"""
+
+
+class Backend:
+    """一个延迟加载的可选数据源，状态为 unloaded → available / unavailable"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], retry_after: Optional[float] = None):
+        self.name = name
+        self.loader = loader
+        self.retry_after = retry_after
+        self.state = 'unloaded'
+        self.reason: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._value = None
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _should_skip(self) -> bool:
+        return self.state == 'unavailable' and (
+            self.retry_after is None or monotonic() - self._failed_at < self.retry_after)
+
+    def get(self) -> Optional[Any]:
+        """返回加载结果，第一次调用时加载；不可用时返回None"""
+        if self.state == 'available':
+            return self._value
+        if self._should_skip():
+            return None
+        with self._lock:
+            if self.state == 'available':
+                return self._value
+            if self._should_skip():
+                return None
+            started = monotonic()
+            try:
+                value = self.loader()
+            except Unavailable as e:
+                self._fail(str(e), started)
+                return None
+            except ImportError as e:
+                # 未安装可选依赖是预期的不可用状态，不计入异常统计
+                self._fail(f'未安装 {e.name or e}', started)
+                return None
+            except Exception as e:
+                instrumentation.record_exception(f'backend.{self.name}')
+                self._fail(f'{type(e).__name__}: {e}', started)
+                return None
+            self._value = value
+            self.state = 'available'
+            self.reason = None
+            self.load_seconds = round(monotonic() - started, 4)
+            instrumentation.observe('backends', self.name, monotonic() - started)
+            return value
+
+    def _fail(self, reason: str, started: float):
+        if reason != self.reason:
+            logging.info(f"数据源 {self.name} 不可用: {reason}")
+        self.state = 'unavailable'
+        self.reason = reason
+        self.load_seconds = round(monotonic() - started, 4)
+        self._failed_at = monotonic()
+
+    def peek(self) -> Optional[Any]:
+        """已加载时返回结果，不触发加载（用于清理）"""
+        return self._value if self.state == 'available' else None
+
+    def status(self) -> Dict[str, Any]:
+        return {'state': self.state, 'reason': self.reason, 'load_seconds': self.load_seconds}
+
+
+class lazy:
+    """第一次访问时才创建的属性，结果保存在实例上，之后的访问不再经过描述符
+
+    创建时加锁，采样线程与请求线程同时第一次访问时只创建一次。
+    """
+
+    def __init__(self, factory: Callable[[Any], Any]):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+        return instance.__dict__[self.name]
+
+
+def loaded(instance, name: str) -> bool:
+    """lazy属性是否已经创建"""
+    return name in instance.__dict__
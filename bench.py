@@ -0,0 +1,421 @@
+"""采集器与HTTP接口的基准测试
+
+在模拟主机（见 fakehost.py）上运行，不依赖本机硬件，任意Linux机器上离线可跑。
+
+用法:
+    python bench.py collectors --host large              # 各采集器耗时、内存分配与子进程数
+    python bench.py http --host medium --clients 50      # N个模拟面板客户端并发请求
+    python bench.py all --save bench-baseline.json       # 全部运行并保存基线
+    python bench.py all --compare bench-baseline.json    # 与基线比较，变慢超过阈值时返回码为1
+    python bench.py startup --budget-ms 500              # 启动耗时与内存，超出预算时返回码为1
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import tracemalloc
+from time import monotonic, perf_counter, time
+from typing import Any, Callable, Dict, List, Optional
+
+from fakehost import FakeHost, HOST_SIZES
+
+DEFAULT_ITERATIONS = 200
+# 内存分配统计开销较大，只取前若干次
+ALLOC_ITERATIONS = 20
+DEFAULT_CLIENTS = 20
+DEFAULT_DURATION = 10.0
+# 与基线相比变慢超过该比例视为退化
+DEFAULT_THRESHOLD = 0.25
+# 耗时低于该值（毫秒）的项目不判定退化，避免计时噪声
+NOISE_FLOOR_MS = 0.05
+
+# 启动预算（毫秒）：在新的解释器中导入并创建服务对象的耗时，不含解释器本身的启动
+DEFAULT_STARTUP_BUDGET_MS = 500
+STARTUP_REPEAT = 3
+# 启动时不应导入的模块：可选数据源在第一次采集时才加载，无界面模式不加载Flask与模板
+LAZY_MODULES = ('sensors', 'wmi', 'cpuinfo')
+# (启动语句, 启动后取得 HardwareInfo 的表达式, 启动时不应导入的模块)
+STARTUP_TARGETS = {
+    'app': ('import app', 'app.hardware_info', LAZY_MODULES),
+    'headless': ('import headless; monitor = headless.HeadlessMonitor()', 'monitor.hardware_info',
+                 LAZY_MODULES + ('flask', 'jinja2', 'werkzeug')),
+}
+STARTUP_PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+rss = None
+try:
+    with open('/proc/self/status') as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+except (OSError, StopIteration):
+    pass
+modules = sorted(sys.modules)
+# 计时之后加载各可选数据源，记录确定后的状态（GPU等待nvidia-smi启动成功或失败）
+info = {hardware_info}
+info.get_gpu_info()
+info.get_temperature_info()
+info.get_inventory()
+result = {{'seconds': elapsed, 'rss_kb': rss, 'modules': modules, 'backends': info.backend_status()}}
+sys.stdout.write('\\n' + json.dumps(result) + '\\n')
+sys.stdout.flush()
+os._exit(0)
+'''
+
+# 模拟面板客户端的请求组合：(路径, 每轮请求次数)，与页面的轮询频率大致一致
+DASHBOARD_REQUESTS = (
+    ('/api/hardware_info', 3),
+    ('/api/processes?sort=cpu&limit=15', 1),
+    ('/api/cgroups?sort=cpu&limit=15', 1),
+    ('/metrics', 1),
+)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def subprocess_spawns() -> int:
+    import instrumentation
+    return sum(instrumentation.registry.report()['counters'].get('subprocess_spawns', {}).values())
+
+
+def measure(func: Callable[[], Any], iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    """多次调用func，返回耗时分位数（毫秒）、每次调用的峰值内存分配（KB）与子进程数"""
+    for _ in range(warmup):
+        func()
+
+    spawns = subprocess_spawns()
+    durations = []
+    for _ in range(iterations):
+        started = perf_counter()
+        func()
+        durations.append((perf_counter() - started) * 1000)
+    spawns = subprocess_spawns() - spawns
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(iterations, ALLOC_ITERATIONS)):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(sum(durations) / len(durations), 4),
+        'p50_ms': round(percentile(durations, 0.5), 4),
+        'p99_ms': round(percentile(durations, 0.99), 4),
+        'max_ms': round(durations[-1], 4),
+        'alloc_kb': round(sum(peaks) / len(peaks) / 1024, 1) if peaks else None,
+        'subprocesses': round(spawns / iterations, 3),
+    }
+
+
+def bench_collectors(iterations: int) -> Dict[str, Dict[str, Any]]:
+    """逐个测量采集器、get_all_info、模板数据准备与快照序列化"""
+    import app as monitor
+    import inventory
+    from process_collector import ProcessCollector
+    from sampler import Snapshot
+
+    info = monitor.hardware_info
+    # 关闭自动降频，每次调用都完整扫描进程
+    processes = ProcessCollector(max_share=0)
+    cases = [
+        ('cpu', info.get_cpu_info, iterations),
+        ('memory', info.get_memory_info, iterations),
+        ('gpu', info.get_gpu_info, iterations),
+        ('disk', info.disk_collector.sample, iterations),
+        ('network', info.network_collector.sample, iterations),
+        ('temperatures', info.temp_monitor.get_temperatures, iterations),
+        ('processes', processes.sample, max(5, iterations // 10)),
+        # 硬件清单每次都重新探测（lshw/dmidecode/nvidia-smi），只跑少量次数
+        ('inventory', inventory.collect_inventory, 5),
+        ('get_all_info', info.get_all_info, iterations),
+    ]
+    results = {}
+    for name, func, count in cases:
+        results[name] = measure(func, count)
+        logging.info(f"{name}: p50 {results[name]['p50_ms']} ms")
+
+    data = info.get_all_info()
+    hardware_inventory = info.get_inventory()
+    results['prepare_template_data'] = measure(lambda: monitor.prepare_template_data(data, hardware_inventory),
+                                               iterations)
+    # 每次新建快照，cached_property 不命中，测量的是 /api/hardware_info 的完整序列化
+    results['snapshot_json'] = measure(lambda: Snapshot(1, time(), 0.0, data).json, iterations)
+    info.gpu_collector.stop(timeout=5)
+    return results
+
+
+def parse_importtime(stderr: str, target: str, limit: int = 8) -> List[Dict[str, Any]]:
+    """从 -X importtime 的输出中取出被测模块直接导入的各模块，按累计耗时排序"""
+    imports, children = [], []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # 格式: import time: self [us] | cumulative | imported package，名称前每两个空格为一层
+        _, cumulative_us, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # 输出按导入完成的顺序排列，子模块在父模块之前
+        if depth == 1:
+            children.append({'module': name.strip(), 'ms': round(int(cumulative_us) / 1000, 1)})
+        elif depth == 0:
+            if name.strip() == target:
+                imports.extend(children)
+            children = []
+    return sorted(imports, key=lambda item: item['ms'], reverse=True)[:limit]
+
+
+def bench_startup(budget_ms: float, repeat: int = STARTUP_REPEAT) -> Dict[str, Any]:
+    """在新的解释器中导入并创建服务对象（完整服务与无界面模式），取多次中最快的一次
+
+    报告耗时、常驻内存、直接导入的最慢模块，以及启动时被导入的可选数据源（应在第一次采集时才加载）。
+    计时结束后再加载各数据源，报告其确定后的状态（available/unavailable 及原因），不计入启动耗时。
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, (statement, hardware_info, unexpected) in STARTUP_TARGETS.items():
+        runs = []
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_PROBE.format(statement=statement, hardware_info=hardware_info)],
+                                  cwd=directory, capture_output=True, text=True, timeout=120)
+            if proc.returncode != 0:
+                raise RuntimeError(f"启动 {name} 失败: {proc.stderr[-2000:]}")
+            runs.append((json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr))
+        probe, importtime = min(runs, key=lambda run: run[0]['seconds'])
+        modules = set(probe['modules'])
+        startup_ms = round(probe['seconds'] * 1000, 1)
+        loaded = [module for module in unexpected
+                  if module in modules or any(m.startswith(module + '.') for m in modules)]
+        results[name] = {
+            'startup_ms': startup_ms,
+            'rss_mb': round(probe['rss_kb'] / 1024, 1) if probe['rss_kb'] else None,
+            'modules': len(modules),
+            'slowest_imports': parse_importtime(importtime, name),
+            'unexpected_modules': loaded,
+            'backends': probe['backends'],
+            'budget_ms': budget_ms,
+            'ok': startup_ms <= budget_ms and not loaded,
+        }
+        logging.info(f"{name}: 启动 {startup_ms} ms")
+    return results
+
+
+def bench_http(clients: int, duration: float) -> Dict[str, Any]:
+    """启动线程化的服务，N个客户端按面板的请求组合并发请求，统计各接口延迟与总吞吐"""
+    from werkzeug.serving import make_server
+    import app as monitor
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    monitor.sampler.start()
+    monitor.sampler.wait(30)
+    server = make_server('127.0.0.1', 0, monitor.app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+
+    latencies: Dict[str, List[float]] = {path.split('?')[0]: [] for path, _ in DASHBOARD_REQUESTS}
+    errors = [0]
+    lock = threading.Lock()
+    start = threading.Event()
+    deadline = [0.0]
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        etag = None
+        local: Dict[str, List[float]] = {name: [] for name in latencies}
+        failed = 0
+        start.wait()
+        while monotonic() < deadline[0]:
+            for path, repeat in DASHBOARD_REQUESTS:
+                for _ in range(repeat):
+                    headers = {'Accept-Encoding': 'gzip'}
+                    if etag and path == '/api/hardware_info':
+                        headers['If-None-Match'] = etag
+                    started = perf_counter()
+                    try:
+                        connection.request('GET', path, headers=headers)
+                        response = connection.getresponse()
+                        response.read()
+                    except (OSError, http.client.HTTPException):
+                        failed += 1
+                        connection.close()
+                        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                        continue
+                    local[path.split('?')[0]].append((perf_counter() - started) * 1000)
+                    if response.status >= 400:
+                        failed += 1
+                    if path == '/api/hardware_info':
+                        etag = response.getheader('ETag') or etag
+        connection.close()
+        with lock:
+            for name, values in local.items():
+                latencies[name].extend(values)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, name=f'bench-client-{i}', daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    started = monotonic()
+    deadline[0] = started + duration
+    start.set()
+    for thread in threads:
+        thread.join(duration + 60)
+    elapsed = monotonic() - started
+    server.shutdown()
+    monitor.sampler.stop(timeout=5)
+    monitor.hardware_info.gpu_collector.stop(timeout=5)
+
+    all_latencies = sorted(value for values in latencies.values() for value in values)
+    endpoints = {}
+    for name, values in latencies.items():
+        values.sort()
+        endpoints[name] = {
+            'requests': len(values),
+            'p50_ms': round(percentile(values, 0.5), 3),
+            'p99_ms': round(percentile(values, 0.99), 3),
+        }
+    return {
+        'clients': clients,
+        'duration': round(elapsed, 2),
+        'requests': len(all_latencies),
+        'errors': errors[0],
+        'rps': round(len(all_latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(all_latencies, 0.5), 3),
+        'p99_ms': round(percentile(all_latencies, 0.99), 3),
+        'endpoints': endpoints,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """逐项比较p50/p99耗时与吞吐，返回退化项目的说明"""
+    regressions = []
+    if current.get('host') != baseline.get('host'):
+        print(f"注意：主机规模与基线不同（当前 {current.get('host')}，基线 {baseline.get('host')}）")
+
+    def check(label: str, now: Optional[float], before: Optional[float], higher_is_better: bool = False):
+        if now is None or before is None or before <= 0:
+            return
+        ratio = now / before
+        worse = ratio < 1 - threshold if higher_is_better else (ratio > 1 + threshold and now > NOISE_FLOOR_MS)
+        mark = '  <-- 退化' if worse else ''
+        print(f"  {label:<44} {before:>10.3f} -> {now:>10.3f}  ({(ratio - 1) * 100:+.0f}%){mark}")
+        if worse:
+            regressions.append(f"{label}: {before} -> {now}")
+
+    for name, result in (current.get('collectors') or {}).items():
+        before = (baseline.get('collectors') or {}).get(name)
+        if before:
+            for field in ('p50_ms', 'p99_ms'):
+                check(f'collectors.{name}.{field}', result.get(field), before.get(field))
+    for name, result in (current.get('startup') or {}).items():
+        before = (baseline.get('startup') or {}).get(name)
+        if before:
+            for field in ('startup_ms', 'rss_mb'):
+                check(f'startup.{name}.{field}', result.get(field), before.get(field))
+    now_http, before_http = current.get('http'), baseline.get('http')
+    if now_http and before_http:
+        check('http.rps', now_http.get('rps'), before_http.get('rps'), higher_is_better=True)
+        for field in ('p50_ms', 'p99_ms'):
+            check(f'http.{field}', now_http.get(field), before_http.get(field))
+    return regressions
+
+
+def print_report(report: Dict[str, Any]):
+    collectors = report.get('collectors')
+    if collectors:
+        print(f"{'采集器':<24}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'分配 KB':>10}{'子进程/次':>10}")
+        for name, result in collectors.items():
+            print(f"{name:<24}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['max_ms']:>10.3f}"
+                  f"{result['alloc_kb'] if result['alloc_kb'] is not None else '-':>10}{result['subprocesses']:>10}")
+    load = report.get('http')
+    if load:
+        print(f"\nHTTP: {load['clients']} 个客户端, {load['duration']} 秒, {load['requests']} 个请求, "
+              f"{load['rps']} 请求/秒, p50 {load['p50_ms']} ms, p99 {load['p99_ms']} ms, 错误 {load['errors']}")
+        for name, result in load['endpoints'].items():
+            print(f"  {name:<24}{result['requests']:>8} 次  p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms")
+    startup = report.get('startup')
+    if startup:
+        print()
+        for name, result in startup.items():
+            status = '通过' if result['ok'] else '超出预算' if not result['unexpected_modules'] else '启动时加载了可选模块'
+            print(f"启动 {name:<10} {result['startup_ms']:>8.1f} ms（预算 {result['budget_ms']:g} ms）"
+                  f"  常驻内存 {result['rss_mb']} MB  {result['modules']} 个模块  {status}")
+            if result['unexpected_modules']:
+                print(f"  启动时不应导入: {', '.join(result['unexpected_modules'])}")
+            print('  ' + ', '.join(f"{item['module']} {item['ms']} ms" for item in result['slowest_imports']))
+            for backend, state in sorted(result['backends'].items()):
+                reason = f"（{state['reason']}）" if state['reason'] else ''
+                print(f"  数据源 {backend:<12} {state['state']}{reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='硬件监控基准测试（模拟主机）')
+    parser.add_argument('mode', choices=('collectors', 'http', 'startup', 'all'))
+    parser.add_argument('--host', choices=sorted(HOST_SIZES), default='medium', help='预设的主机规模')
+    for field in ('cores', 'gpus', 'disks', 'nics', 'sensors', 'processes'):
+        parser.add_argument(f'--{field}', type=int, help=f'覆盖预设中的{field}数量')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='HTTP压测时长（秒）')
+    parser.add_argument('--save', help='把结果保存为基线JSON')
+    parser.add_argument('--compare', help='与基线JSON比较')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='判定退化的变慢比例')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_STARTUP_BUDGET_MS, help='启动耗时预算（毫秒）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    host = FakeHost.preset(args.host, **{field: getattr(args, field) for field in
+                                         ('cores', 'gpus', 'disks', 'nics', 'sensors', 'processes')})
+    host.install()
+    try:
+        report: Dict[str, Any] = {
+            'host': host.spec,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created_at': time(),
+        }
+        if args.mode in ('collectors', 'all'):
+            report['collectors'] = bench_collectors(args.iterations)
+        if args.mode in ('http', 'all'):
+            report['http'] = bench_http(args.clients, args.duration)
+    finally:
+        host.uninstall()
+    # 在新的解释器中测量，不受模拟主机替换的影响
+    if args.mode in ('startup', 'all'):
+        report['startup'] = bench_startup(args.budget_ms)
+
+    print_report(report)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n已保存基线: {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n与基线比较（{args.compare}，阈值 {args.threshold:.0%}）:")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 项退化")
+            sys.exit(1)
+        print("\n无退化")
+    if any(not result['ok'] for result in (report.get('startup') or {}).values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
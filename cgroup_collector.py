@@ -0,0 +1,275 @@
+import heapq
+import logging
+import os
+import threading
+from time import monotonic
+from typing import Any, Dict, List, Optional
+
+import instrumentation
+
+DEFAULT_ROOT = '/sys/fs/cgroup'
+# 单次采集的时间预算（秒）；cgroup很多时分多次轮流读取，每次只读预算内能读完的部分
+DEFAULT_BUDGET = 0.2
+# 目录修改时间在cgroupfs上不一定更新，每隔多少秒完整列一次目录兜底
+DEFAULT_RESCAN_INTERVAL = 10
+# 跟踪的最大层级（根为0），如 kubepods.slice/.../cri-containerd-xxx.scope 为4层
+DEFAULT_MAX_DEPTH = 6
+DEFAULT_KEEP = 50
+SORT_KEYS = ('cpu', 'memory', 'io', 'pids')
+MEMORY_STAT_FIELDS = ('anon', 'file', 'shmem')
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_int(path: str) -> Optional[int]:
+    content = _read(path)
+    try:
+        return int(content) if content is not None else None
+    except ValueError:
+        return None
+
+
+def _read_keyed(path: str) -> Dict[str, int]:
+    """解析 'key value' 每行一项的文件（cpu.stat、memory.stat）"""
+    content = _read(path)
+    values = {}
+    if content:
+        for line in content.split(b'\n'):
+            key, _, value = line.partition(b' ')
+            if value:
+                try:
+                    values[key.decode()] = int(value)
+                except ValueError:
+                    pass
+    return values
+
+
+def _read_io(path: str) -> Optional[tuple]:
+    """io.stat 各设备读写字节数之和，返回 (rbytes, wbytes)"""
+    content = _read(path)
+    if content is None:
+        return None
+    rbytes = wbytes = 0
+    for line in content.split(b'\n'):
+        for field in line.split(b' ')[1:]:
+            key, _, value = field.partition(b'=')
+            if key == b'rbytes':
+                rbytes += int(value)
+            elif key == b'wbytes':
+                wbytes += int(value)
+    return rbytes, wbytes
+
+
+class Cgroup:
+    """跟踪中的一个cgroup：目录状态、上次的计数器与最近一次的结果"""
+
+    __slots__ = ('path', 'directory', 'depth', 'mtime', 'children', 'previous', 'result')
+
+    def __init__(self, path: str, directory: str, depth: int):
+        self.path = path
+        self.directory = directory
+        self.depth = depth
+        self.mtime: Optional[int] = None
+        self.children: set = set()
+        # (时间, cpu usage_usec, throttled_usec, rbytes, wbytes)
+        self.previous: Optional[tuple] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+
+def cgroup2_root(root: str = DEFAULT_ROOT) -> Optional[str]:
+    """cgroup v2 的挂载点，systemd混合模式下在 unified 子目录；没有cgroup v2时返回None"""
+    for path in (root, os.path.join(root, 'unified')):
+        if os.path.exists(os.path.join(path, 'cgroup.controllers')):
+            return path
+    return None
+
+
+class CgroupCollector:
+    """cgroup v2 各容器/slice的CPU、内存、I/O与进程数
+
+    cgroup树缓存在内存中，每次采集只stat已知的非叶子目录，修改时间变化（或每隔rescan_interval秒）
+    才重新列出子目录；已删除的cgroup在读取失败时移除。随后从上次停下的位置开始轮流读取各cgroup的
+    cpu.stat、memory.current、memory.stat、io.stat、pids.current，超过时间预算即停止，
+    未读到的cgroup沿用上次结果，因此数千个cgroup时单次采集耗时仍然有上限。
+    CPU与I/O速率由每个cgroup上次的读数求差得到。
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, budget: float = DEFAULT_BUDGET,
+                 rescan_interval: float = DEFAULT_RESCAN_INTERVAL, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.root = cgroup2_root(root) or root
+        self.budget = budget
+        self.rescan_interval = rescan_interval
+        self.max_depth = max_depth
+        self._nodes: Dict[str, Cgroup] = {}
+        self._order: List[Cgroup] = []
+        self._cursor = 0
+        self._listed = 0.0
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Any] = {'available': self.available(), 'count': 0, 'cgroups': []}
+
+    def available(self) -> bool:
+        return os.path.exists(os.path.join(self.root, 'cgroup.controllers'))
+
+    def _remove(self, path: str):
+        node = self._nodes.pop(path, None)
+        if node is not None:
+            for child in node.children:
+                self._remove(path.rstrip('/') + '/' + child)
+
+    def _refresh_tree(self, now: float) -> bool:
+        """更新缓存的cgroup树，返回是否有变化"""
+        full = now - self._listed >= self.rescan_interval
+        if full:
+            self._listed = now
+        changed = False
+        stack = ['/']
+        while stack:
+            path = stack.pop()
+            node = self._nodes.get(path)
+            if node is None:
+                depth = 0 if path == '/' else path.count('/')
+                node = self._nodes[path] = Cgroup(path, os.path.join(self.root, path.lstrip('/')), depth)
+                changed = True
+            # 平时只检查有子目录的cgroup（新建的容器出现在这些目录下），叶子变为父节点由完整扫描发现
+            if full or node.children or node.mtime is None:
+                try:
+                    mtime = os.stat(node.directory).st_mtime_ns
+                except OSError:
+                    self._remove(path)
+                    changed = True
+                    continue
+            else:
+                mtime = node.mtime
+            if full or mtime != node.mtime:
+                node.mtime = mtime
+                try:
+                    with os.scandir(node.directory) as entries:
+                        children = {entry.name for entry in entries if entry.is_dir(follow_symlinks=False)}
+                except OSError:
+                    children = set()
+                for gone in node.children - children:
+                    self._remove(path.rstrip('/') + '/' + gone)
+                    changed = True
+                node.children = children
+            if node.depth < self.max_depth:
+                stack.extend(path.rstrip('/') + '/' + child for child in node.children)
+        return changed
+
+    def _read(self, node: Cgroup, now: float) -> bool:
+        cpu = _read_keyed(os.path.join(node.directory, 'cpu.stat'))
+        if not cpu and not os.path.isdir(node.directory):
+            return False
+        memory_stat = _read_keyed(os.path.join(node.directory, 'memory.stat'))
+        io = _read_io(os.path.join(node.directory, 'io.stat'))
+        memory = _read_int(os.path.join(node.directory, 'memory.current'))
+        if memory is None and node.path == '/':
+            # 根cgroup没有memory.current，用各类内存之和近似
+            memory = sum(memory_stat.get(field, 0) for field in ('anon', 'file', 'kernel')) or None
+
+        usage = cpu.get('usage_usec')
+        throttled = cpu.get('throttled_usec')
+        rbytes, wbytes = io if io is not None else (None, None)
+        current = (now, usage, throttled, rbytes, wbytes)
+        rates = [None, None, None, None]
+        previous = node.previous
+        if previous is not None and now > previous[0]:
+            elapsed = now - previous[0]
+            for index in range(1, 5):
+                if current[index] is not None and previous[index] is not None:
+                    rates[index - 1] = max(0, current[index] - previous[index]) / elapsed
+        node.previous = current
+        cpu_rate, throttled_rate, read_rate, write_rate = rates
+
+        node.result = {
+            'path': node.path,
+            'depth': node.depth,
+            'cpu_percent': round(cpu_rate / 10000, 1) if cpu_rate is not None else None,
+            'throttled_percent': round(throttled_rate / 10000, 1) if throttled_rate is not None else None,
+            'memory': memory,
+            **{f'memory_{field}': memory_stat.get(field) for field in MEMORY_STAT_FIELDS},
+            'io_read_rate': round(read_rate, 1) if read_rate is not None else None,
+            'io_write_rate': round(write_rate, 1) if write_rate is not None else None,
+            'pids': _read_int(os.path.join(node.directory, 'pids.current')),
+        }
+        return True
+
+    def sample(self) -> Dict[str, Any]:
+        with self._lock:
+            started = monotonic()
+            if not self.available():
+                self._latest = {'available': False, 'root': self.root, 'count': 0, 'cgroups': []}
+                return self._latest
+            deadline = started + self.budget
+            if self._refresh_tree(started) or len(self._order) != len(self._nodes):
+                self._order = sorted(self._nodes.values(), key=lambda node: node.path)
+                self._cursor = 0
+
+            # 从上次停下的位置轮流读取，至少读一个，超过预算即停止
+            order = self._order
+            total = len(order)
+            read = 0
+            while read < total:
+                node = order[(self._cursor + read) % total]
+                read += 1
+                try:
+                    if not self._read(node, monotonic()):
+                        self._remove(node.path)
+                except Exception:
+                    instrumentation.record_exception('cgroups.read')
+                if monotonic() >= deadline:
+                    break
+            self._cursor = (self._cursor + read) % total if total else 0
+
+            duration = monotonic() - started
+            instrumentation.observe('collectors', 'cgroups.scan', duration)
+            if read < total and not self._latest.get('truncated'):
+                logging.info(f"cgroup数量较多（{total}），单次采集预算内读取 {read} 个，其余轮流读取")
+            self._latest = {
+                'available': True,
+                'root': self.root,
+                'count': total,
+                'read': read,
+                'truncated': read < total,
+                'duration': round(duration, 4),
+                'cgroups': [node.result for node in order if node.result is not None and node.path in self._nodes],
+            }
+            return self._latest
+
+    def latest(self) -> Dict[str, Any]:
+        """返回最近一次采集结果，不触发新的采集"""
+        return self._latest
+
+
+def _sort_value(entry: Dict[str, Any], sort: str) -> float:
+    if sort == 'cpu':
+        return entry.get('cpu_percent') or 0
+    if sort == 'memory':
+        return entry.get('memory') or 0
+    if sort == 'io':
+        return (entry.get('io_read_rate') or 0) + (entry.get('io_write_rate') or 0)
+    return entry.get('pids') or 0
+
+
+def select_cgroups(latest: Dict[str, Any], sort: str = 'cpu', limit: int = 20, prefix: str = '',
+                   keep: int = DEFAULT_KEEP) -> Dict[str, Any]:
+    """从一次采集结果中按sort取前limit个cgroup，prefix只保留该路径下的cgroup（不含根）"""
+    if sort not in SORT_KEYS:
+        sort = 'cpu'
+    limit = max(1, min(limit, keep))
+    prefix = '/' + prefix.strip('/') if prefix.strip('/') else ''
+    entries = [entry for entry in latest.get('cgroups') or []
+               if entry['path'] != '/' and (not prefix or entry['path'] == prefix or entry['path'].startswith(prefix + '/'))]
+    return {
+        'available': latest.get('available', False),
+        'count': latest.get('count', 0),
+        'truncated': latest.get('truncated', False),
+        'duration': latest.get('duration'),
+        'sort': sort,
+        'cgroups': heapq.nlargest(limit, entries, key=lambda entry: _sort_value(entry, sort)),
+    }
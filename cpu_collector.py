@@ -0,0 +1,116 @@
+import threading
+from array import array
+from collections import deque
+from time import monotonic
+from typing import Dict, List, Optional
+
+import psutil
+
+import instrumentation
+
+# 参与计算的cpu_times字段，缺失的字段（非Linux平台）按0处理
+TIME_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal')
+# 对外报告的时间占比
+BREAKDOWN_FIELDS = ('user', 'nice', 'system', 'iowait', 'irq', 'softirq', 'steal', 'idle')
+_IDLE = TIME_FIELDS.index('idle')
+_IOWAIT = TIME_FIELDS.index('iowait')
+_BREAKDOWN_INDEX = tuple((field, TIME_FIELDS.index(field)) for field in BREAKDOWN_FIELDS)
+
+
+class CpuCollector:
+    """基于 cpu_times 差值计算CPU使用率的有状态采集器
+
+    每次 sample() 只读取一次累计时间，不会休眠；使用率来自与上一次（或
+    指定窗口之前）读数的差值。首次采样没有参考点，结果为开机以来的平均值。
+    """
+
+    def __init__(self, max_window: float = 300, max_samples: int = 300):
+        self.max_window = max_window
+        # (monotonic时间, 按核心展开的累计时间数组)
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_times() -> array:
+        values = array('d')
+        for core in psutil.cpu_times(percpu=True):
+            values.extend(getattr(core, field, 0.0) for field in TIME_FIELDS)
+        return values
+
+    def sample(self, window: Optional[float] = None) -> Dict:
+        """读取一次cpu_times并返回使用率，window为平均窗口（秒），默认为上次采样以来"""
+        now = monotonic()
+        times = self._read_times()
+        with self._lock:
+            self._samples.append((now, times))
+            while len(self._samples) > 2 and now - self._samples[1][0] > self.max_window:
+                self._samples.popleft()
+        info = self.utilization(window)
+        info['freq_per_core'] = self._read_freq()
+        return info
+
+    def utilization(self, window: Optional[float] = None) -> Dict:
+        """根据已保存的读数计算使用率，不触发新的采样"""
+        with self._lock:
+            if not self._samples:
+                return {}
+            now, current = self._samples[-1]
+            reference = None
+            if window is None:
+                if len(self._samples) > 1:
+                    reference = self._samples[-2]
+            else:
+                # 取窗口起点之前最近的一次读数，不足窗口时使用最早的读数
+                for i in range(len(self._samples) - 2, -1, -1):
+                    reference = self._samples[i]
+                    if now - reference[0] >= window:
+                        break
+
+        if reference is None:
+            elapsed = None
+            previous = array('d', bytes(len(current) * current.itemsize))
+        else:
+            elapsed = now - reference[0]
+            previous = reference[1]
+            if len(previous) != len(current):
+                # CPU热插拔导致核心数变化，退回开机以来的平均值
+                previous = array('d', bytes(len(current) * current.itemsize))
+                elapsed = None
+
+        width = len(TIME_FIELDS)
+        usage_per_core: List[float] = []
+        times_per_core: List[Dict[str, float]] = []
+        totals = [0.0] * width
+        for offset in range(0, len(current), width):
+            deltas = [max(0.0, current[offset + i] - previous[offset + i]) for i in range(width)]
+            for i, delta in enumerate(deltas):
+                totals[i] += delta
+            usage, breakdown = self._percentages(deltas)
+            usage_per_core.append(usage)
+            times_per_core.append(breakdown)
+
+        total_usage, total_breakdown = self._percentages(totals)
+        return {
+            'usage_per_core': usage_per_core,
+            'total_usage': total_usage,
+            'times_per_core': times_per_core,
+            'times': total_breakdown,
+            'window': round(elapsed, 3) if elapsed is not None else None,
+        }
+
+    @staticmethod
+    def _percentages(deltas):
+        total = sum(deltas)
+        if total <= 0:
+            return 0.0, {field: 0.0 for field in BREAKDOWN_FIELDS}
+        busy = total - deltas[_IDLE] - deltas[_IOWAIT]
+        breakdown = {field: round(deltas[index] / total * 100, 2) for field, index in _BREAKDOWN_INDEX}
+        return round(busy / total * 100, 2), breakdown
+
+    @staticmethod
+    def _read_freq() -> List[float]:
+        try:
+            return [round(freq.current, 2) for freq in psutil.cpu_freq(percpu=True) or []]
+        except Exception:
+            instrumentation.record_exception('cpu.freq')
+            return []
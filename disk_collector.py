@@ -0,0 +1,241 @@
+import logging
+import os
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import monotonic, time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+import instrumentation
+
+# 单次采集等待挂载点容量探测的最长秒数
+DEFAULT_PROBE_TIMEOUT = 1.0
+DEFAULT_PROBE_WORKERS = 8
+# 挂载点容量变化缓慢，默认每30秒探测一次
+DEFAULT_USAGE_INTERVAL = 30.0
+# 探测持续失败的挂载点按 usage_interval 指数退避，最长间隔（秒）
+MAX_FAILURE_BACKOFF = 600.0
+# psutil计数器 -> 输出的速率字段
+RATE_FIELDS = (
+    ('read_bytes', 'read_speed'),
+    ('write_bytes', 'write_speed'),
+    ('read_count', 'read_iops'),
+    ('write_count', 'write_iops'),
+)
+
+
+def _device_name(device: str) -> str:
+    """挂载设备对应的计数器名称，/dev/mapper/xxx 等符号链接解析为 dm-N"""
+    try:
+        device = os.path.realpath(device)
+    except OSError:
+        pass
+    return os.path.basename(device)
+
+
+def _delta(previous, current, field: str) -> int:
+    value = getattr(current, field, 0) - getattr(previous, field, 0)
+    # 计数器被重置（设备热插拔、驱动重载）时按0处理
+    return value if value > 0 else 0
+
+
+class DiskCollector:
+    """磁盘I/O速率与挂载点容量
+
+    每个采样周期只调用一次 disk_io_counters(perdisk=True)，由差值计算读写吞吐、
+    IOPS、平均延迟和繁忙度。挂载点容量在线程池中探测，每次最多等待
+    probe_timeout 秒：超时的挂载点（失联的NFS/CIFS等）标记为不可用并返回上次
+    缓存的结果，在其探测返回之前不会重复提交，不会拖住整个采集。
+    I/O速率每次采样都计算，容量每 usage_interval 秒或挂载点变化时才重新探测。
+    探测失败（权限不足、已失效）的挂载点不输出，按指数退避重试，不会引起其他挂载点的重复探测。
+    卡住的探测最多占用 probe_workers-1 个线程；达到上限后只探测已知正常的挂载点，
+    其余挂载点暂缓探测，保证至少一个线程留给正常的挂载点。
+    """
+
+    def __init__(self, probe_timeout: float = DEFAULT_PROBE_TIMEOUT, probe_workers: int = DEFAULT_PROBE_WORKERS,
+                 usage_interval: float = DEFAULT_USAGE_INTERVAL):
+        self.probe_timeout = probe_timeout
+        self.usage_interval = usage_interval
+        self._last_usage: Dict[str, Dict[str, Any]] = {}
+        self._last_probe: Optional[float] = None
+        # 上一次探测时的挂载点集合（含失败与退避中的挂载点），只有集合变化才提前重新探测
+        self._probed_mounts = frozenset()
+        # 挂载点 -> (连续失败次数, 下次允许探测的monotonic时间)
+        self._failures: Dict[str, tuple] = {}
+        self._executor = ThreadPoolExecutor(max_workers=probe_workers, thread_name_prefix='disk-probe')
+        self._pending: Dict[str, Any] = {}
+        self._usage: Dict[str, Dict[str, Any]] = {}
+        self._hung = set()
+        # 卡住的探测最多占用的线程数，至少留一个线程给正常的挂载点
+        self._max_hung = max(1, probe_workers - 1)
+        # 因线程被卡住的探测占满而暂缓探测的挂载点（每个只记录一次日志）
+        self._deferred = set()
+        self._previous: Dict[str, Any] = {}
+        self._previous_time: Optional[float] = None
+        self._rates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+
+    # ---- I/O速率 ----
+
+    def sample_io(self) -> Dict[str, Dict[str, Any]]:
+        """读取一次各磁盘计数器，返回 {设备名: 速率}"""
+        try:
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+        except Exception as e:
+            logging.debug(f"读取磁盘I/O计数器失败: {str(e)}")
+            instrumentation.record_exception('disk.io_counters')
+            counters = {}
+        now = monotonic()
+
+        with self._lock:
+            elapsed = now - self._previous_time if self._previous_time is not None else None
+            rates = {}
+            for name, current in counters.items():
+                previous = self._previous.get(name)
+                info: Dict[str, Any] = {'read_bytes': current.read_bytes, 'write_bytes': current.write_bytes}
+                for counter, field in RATE_FIELDS:
+                    info[field] = round(_delta(previous, current, counter) / elapsed, 2) if previous and elapsed else 0.0
+                if previous and elapsed:
+                    reads = _delta(previous, current, 'read_count')
+                    writes = _delta(previous, current, 'write_count')
+                    # read_time/write_time 为累计毫秒数，除以完成的I/O次数得到平均延迟
+                    info['read_latency'] = round(_delta(previous, current, 'read_time') / reads, 2) if reads else 0.0
+                    info['write_latency'] = round(_delta(previous, current, 'write_time') / writes, 2) if writes else 0.0
+                    if hasattr(current, 'busy_time'):
+                        # busy_time只在Linux/FreeBSD提供
+                        busy = _delta(previous, current, 'busy_time') / (elapsed * 1000) * 100
+                        info['utilization'] = round(min(busy, 100.0), 2)
+                rates[name] = info
+            self._previous = counters
+            self._previous_time = now
+            self._rates = rates
+            return rates
+
+    # ---- 挂载点容量 ----
+
+    def _probe(self, mountpoint: str) -> Dict[str, Any]:
+        usage = psutil.disk_usage(mountpoint)
+        return {
+            'total': usage.total,
+            'used': usage.used,
+            'free': usage.free,
+            'percent': usage.percent,
+            'checked_at': time(),
+        }
+
+    def probe_usage(self, mountpoints: List[str]) -> Dict[str, Dict[str, Any]]:
+        """并行探测挂载点容量，超时的挂载点返回缓存结果并标记不可用"""
+        with self._probe_lock:
+            return self._probe_usage(mountpoints)
+
+    def _probe_usage(self, mountpoints: List[str]) -> Dict[str, Dict[str, Any]]:
+        now = monotonic()
+        submitted = {}
+        hung = sum(1 for mountpoint in self._hung if mountpoint in self._pending)
+        for mountpoint in mountpoints:
+            failure = self._failures.get(mountpoint)
+            if failure is not None and now < failure[1] and mountpoint not in self._pending:
+                continue
+            if mountpoint not in self._pending:
+                if hung >= self._max_hung and mountpoint not in self._usage:
+                    # 线程几乎都被卡住的探测占用：没有正常结果的挂载点（新挂载、失败过）暂不探测
+                    if mountpoint not in self._deferred:
+                        self._deferred.add(mountpoint)
+                        logging.warning(f"{hung} 个挂载点的容量探测仍未返回，暂缓探测 {mountpoint}")
+                    continue
+                self._deferred.discard(mountpoint)
+                self._pending[mountpoint] = self._executor.submit(self._probe, mountpoint)
+            submitted[mountpoint] = self._pending[mountpoint]
+        # 已经卡住的探测不再重复等待
+        waiting = [future for mountpoint, future in submitted.items() if mountpoint not in self._hung]
+        if waiting:
+            wait(waiting, timeout=self.probe_timeout)
+
+        results = {}
+        for mountpoint, future in submitted.items():
+            if future.done():
+                del self._pending[mountpoint]
+                if mountpoint in self._hung:
+                    self._hung.discard(mountpoint)
+                    logging.info(f"挂载点 {mountpoint} 容量探测已恢复")
+                try:
+                    self._usage[mountpoint] = future.result()
+                except Exception as e:
+                    # 与原逻辑一致，无法读取容量的挂载点直接跳过，按指数退避再试
+                    failures = self._failures.get(mountpoint, (0, 0.0))[0] + 1
+                    backoff = min(self.usage_interval * 2 ** (failures - 1), MAX_FAILURE_BACKOFF)
+                    self._failures[mountpoint] = (failures, now + backoff)
+                    logging.debug(f"获取挂载点 {mountpoint} 容量失败（第{failures}次，{backoff:.0f}秒后重试）: {str(e)}")
+                    instrumentation.record_exception('disk.usage')
+                    self._usage.pop(mountpoint, None)
+                    continue
+                self._failures.pop(mountpoint, None)
+                results[mountpoint] = dict(self._usage[mountpoint], available=True)
+            elif not future.running():
+                # 仍在排队（线程都在忙），不是挂载点失联：沿用上次结果
+                cached = self._usage.get(mountpoint)
+                if cached is not None:
+                    results[mountpoint] = dict(cached, available=True, stale=True)
+            else:
+                # 探测超时：保留上次结果，标记为过期且不可用
+                if mountpoint not in self._hung:
+                    instrumentation.record_timeout('disk.usage')
+                    self._hung.add(mountpoint)
+                    logging.warning(f"挂载点 {mountpoint} 容量探测超时，标记为不可用")
+                cached = self._usage.get(mountpoint)
+                results[mountpoint] = dict(cached or {}, available=False, stale=cached is not None)
+        # 清理已卸载挂载点的缓存
+        for mountpoint in list(self._usage):
+            if mountpoint not in submitted:
+                del self._usage[mountpoint]
+        for mountpoint in list(self._failures):
+            if mountpoint not in mountpoints:
+                del self._failures[mountpoint]
+        self._deferred.intersection_update(mountpoints)
+        return results
+
+    def sample(self) -> List[Dict[str, Any]]:
+        """采集所有挂载点的容量与所在设备的I/O速率"""
+        io = self.sample_io()
+        partitions = []
+        for partition in psutil.disk_partitions(all=False):
+            # 跳过CD-ROM等特殊设备（Windows系统）
+            if platform.system() == "Windows" and "cdrom" in partition.opts.lower():
+                continue
+            partitions.append(partition)
+
+        mountpoints = [partition.mountpoint for partition in partitions]
+        now = monotonic()
+        # 与上次探测的挂载点集合比较，而不是与成功的结果比较，否则一个持续失败的挂载点会导致每次都全部重新探测
+        if (self._last_probe is None or now - self._last_probe >= self.usage_interval
+                or frozenset(mountpoints) != self._probed_mounts):
+            self._last_usage = self.probe_usage(mountpoints)
+            self._probed_mounts = frozenset(mountpoints)
+            self._last_probe = now
+        usage = self._last_usage
+        disks = []
+        for partition in partitions:
+            disk_info = {
+                'device': partition.device,
+                'mountpoint': partition.mountpoint,
+                'filesystem': partition.fstype,
+            }
+            if partition.mountpoint not in usage:
+                continue
+            disk_info.update(usage[partition.mountpoint])
+            rates = io.get(_device_name(partition.device))
+            if rates is not None:
+                disk_info.update(rates)
+            disks.append(disk_info)
+        return disks
+
+    def latest_io(self) -> Dict[str, Dict[str, Any]]:
+        """返回最近一次计算的各磁盘速率，不触发新的采样"""
+        with self._lock:
+            return self._rates
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
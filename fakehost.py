@@ -0,0 +1,277 @@
+"""基准测试用的模拟主机
+
+按给定规模（核心、GPU、磁盘、网卡、温度传感器、进程数）替换psutil中采集用到的函数，
+在临时目录中生成假的 nvidia-smi、lshw、dmidecode 脚本与 sysfs 温度目录，
+并替换 cpuinfo 模块。所有读数由固定种子生成，每次调用计数器按固定规律增长，
+结果可重复，不依赖本机硬件，也不需要root权限或GPU驱动。
+
+必须在导入 app / hardware_info 之前调用 FakeHost(...).install()。
+"""
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import types
+from collections import namedtuple
+from typing import Any, Dict, Optional
+
+import psutil
+
+# 预设的主机规模
+HOST_SIZES = {
+    'small': {'cores': 4, 'gpus': 0, 'disks': 1, 'nics': 2, 'sensors': 4, 'processes': 150},
+    'medium': {'cores': 32, 'gpus': 2, 'disks': 4, 'nics': 4, 'sensors': 16, 'processes': 500},
+    'large': {'cores': 128, 'gpus': 8, 'disks': 16, 'nics': 8, 'sensors': 64, 'processes': 2000},
+}
+SEED = 20240601
+GIB = 1024 ** 3
+
+scputimes = namedtuple('scputimes', 'user nice system idle iowait irq softirq steal guest guest_nice')
+scpufreq = namedtuple('scpufreq', 'current min max')
+svmem = namedtuple('svmem', 'total available percent used free')
+sdiskpart = namedtuple('sdiskpart', 'device mountpoint fstype opts')
+sdiskusage = namedtuple('sdiskusage', 'total used free percent')
+sdiskio = namedtuple('sdiskio', 'read_count write_count read_bytes write_bytes read_time write_time busy_time')
+snetio = namedtuple('snetio', 'bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout')
+snicstats = namedtuple('snicstats', 'isup duplex speed mtu flags')
+pcputimes = namedtuple('pcputimes', 'user system')
+pmem = namedtuple('pmem', 'rss vms')
+pio = namedtuple('pio', 'read_count write_count read_bytes write_bytes')
+puids = namedtuple('puids', 'real effective saved')
+
+NVIDIA_SMI = '''#!{python}
+import os, sys, time
+GPUS = {gpus}
+# 同目录下的 gpus 文件可在运行中修改GPU数量（模拟GPU重置后消失），为0时与真实nvidia-smi一样报错退出
+COUNT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gpus')
+fields, loop = [], None
+for arg in sys.argv[1:]:
+    if arg.startswith('--query-gpu='):
+        fields = arg.split('=', 1)[1].split(',')
+    elif arg.startswith('--loop-ms='):
+        loop = int(arg.split('=', 1)[1]) / 1000
+VALUES = {{'name': 'NVIDIA A100-SXM4-80GB', 'memory.total': 81920, 'memory.free': 41920, 'memory.used': 40000,
+          'power.limit': 400, 'clocks.mem': 1593, 'fan.speed': '[N/A]'}}
+tick = 0
+while True:
+    if os.path.exists(COUNT_FILE):
+        with open(COUNT_FILE) as f:
+            GPUS = int(f.read())
+    if GPUS <= 0:
+        print('No devices were found')
+        sys.exit(6)
+    for i in range(GPUS):
+        row = []
+        for field in fields:
+            if field == 'index':
+                row.append(str(i))
+            elif field == 'count':
+                row.append(str(GPUS))
+            elif field == 'uuid':
+                row.append('GPU-%08d-0000-0000-0000-000000000000' % i)
+            elif field in VALUES:
+                row.append(str(VALUES[field]))
+            else:
+                row.append(str((i * 7 + tick * 3) % 100))
+        print(', '.join(row))
+    sys.stdout.flush()
+    if loop is None:
+        break
+    tick += 1
+    time.sleep(loop)
+'''
+
+LSHW = '''#!/bin/sh
+echo "H/W path       Device  Class   Description"
+echo "================================================"
+echo "/0/0                   memory  64KiB BIOS"
+echo "/0/1000                memory  512GiB System Memory"
+echo "/0/1000/0              memory  64GiB DIMM DDR4 Synchronous Registered (Buffered) 3200 MHz (0.3 ns)"
+'''
+
+DMIDECODE = '''#!/bin/sh
+echo "Memory Device"
+echo "	Size: 65536 MB"
+echo "	Type: DDR4"
+echo "	Speed: 3200 MHz"
+'''
+
+
+class FakeHost:
+    """一台按规模生成的模拟主机"""
+
+    def __init__(self, cores: int = 4, gpus: int = 0, disks: int = 1, nics: int = 2, sensors: int = 4,
+                 processes: int = 150, seed: int = SEED):
+        self.spec = {'cores': cores, 'gpus': gpus, 'disks': disks, 'nics': nics, 'sensors': sensors,
+                     'processes': processes}
+        self.seed = seed
+        self.directory: Optional[str] = None
+        self._calls: Dict[str, int] = {}
+        self._saved: Dict[str, Any] = {}
+        self._environ: Dict[str, Optional[str]] = {}
+        rng = random.Random(seed)
+        self._weights = [rng.random() for _ in range(processes)]
+
+    @classmethod
+    def preset(cls, name: str, **overrides) -> 'FakeHost':
+        spec = dict(HOST_SIZES[name])
+        spec.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**spec)
+
+    def _tick(self, name: str) -> int:
+        """每个函数各自的调用次数，计数器按调用次数线性增长，结果与调用顺序无关"""
+        count = self._calls.get(name, 0) + 1
+        self._calls[name] = count
+        return count
+
+    # ---- psutil ----
+
+    def cpu_times(self, percpu=False):
+        tick = self._tick('cpu_times')
+        cores = [scputimes(1000.0 + tick * (0.2 + i % 5 * 0.1), 1.0, 500.0 + tick * 0.05, 50000.0 + tick * 0.6,
+                           10.0 + tick * 0.01, 0.0, 2.0 + tick * 0.01, 0.0, 0.0, 0.0)
+                 for i in range(self.spec['cores'])]
+        if percpu:
+            return cores
+        return scputimes(*(sum(values) for values in zip(*cores)))
+
+    def cpu_freq(self, percpu=False):
+        freqs = [scpufreq(2400.0 + i % 8 * 100, 800.0, 3500.0) for i in range(self.spec['cores'])]
+        return freqs if percpu else scpufreq(2750.0, 800.0, 3500.0)
+
+    def cpu_count(self, logical=True):
+        return self.spec['cores'] if logical else max(1, self.spec['cores'] // 2)
+
+    def virtual_memory(self):
+        total = 512 * GIB
+        used = 200 * GIB + self._tick('virtual_memory') % 100 * 1024 ** 2
+        return svmem(total, total - used, round(used / total * 100, 1), used, total - used)
+
+    def disk_partitions(self, all=False):
+        return [sdiskpart(f'/dev/bench{i}', '/' if i == 0 else f'/data{i}', 'ext4', 'rw,relatime')
+                for i in range(self.spec['disks'])]
+
+    def disk_usage(self, path):
+        return sdiskusage(4000 * GIB, 1500 * GIB, 2500 * GIB, 37.5)
+
+    def disk_io_counters(self, perdisk=False):
+        tick = self._tick('disk_io_counters')
+        counters = {f'bench{i}': sdiskio(tick * 100, tick * 50, tick * 4096000, tick * 2048000,
+                                         tick * 30, tick * 20, tick * 40)
+                    for i in range(self.spec['disks'])}
+        return counters if perdisk else sdiskio(*(sum(values) for values in zip(*counters.values())))
+
+    def net_io_counters(self, pernic=False):
+        tick = self._tick('net_io_counters')
+        counters = {f'bench{i}': snetio(tick * 125000 * (i + 1), tick * 250000 * (i + 1), tick * 100, tick * 200,
+                                        0, 0, 0, 0)
+                    for i in range(self.spec['nics'])}
+        counters['lo'] = snetio(tick * 1000, tick * 1000, tick, tick, 0, 0, 0, 0)
+        return counters if pernic else snetio(*(sum(values) for values in zip(*counters.values())))
+
+    def net_if_stats(self):
+        names = [f'bench{i}' for i in range(self.spec['nics'])] + ['lo']
+        return {name: snicstats(True, 2, 25000, 1500, 'up,broadcast,running') for name in names}
+
+    def net_if_addrs(self):
+        return {}
+
+    def boot_time(self):
+        return 1700000000.0
+
+    def process_iter(self, attrs=None, ad_value=None):
+        tick = self._tick('process_iter')
+        for pid, weight in enumerate(self._weights, 1):
+            proc = types.SimpleNamespace()
+            proc.info = {
+                'pid': pid,
+                'name': f'worker-{pid % 37}',
+                'cpu_times': pcputimes(weight * tick, weight * tick / 4),
+                'memory_info': pmem(int(weight * 4 * GIB), int(weight * 8 * GIB)),
+                'num_threads': 1 + pid % 16,
+                'status': 'running' if pid % 5 == 0 else 'sleeping',
+                'create_time': 1700000000.0 + pid,
+                'io_counters': pio(tick, tick, int(weight * tick * 1e6), int(weight * tick * 5e5)),
+                'uids': puids(pid % 3 * 1000, 0, 0),
+            }
+            yield proc
+
+    PATCHED = ('cpu_times', 'cpu_freq', 'cpu_count', 'virtual_memory', 'disk_partitions', 'disk_usage',
+               'disk_io_counters', 'net_io_counters', 'net_if_stats', 'net_if_addrs', 'boot_time', 'process_iter')
+
+    # ---- 外部命令与sysfs ----
+
+    def _write_script(self, name: str, content: str):
+        path = os.path.join(self.directory, 'bin', name)
+        with open(path, 'w') as f:
+            f.write(content)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    def _write_sysfs(self):
+        """生成 hwmon 温度目录：一个coretemp芯片（Package + 每核心一个），其余为NVMe等芯片"""
+        root = os.path.join(self.directory, 'sys')
+        sensors = self.spec['sensors']
+        per_chip = min(sensors, self.spec['cores'] + 1) or 0
+        chips = [per_chip] + [1] * (sensors - per_chip)
+        for chip, count in enumerate(chips):
+            if count <= 0:
+                continue
+            path = os.path.join(root, 'class', 'hwmon', f'hwmon{chip}')
+            os.makedirs(path)
+            with open(os.path.join(path, 'name'), 'w') as f:
+                f.write('coretemp\n' if chip == 0 else 'nvme\n')
+            for index in range(1, count + 1):
+                with open(os.path.join(path, f'temp{index}_input'), 'w') as f:
+                    f.write(f'{40000 + index * 500}\n')
+                if chip == 0:
+                    with open(os.path.join(path, f'temp{index}_label'), 'w') as f:
+                        f.write('Package id 0\n' if index == 1 else f'Core {index - 2}\n')
+                    with open(os.path.join(path, f'temp{index}_max'), 'w') as f:
+                        f.write('90000\n')
+        os.makedirs(os.path.join(root, 'class', 'thermal'), exist_ok=True)
+        return root
+
+    def install(self):
+        """替换psutil函数、PATH与相关环境变量"""
+        self.directory = tempfile.mkdtemp(prefix='monitor-bench-')
+        os.makedirs(os.path.join(self.directory, 'bin'))
+        if self.spec['gpus'] > 0:
+            self._write_script('nvidia-smi', NVIDIA_SMI.format(python=sys.executable, gpus=self.spec['gpus']))
+        self._write_script('lshw', LSHW)
+        self._write_script('dmidecode', DMIDECODE)
+        environ = {
+            # 只保留假命令与基础命令所在目录，确保不会调用本机的nvidia-smi
+            'PATH': os.path.join(self.directory, 'bin') + os.pathsep + '/bin' + os.pathsep + '/usr/bin',
+            'MONITOR_SYSFS_ROOT': self._write_sysfs(),
+            'MONITOR_CGROUP_ROOT': os.path.join(self.directory, 'cgroup'),
+        }
+        for name, value in environ.items():
+            self._environ[name] = os.environ.get(name)
+            os.environ[name] = value
+
+        for name in self.PATCHED:
+            self._saved[name] = getattr(psutil, name)
+            setattr(psutil, name, getattr(self, name))
+        self._saved['cpuinfo'] = sys.modules.get('cpuinfo')
+        sys.modules['cpuinfo'] = types.SimpleNamespace(
+            get_cpu_info=lambda: {'brand_raw': f'Bench CPU {self.spec["cores"]}-Core'})
+        return self
+
+    def uninstall(self):
+        for name in self.PATCHED:
+            if name in self._saved:
+                setattr(psutil, name, self._saved.pop(name))
+        if self._saved.get('cpuinfo') is not None:
+            sys.modules['cpuinfo'] = self._saved.pop('cpuinfo')
+        else:
+            sys.modules.pop('cpuinfo', None)
+        for name, value in self._environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
@@ -0,0 +1,305 @@
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+from time import time, monotonic
+from typing import Any, Dict, List, Optional
+
+import instrumentation
+
+# nvidia-smi 查询字段，顺序与解析一致；count（GPU总数）用于判断一轮 --loop-ms 输出是否完整
+QUERY_FIELDS = (
+    'index',
+    'count',
+    'uuid',
+    'name',
+    'utilization.gpu',
+    'utilization.memory',
+    'memory.total',
+    'memory.used',
+    'memory.free',
+    'temperature.gpu',
+    'clocks.gr',
+    'clocks.mem',
+    'power.draw',
+    'power.limit',
+    'fan.speed',
+    'ecc.errors.corrected.volatile.total',
+    'ecc.errors.uncorrected.volatile.total',
+)
+TEXT_FIELDS = ('uuid', 'name')
+MAX_BACKOFF = 30
+# stopped：未启动；starting：已启动、尚无结果；running：nvidia-smi已输出读数；failed：最近一次启动失败或退出时没有读数
+STATES = ('stopped', 'starting', 'running', 'failed')
+
+
+def parse_value(value: str):
+    """解析nvidia-smi的单个CSV字段，[N/A]、[Not Supported]等返回None"""
+    value = value.strip()
+    if not value or value.startswith('[') or value in ('N/A', 'Not Supported'):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def parse_line(line: str, fields=QUERY_FIELDS) -> Optional[Dict[str, Any]]:
+    """解析一行 --format=csv,noheader,nounits 输出，格式不符时返回None"""
+    parts = line.rstrip('\r\n').split(', ')
+    if len(parts) != len(fields):
+        return None
+    reading = {}
+    for field, raw in zip(fields, parts):
+        reading[field] = raw.strip() if field in TEXT_FIELDS else parse_value(raw)
+    if not isinstance(reading['index'], int):
+        return None
+    if 'count' in reading and not isinstance(reading['count'], int):
+        reading['count'] = None
+    return reading
+
+
+def query_gpus(fields=QUERY_FIELDS, command: str = 'nvidia-smi', timeout: float = 5) -> List[Dict[str, Any]]:
+    """执行一次nvidia-smi查询，未安装驱动或查询失败时返回空列表"""
+    executable = shutil.which(command)
+    if executable is None:
+        return []
+    cmd = [executable, f"--query-gpu={','.join(fields)}", '--format=csv,noheader,nounits']
+    proc = instrumentation.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        stdout, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        instrumentation.record_timeout('nvidia-smi.query')
+        proc.kill()
+        proc.communicate()
+        return []
+    readings = [parse_line(line, fields) for line in stdout.splitlines()]
+    readings = [reading for reading in readings if reading is not None]
+    for reading in readings:
+        reading.pop('count', None)
+    return readings
+
+
+class GpuCollector:
+    """常驻的GPU采集器
+
+    保持一个 `nvidia-smi --query-gpu=... --loop-ms=<interval>` 进程持续输出，后台线程
+    逐行解析并保存每块GPU的最新读数。进程退出或长时间无输出时自动重启，
+    因此每次采集都不需要再创建子进程。command 在 PATH 中查找，测试时可替换为假脚本。
+    每收到完整的一轮输出，移除本轮没有出现的GPU（重置、驱动重新加载后消失的设备）。
+    """
+
+    def __init__(self, interval_ms: int = 1000, command: str = 'nvidia-smi', stale_after: Optional[float] = None):
+        self.interval_ms = int(interval_ms)
+        self.command = command
+        # 超过该时间没有新输出则视为读取进程卡死
+        self.stale_after = stale_after or max(5.0, self.interval_ms / 1000 * 5)
+        self.restarts = 0
+        # 连续多少次nvidia-smi退出时没有输出任何读数（驱动损坏、没有GPU）
+        self.failed_starts = 0
+        self.last_error: Optional[str] = None
+        self.state = 'stopped'
+        self._stale_default = stale_after is None
+        self._restart = False
+        self._latest: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._last_output = 0.0
+        self._ready = threading.Event()
+        # 状态确定为running或failed时设置，failed_starts等已在此之前更新
+        self._settled = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """是否能找到nvidia-smi"""
+        return shutil.which(self.command) is not None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动读取线程（重复调用无副作用）"""
+        if self.running:
+            return
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._ready.clear()
+            with self._lock:
+                self.failed_starts = 0
+                self.state = 'starting'
+                self._settled.clear()
+            self._thread = threading.Thread(target=self._supervise, name='gpu-collector', daemon=True)
+            self._thread.start()
+            self._watchdog = threading.Thread(target=self._watch, name='gpu-collector-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止读取线程并结束nvidia-smi进程"""
+        self._stop.set()
+        self._kill()
+        for thread in (self._thread, self._watchdog):
+            if thread is not None:
+                thread.join(timeout)
+        self._thread = None
+        self._watchdog = None
+        with self._lock:
+            self.state = 'stopped'
+
+    def set_interval(self, interval_ms: int):
+        """调整nvidia-smi的输出周期（自适应采样空闲时放慢），以新的 --loop-ms 重启读取进程"""
+        interval_ms = int(interval_ms)
+        if interval_ms == self.interval_ms:
+            return
+        self.interval_ms = interval_ms
+        if self._stale_default:
+            self.stale_after = max(5.0, interval_ms / 1000 * 5)
+        if self._proc is not None:
+            self._restart = True
+            self._kill()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待首轮完整的读数（或确认nvidia-smi不可用）"""
+        return self._ready.wait(timeout)
+
+    def wait_settled(self, timeout: Optional[float] = None) -> str:
+        """等待启动结果，返回 running / failed；超时仍无结果时返回 starting（如首行输出较慢）"""
+        self._settled.wait(timeout)
+        with self._lock:
+            return self.state
+
+    def _settle(self, state: str, error: Optional[str] = None):
+        with self._lock:
+            if state == 'failed':
+                self.failed_starts += 1
+                self.last_error = error
+            else:
+                self.failed_starts = 0
+            self.state = state
+        self._settled.set()
+
+    def readings(self) -> List[Dict[str, Any]]:
+        """返回每块GPU的最新读数，按index排序"""
+        now = time()
+        with self._lock:
+            latest = [dict(reading) for _, reading in sorted(self._latest.items())]
+        for reading in latest:
+            reading['stale'] = now - reading['timestamp'] > self.stale_after
+        return latest
+
+    def _spawn(self) -> Optional[subprocess.Popen]:
+        executable = shutil.which(self.command)
+        if executable is None:
+            self.last_error = f"未找到 {self.command}"
+            return None
+        cmd = [
+            executable,
+            f"--query-gpu={','.join(QUERY_FIELDS)}",
+            '--format=csv,noheader,nounits',
+            f"--loop-ms={self.interval_ms}",
+        ]
+        # 独立进程组，结束时连同子进程一起结束，避免孙进程占住管道
+        return instrumentation.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1,
+                                     start_new_session=(os.name == 'posix'))
+
+    def _supervise(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            started = monotonic()
+            try:
+                self._proc = self._spawn()
+            except OSError as e:
+                self._proc = None
+                self.last_error = str(e)
+
+            if self._proc is None:
+                # 没有nvidia-smi时也视为就绪，调用方不必等待
+                self._settle('failed', self.last_error)
+                self._ready.set()
+            else:
+                self._last_output = monotonic()
+                count = self._read(self._proc)
+                self._kill()
+                if self._restart:
+                    # 调整周期引起的重启，不计入异常重启，也不等待退避
+                    self._restart = False
+                    continue
+                if not count:
+                    self._settle('failed', f"{self.command} 退出且没有输出GPU读数")
+                if not self._stop.is_set():
+                    self.restarts += 1
+                    logging.warning(f"nvidia-smi 读取进程退出，{backoff:.0f}秒后重启")
+
+            # 运行足够久之后退出说明不是启动即失败，重置退避时间
+            if monotonic() - started > 60:
+                backoff = 1.0
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def _complete_cycle(self, cycle: set):
+        """收到完整的一轮输出：移除本轮没有出现的GPU"""
+        with self._lock:
+            for index in [index for index in self._latest if index not in cycle]:
+                logging.warning(f"GPU {index} 不再出现在 nvidia-smi 输出中，已移除")
+                del self._latest[index]
+        self._ready.set()
+
+    def _read(self, proc: subprocess.Popen) -> int:
+        """逐行读取直到进程退出，返回解析出的读数个数"""
+        count = 0
+        cycle = set()
+        for line in proc.stdout:
+            reading = parse_line(line)
+            if reading is None:
+                continue
+            now = time()
+            self._last_output = monotonic()
+            reading['timestamp'] = now
+            count += 1
+            index = reading['index']
+            expected = reading.pop('count', None)
+            # 每行带有GPU总数，收齐即为完整的一轮；取不到总数时以索引重复出现作为新一轮的开始
+            if index in cycle:
+                self._complete_cycle(cycle)
+                cycle = set()
+            cycle.add(index)
+            with self._lock:
+                self._latest[index] = reading
+            if count == 1:
+                self._settle('running')
+            if expected is not None and len(cycle) >= expected:
+                self._complete_cycle(cycle)
+                cycle = set()
+        self._ready.set()
+        return count
+
+    def _watch(self):
+        while not self._stop.wait(self.stale_after / 2):
+            proc = self._proc
+            if proc is not None and proc.poll() is None and monotonic() - self._last_output > self.stale_after:
+                logging.warning(f"nvidia-smi 超过{self.stale_after:.0f}秒无输出，强制重启")
+                self.last_error = 'nvidia-smi 无输出'
+                instrumentation.record_timeout('nvidia-smi.watchdog')
+                self._kill()
+
+    def _kill(self):
+        proc = self._proc
+        if proc is None:
+            return
+        try:
+            if os.name == 'posix':
+                os.killpg(proc.pid, signal.SIGKILL)
+            elif proc.poll() is None:
+                proc.kill()
+            proc.wait(timeout=5)
+        except Exception:
+            instrumentation.record_exception('nvidia-smi.kill')
@@ -1,30 +1,129 @@
 import psutil
-import platform
-from cpuinfo import get_cpu_info
 import os
 from datetime import datetime
 from temperature_monitor import TemperatureMonitor
-from time import time
-import GPUtil
-import subprocess
-import re
+from hwmon import DEFAULT_ROOT as SYSFS_ROOT
+from cpu_collector import CpuCollector
+from inventory import load_inventory
+from gpu_collector import GpuCollector
+from network_collector import NetworkCollector, DEFAULT_EXCLUDE
+from disk_collector import DiskCollector, DEFAULT_PROBE_TIMEOUT
+from process_collector import ProcessCollector
+from cgroup_collector import CgroupCollector, cgroup2_root, DEFAULT_ROOT as CGROUP_ROOT, DEFAULT_BUDGET as CGROUP_BUDGET
+from backends import Backend, Unavailable, lazy, loaded
+import inventory
+import instrumentation
+import threading
+from time import monotonic
 from typing import Dict, List, Any, Optional
 
-# 尝试导入GPU监控相关库
-try:
-    GPU_AVAILABLE = True
-except ImportError as e:
-    print(f"GPU监控初始化错误(ImportError): {str(e)}")
-    GPU_AVAILABLE = False
-except Exception as e:
-    print(f"GPU监控初始化错误: {str(e)}")
-    GPU_AVAILABLE = False
+# 首次获取GPU信息时等待nvidia-smi输出的最长秒数
+GPU_READY_TIMEOUT = 3
+# nvidia-smi不可用（未安装或驱动损坏）时，过多少秒再检查一次
+GPU_RETRY_AFTER = 300
+# 各数据源默认的采集周期（秒），None表示与采样周期相同
+COLLECTOR_INTERVALS = {
+    'cpu': None,
+    'memory': None,
+    'gpu': None,
+    'network': None,
+    'disk': None,
+    'temperatures': 5,
+    'system': 60,
+    'processes': 2,
+    'cgroups': 5,
+}
 
 class HardwareInfo:
-    def __init__(self):
-        self.temp_monitor = TemperatureMonitor()
-        self._last_net_io = None
-        self._last_net_time = None
+    """各数据源的采集器在第一次使用时才创建（见 backends.lazy），创建 HardwareInfo 本身不做任何探测"""
+
+    def __init__(self, inventory_cache=None, net_exclude=DEFAULT_EXCLUDE, net_ewma=0.0,
+                 disk_probe_timeout=DEFAULT_PROBE_TIMEOUT, sysfs_root=SYSFS_ROOT,
+                 cgroup_root=CGROUP_ROOT, cgroup_budget=CGROUP_BUDGET):
+        self.sysfs_root = sysfs_root
+        self.net_exclude = net_exclude
+        self.net_ewma = net_ewma
+        self.disk_probe_timeout = disk_probe_timeout
+        self.cgroup_root = cgroup_root
+        self.cgroup_budget = cgroup_budget
+        self.inventory_cache = inventory_cache
+        self._inventory = None
+        self._inventory_lock = threading.Lock()
+        # 第一次获取GPU信息时才检查并启动nvidia-smi
+        self.gpu = Backend('nvidia-smi', self._start_gpu, retry_after=GPU_RETRY_AFTER)
+
+    @classmethod
+    def from_env(cls):
+        """按 MONITOR_* 环境变量创建（完整服务与无界面模式共用）"""
+        return cls(
+            inventory_cache=os.environ.get('MONITOR_INVENTORY_CACHE'),
+            net_exclude=[p for p in os.environ.get('MONITOR_NET_EXCLUDE', ','.join(DEFAULT_EXCLUDE)).split(',') if p],
+            net_ewma=float(os.environ.get('MONITOR_NET_EWMA', 0)),
+            disk_probe_timeout=float(os.environ.get('MONITOR_DISK_TIMEOUT', DEFAULT_PROBE_TIMEOUT)),
+            sysfs_root=os.environ.get('MONITOR_SYSFS_ROOT', SYSFS_ROOT),
+            cgroup_root=os.environ.get('MONITOR_CGROUP_ROOT', CGROUP_ROOT),
+            cgroup_budget=float(os.environ.get('MONITOR_CGROUP_BUDGET', CGROUP_BUDGET)),
+        )
+
+    @lazy
+    def temp_monitor(self):
+        return TemperatureMonitor(self.sysfs_root)
+
+    @lazy
+    def cpu_collector(self):
+        return CpuCollector()
+
+    @lazy
+    def gpu_collector(self):
+        return GpuCollector()
+
+    @lazy
+    def network_collector(self):
+        return NetworkCollector(exclude=self.net_exclude, ewma_tau=self.net_ewma)
+
+    @lazy
+    def disk_collector(self):
+        return DiskCollector(probe_timeout=self.disk_probe_timeout)
+
+    @lazy
+    def process_collector(self):
+        return ProcessCollector()
+
+    @lazy
+    def cgroup_collector(self):
+        return CgroupCollector(self.cgroup_root, budget=self.cgroup_budget)
+
+    def _start_gpu(self):
+        collector = self.gpu_collector
+        if not collector.available:
+            raise Unavailable(f"未找到 {collector.command}")
+        collector.start()
+        # 驱动损坏时nvidia-smi启动后立即退出，没有任何输出；首行输出较慢（超时仍为starting）时视为可用
+        deadline = monotonic() + GPU_READY_TIMEOUT
+        if collector.wait_settled(GPU_READY_TIMEOUT) == 'failed':
+            error = collector.last_error
+            collector.stop()
+            raise Unavailable(error or 'nvidia-smi 没有输出GPU读数')
+        # 等待完整的第一批读数，使第一个快照包含所有GPU
+        collector.wait_ready(max(0.0, deadline - monotonic()))
+        return collector
+
+    def backend_status(self):
+        """各可选数据源的加载状态（unloaded/available/unavailable）与不可用的原因"""
+        backends = [self.gpu, inventory.CPUINFO]
+        if loaded(self, 'temp_monitor'):
+            backends.extend(self.temp_monitor.backends())
+        status = {backend.name: backend.status() for backend in backends}
+        collector = self.gpu.peek()
+        if collector is not None and collector.state == 'failed':
+            # 加载后nvidia-smi反复退出且没有读数（如驱动被卸载），以采集器确定的状态为准
+            status[self.gpu.name] = {**status[self.gpu.name], 'state': 'unavailable', 'reason': collector.last_error}
+        if loaded(self, 'cgroup_collector'):
+            available = self.cgroup_collector.available()
+            status['cgroup v2'] = {'state': 'available' if available else 'unavailable',
+                                   'reason': None if available else f'{self.cgroup_root} 不是cgroup v2',
+                                   'load_seconds': None}
+        return status
 
     def _format_gpu_memory(self, mb_value):
         """将MB转换为更友好的显示格式"""
@@ -32,35 +131,34 @@ class HardwareInfo:
             return f"{mb_value/1024:.1f} GB"
         return f"{mb_value:.0f} MB"
 
-    @staticmethod
-    def get_cpu_info():
+    def get_inventory(self):
+        """获取静态硬件清单（CPU型号、内存类型、GPU名称、系统版本等），只采集一次"""
+        if self._inventory is None:
+            with self._inventory_lock:
+                if self._inventory is None:
+                    self._inventory = load_inventory(self.inventory_cache)
+        return self._inventory
+
+    def cached_inventory(self):
+        """已采集的硬件清单，尚未采集完成时返回None，不阻塞"""
+        return self._inventory
+
+    def get_cpu_info(self, window=None):
+        """获取CPU实时信息，使用率来自cpu_times差值，不阻塞
+
+        window为平均窗口（秒），默认为上次采样以来。型号、核心数等静态信息见get_inventory()。
+        """
         try:
-            cpu_info = get_cpu_info()
-            cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
+            info = self.cpu_collector.sample(window)
             cpu_freq = psutil.cpu_freq(percpu=False)
             
-            info = {
-                'name': cpu_info.get('brand_raw', 'Unknown CPU'),
-                'cores': psutil.cpu_count(),
-                'physical_cores': psutil.cpu_count(logical=False),
-                'usage_per_core': cpu_percent,
-                'total_usage': sum(cpu_percent) / len(cpu_percent),
-            }
-            
             # 添加CPU频率信息（如果可用）
             if cpu_freq:
-                info.update({
-                    'current_freq': round(cpu_freq.current, 2),
-                    'min_freq': round(cpu_freq.min, 2),
-                    'max_freq': round(cpu_freq.max, 2)
-                })
+                info['current_freq'] = round(cpu_freq.current, 2)
             
             return info
         except Exception as e:
             return {
-                'name': 'Unknown CPU',
-                'cores': psutil.cpu_count() or 0,
-                'physical_cores': psutil.cpu_count(logical=False) or 0,
                 'usage_per_core': [0],
                 'total_usage': 0,
                 'error': str(e)
@@ -68,271 +166,68 @@ class HardwareInfo:
     
     @staticmethod
     def get_memory_info():
-        """获取内存信息，包括类型、频率和通道数"""
-        memory_info = {}
-        
-        # 获取内存使用情况
+        """获取内存实时使用情况，内存类型、频率和通道数见get_inventory()"""
         mem = psutil.virtual_memory()
-        memory_info["total"] = mem.total
-        memory_info["used"] = mem.used
-        memory_info["free"] = mem.available
-        memory_info["percent"] = mem.percent
-        
-        # 提供默认值，避免卡住
-        memory_info["type"] = "DDR4"
-        memory_info["frequency"] = "3200"
-        memory_info["channels"] = "Dual"
-        
-        # Linux系统使用lshw替代dmidecode (无需sudo)
-        if platform.system() == "Linux":
-            try:
-                # 使用lshw命令获取内存信息 (不需要sudo)
-                cmd = ["lshw", "-class", "memory", "-short"]
-                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                # 添加超时机制
-                try:
-                    stdout, stderr = proc.communicate(timeout=2)
-                    mem_info = stdout.decode()
-                    
-                    # 解析内存类型 (通常显示为DDR4或类似信息)
-                    if "DDR5" in mem_info:
-                        memory_info["type"] = "DDR5"
-                    elif "DDR4" in mem_info:
-                        memory_info["type"] = "DDR4" 
-                    elif "DDR3" in mem_info:
-                        memory_info["type"] = "DDR3"
-                    
-                    # 使用dmidecode获取频率信息 (如果存在不需要密码的情况)
-                    try:
-                        # 非阻塞式执行，有超时控制
-                        freq_proc = subprocess.Popen(["dmidecode", "-t", "memory"], 
-                                                   stdout=subprocess.PIPE, 
-                                                   stderr=subprocess.PIPE)
-                        stdout, stderr = freq_proc.communicate(timeout=1)
-                        mem_info = stdout.decode()
-                        
-                        # 解析内存频率
-                        speed_match = re.search(r"Speed:\s*(\d+)\s*MHz", mem_info)
-                        if speed_match:
-                            memory_info["frequency"] = speed_match.group(1)
-                    except (subprocess.TimeoutExpired, subprocess.SubprocessError):
-                        # 如果超时或者不存在dmidecode，使用默认值
-                        pass
-                except subprocess.TimeoutExpired:
-                    proc.kill()
-                    # 使用默认值
-                    pass
-                
-            except Exception as e:
-                # 如果出错，使用已设置的默认值
-                pass
-        
-        # Windows系统下使用wmic命令
-        elif platform.system() == "Windows":
-            try:
-                # 获取内存类型
-                proc = subprocess.Popen(["wmic", "memorychip", "get", "SMBIOSMemoryType"], 
-                                      stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                try:
-                    stdout, stderr = proc.communicate(timeout=2)
-                    memory_type_output = stdout.decode()
-                    
-                    if "21" in memory_type_output:  # 21对应DDR2
-                        memory_info["type"] = "DDR2"
-                    elif "24" in memory_type_output:  # 24对应DDR3
-                        memory_info["type"] = "DDR3"
-                    elif "26" in memory_type_output:  # 26对应DDR4
-                        memory_info["type"] = "DDR4"
-                    elif "30" in memory_type_output:  # 30对应DDR5
-                        memory_info["type"] = "DDR5"
-                except subprocess.TimeoutExpired:
-                    proc.kill()
-                    # 使用默认值
-                    
-                # 获取内存频率 (添加超时)
-                proc = subprocess.Popen(["wmic", "memorychip", "get", "Speed"], 
-                                      stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                try:
-                    stdout, stderr = proc.communicate(timeout=2)
-                    memory_speed_output = stdout.decode()
-                    
-                    speed_match = re.search(r"(\d+)", memory_speed_output)
-                    if speed_match:
-                        memory_info["frequency"] = speed_match.group(1)
-                except subprocess.TimeoutExpired:
-                    proc.kill()
-                    # 使用默认值
-                    
-            except Exception as e:
-                # 错误处理，已设置默认值
-                pass
-        
-        return memory_info
+        return {
+            "total": mem.total,
+            "used": mem.used,
+            "free": mem.available,
+            "percent": mem.percent,
+        }
     
-    @staticmethod
-    def get_disk_info():
-        disks = []
+    def get_disk_info(self):
+        """获取各挂载点容量与磁盘I/O速率
+
+        容量在后台线程中探测，失联的网络挂载点标记为 available=False，不阻塞采集。
+        """
         try:
-            for partition in psutil.disk_partitions(all=False):
-                # 跳过CD-ROM等特殊设备（Windows系统）
-                if platform.system() == "Windows" and "cdrom" in partition.opts.lower():
-                    continue
-                    
-                try:
-                    usage = psutil.disk_usage(partition.mountpoint)
-                    disk_info = {
-                        'device': partition.device,
-                        'mountpoint': partition.mountpoint,
-                        'filesystem': partition.fstype,
-                        'total': usage.total,
-                        'used': usage.used,
-                        'free': usage.free,
-                        'percent': usage.percent
-                    }
-                    
-                    # 在Linux/Mac系统上尝试获取磁盘IO统计
-                    if platform.system() != "Windows":
-                        try:
-                            disk_io = psutil.disk_io_counters(perdisk=True)
-                            device_name = os.path.basename(partition.device)
-                            if device_name in disk_io:
-                                io_info = disk_io[device_name]
-                                disk_info.update({
-                                    'read_bytes': io_info.read_bytes,
-                                    'write_bytes': io_info.write_bytes
-                                })
-                        except:
-                            pass
-                            
-                    disks.append(disk_info)
-                except:
-                    continue
+            return self.disk_collector.sample()
         except Exception as e:
             return [{'error': str(e)}]
-        return disks
     
-    def get_system_info(self):
-        try:
-            boot_time = datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
-            
-            info = {
-                'os': f"{platform.system()} {platform.release()}",
-                'version': platform.version(),
-                'machine': platform.machine(),
-                'processor': platform.processor(),
-                'boot_time': boot_time,
-                'network_speed': self._get_network_speed(),
-            }
-            
-            # 获取网络接口信息
-            try:
-                network = psutil.net_if_addrs()
-                net_info = {}
-                for interface, addresses in network.items():
-                    net_info[interface] = [str(addr.address) for addr in addresses if addr.family.name in ('AF_INET', 'AF_INET6')]
-                info['network_interfaces'] = net_info
-            except:
-                pass
-                
-            return info
-        except Exception as e:
-            return {
-                'error': str(e)
-            }
+    def get_gpu_info(self):
+        """获取GPU实时信息，读数来自常驻的nvidia-smi进程，不再每次创建子进程
 
-    @staticmethod
-    def get_gpu_info():
-        if not GPU_AVAILABLE:
-            return [{'error': 'GPU监控未启用或未安装GPUtil'}]
+        首次调用时启动nvidia-smi并等待第一批读数；没有nvidia-smi或驱动不可用时返回空列表，
+        不保留后台线程，GPU_RETRY_AFTER 秒后再检查。
+        """
+        collector = self.gpu.get()
+        if collector is None:
+            return []
+        if not collector.running:
+            collector.start()
         
         try:
-            gpus = GPUtil.getGPUs()
             gpu_info = []
-            
-            def format_memory(mb):
-                """将MB转换为更友好的显示格式"""
-                if mb >= 1024:
-                    return f"{mb/1024:.1f} GB"
-                return f"{mb:.0f} MB"
-            
-            for i, gpu in enumerate(gpus):
-                try:
-                    # 确保load值有效，否则通过nvidia-smi获取
-                    load = gpu.load
-                    if load is None or load < 0:
-                        load = 0
-                        # 尝试通过nvidia-smi获取GPU利用率
-                        try:
-                            cmd = [
-                                "nvidia-smi", 
-                                f"--id={gpu.id}", 
-                                "--query-gpu=utilization.gpu", 
-                                "--format=csv,noheader,nounits"
-                            ]
-                            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                            stdout, stderr = proc.communicate(timeout=2)
-                            util_output = stdout.decode().strip()
-                            if util_output and util_output.replace('.', '', 1).isdigit():
-                                load = float(util_output) / 100.0
-                        except:
-                            pass
-                    
-                    # 构建GPU信息
-                    info = {
-                        'name': gpu.name,
-                        'id': gpu.id,
-                        'load': load * 100,  # 转换为百分比
-                        'memory': {
-                            'total': format_memory(gpu.memoryTotal),
-                            'used': format_memory(gpu.memoryUsed),
-                            'free': format_memory(gpu.memoryFree),
-                            'total_raw': gpu.memoryTotal,
-                            'used_raw': gpu.memoryUsed,
-                            'percent': (gpu.memoryUsed / gpu.memoryTotal) * 100 if gpu.memoryTotal > 0 else 0
-                        },
-                        'temperature': None,
-                        'uuid': gpu.uuid,
-                        'core_clock': "1500",
-                        'memory_clock': "7000",
-                        'power_draw': "120"
-                    }
-                    
-                    # 记录调试信息
-                    print(f"GPU {i} 信息: 负载={info['load']}%, 内存使用率={info['memory']['percent']}%")
-                    
-                    # 获取温度信息
-                    if hasattr(gpu, 'temperature') and gpu.temperature is not None:
-                        info['temperature'] = gpu.temperature
-                    else:
-                        # 使用nvidia-smi获取温度
-                        try:
-                            cmd = [
-                                "nvidia-smi", 
-                                f"--id={gpu.id}", 
-                                "--query-gpu=temperature.gpu", 
-                                "--format=csv,noheader,nounits"
-                            ]
-                            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                            stdout, stderr = proc.communicate(timeout=2)
-                            temp_output = stdout.decode().strip()
-                            if temp_output and temp_output.isdigit():
-                                info['temperature'] = int(temp_output)
-                        except:
-                            pass
-                    
-                    gpu_info.append(info)
-                except Exception as e:
-                    print(f"处理GPU {i} 信息时出错: {str(e)}")
-                    # 添加具有默认值的GPU以保持索引一致性
-                    gpu_info.append({
-                        'name': gpu.name if hasattr(gpu, 'name') else f"GPU {i}",
-                        'id': i,
-                        'load': 0,
-                        'memory': {'percent': 0, 'total': '0 GB', 'used': '0 GB'},
-                        'temperature': None,
-                        'error': str(e)
-                    })
-            
+            for reading in collector.readings():
+                memory_total = reading['memory.total'] or 0
+                memory_used = reading['memory.used'] or 0
+                memory_free = reading['memory.free'] or 0
+                # 构建GPU信息，名称和UUID见get_inventory()
+                gpu_info.append({
+                    'id': reading['index'],
+                    'load': reading['utilization.gpu'] or 0,
+                    'memory': {
+                        'total': self._format_gpu_memory(memory_total),
+                        'used': self._format_gpu_memory(memory_used),
+                        'free': self._format_gpu_memory(memory_free),
+                        'total_raw': memory_total,
+                        'used_raw': memory_used,
+                        'percent': (memory_used / memory_total) * 100 if memory_total > 0 else 0,
+                        'utilization': reading['utilization.memory'],
+                    },
+                    'temperature': reading['temperature.gpu'],
+                    'core_clock': reading['clocks.gr'],
+                    'memory_clock': reading['clocks.mem'],
+                    'power_draw': reading['power.draw'],
+                    'power_limit': reading['power.limit'],
+                    'fan_speed': reading['fan.speed'],
+                    'ecc_errors': {
+                        'corrected': reading['ecc.errors.corrected.volatile.total'],
+                        'uncorrected': reading['ecc.errors.uncorrected.volatile.total'],
+                    },
+                    'stale': reading['stale'],
+                })
             return gpu_info
         except Exception as e:
             print(f"获取GPU信息时出错: {str(e)}")
@@ -343,41 +238,22 @@ class HardwareInfo:
         return self.temp_monitor.get_temperatures()
 
     def get_network_info(self):
-        """获取网络信息，包括上传和下载的字节数"""
-        network_info = {}
-        
+        """获取网络信息：汇总与各网卡的收发字节数、吞吐、包速率、错误与丢包速率"""
         try:
-            net_io = psutil.net_io_counters()
-            network_info["rx_bytes"] = net_io.bytes_recv  # 接收的总字节数
-            network_info["tx_bytes"] = net_io.bytes_sent  # 发送的总字节数
-            
-            # 计算网速
-            current_time = time()
-            if self._last_net_io and self._last_net_time:
-                time_diff = current_time - self._last_net_time
-                if time_diff > 0:
-                    rx_diff = net_io.bytes_recv - self._last_net_io.bytes_recv
-                    tx_diff = net_io.bytes_sent - self._last_net_io.bytes_sent
-                    
-                    network_info["rx_speed"] = rx_diff / time_diff  # 字节/秒
-                    network_info["tx_speed"] = tx_diff / time_diff  # 字节/秒
-            
-            # 更新上次的网络IO数据
-            self._last_net_io = net_io
-            self._last_net_time = current_time
-            
+            return self.network_collector.sample()
         except Exception as e:
-            network_info["rx_bytes"] = 0
-            network_info["tx_bytes"] = 0
-            network_info["rx_speed"] = 0
-            network_info["tx_speed"] = 0
-            
-        return network_info
+            return {
+                "rx_bytes": 0,
+                "tx_bytes": 0,
+                "rx_speed": 0,
+                "tx_speed": 0,
+                "interfaces": {},
+                "error": str(e),
+            }
 
     def get_all_info(self):
-        """获取所有硬件信息"""
+        """获取所有实时硬件信息，静态信息见get_inventory()"""
         system_info = {
-            "hostname": platform.node(),
             "uptime": self.get_uptime()
         }
         
@@ -391,6 +267,37 @@ class HardwareInfo:
             'system': system_info
         }
 
+    def register_collectors(self, scheduler, interval, intervals=None):
+        """把各数据源注册到调度器，intervals可覆盖默认的采集周期
+
+        磁盘I/O速率随采样周期计算，挂载点容量由DiskCollector按自身周期探测；
+        硬件清单只采集一次；进程列表与cgroup数据量较大，均不放入快照。没有cgroup v2时不注册cgroup数据源。
+        返回跟随采样周期的数据源名称，自适应采样调整周期时随之调整。
+        """
+        intervals = {**COLLECTOR_INTERVALS, **(intervals or {})}
+
+        def every(name):
+            return intervals.get(name) or interval
+
+        scheduler.register('cpu', self.get_cpu_info, every('cpu'), budget=0.5)
+        scheduler.register('memory', self.get_memory_info, every('memory'), budget=0.5)
+        scheduler.register('gpu', self.get_gpu_info, every('gpu'), budget=GPU_READY_TIMEOUT + 1)
+        # 通过lambda访问采集器，注册时不创建，第一次采集时才创建
+        scheduler.register('network', lambda: self.network_collector.sample(), every('network'), budget=0.5)
+        scheduler.register('disk', lambda: self.disk_collector.sample(), every('disk'),
+                           budget=self.disk_probe_timeout + 1)
+        scheduler.register('temperatures', lambda: self.temp_monitor.get_temperatures(), every('temperatures'),
+                           budget=2)
+        scheduler.register('system', lambda: {'uptime': self.get_uptime()}, every('system'), budget=0.5)
+        scheduler.register('processes', lambda: self.process_collector.sample(), every('processes'), budget=2,
+                           publish=False)
+        # 只检查挂载点，不创建cgroup采集器
+        if cgroup2_root(self.cgroup_root) is not None:
+            scheduler.register('cgroups', lambda: self.cgroup_collector.sample(), every('cgroups'),
+                               budget=self.cgroup_budget + 1, publish=False)
+        scheduler.register('inventory', self.get_inventory, 0, once=True, budget=60, publish=False)
+        return [name for name, value in intervals.items() if not value]
+
     def get_uptime(self):
         """获取系统运行时间"""
         try:
@@ -408,32 +315,5 @@ class HardwareInfo:
             else:
                 return f"{minutes}分钟"
         except:
+            instrumentation.record_exception('system.uptime')
             return "未知"
-
-    def _get_network_speed(self):
-        """获取网络速度"""
-        current_net_io = psutil.net_io_counters()
-        current_time = time()
-        
-        if self._last_net_io is None or self._last_net_time is None:
-            self._last_net_io = current_net_io
-            self._last_net_time = current_time
-            return {
-                'upload': 0,
-                'download': 0
-            }
-        
-        time_elapsed = current_time - self._last_net_time
-        
-        # 计算速度（bytes/s）
-        upload_speed = (current_net_io.bytes_sent - self._last_net_io.bytes_sent) / time_elapsed
-        download_speed = (current_net_io.bytes_recv - self._last_net_io.bytes_recv) / time_elapsed
-        
-        # 更新上次的值
-        self._last_net_io = current_net_io
-        self._last_net_time = current_time
-        
-        return {
-            'upload': upload_speed,
-            'download': download_speed
-        } 
\ No newline at end of file
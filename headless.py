@@ -0,0 +1,213 @@
+"""无界面模式：只运行采集与JSON接口，不加载Flask、模板与静态资源
+
+用于资源紧张的节点：HTTP服务只用标准库，启动时只导入采集相关的模块，各可选数据源
+（sysfs温度、pysensors、nvidia-smi、cpuinfo）在第一次采集时才加载。启动即开始采样。
+
+用法:
+    python headless.py --host 0.0.0.0 --port 5000 --interval 1
+
+接口（参数与完整服务一致）:
+    /api/hardware_info  最新快照，支持 If-None-Match（304）、since_seq 增量与gzip
+    /api/history        服务端历史（series、since、until、step），不含多分辨率聚合
+    /api/processes      按CPU、内存或I/O排序的前N个进程
+    /api/cgroups        cgroup v2 各容器/slice的资源占用
+    /api/self           监控程序自身的运行状况
+    /metrics            Prometheus文本格式的指标
+"""
+import argparse
+import logging
+import os
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import instrumentation
+from cgroup_collector import select_cgroups
+from hardware_info import HardwareInfo
+from history import HistoryStore, DEFAULT_CAPACITY, extract_series
+from metrics import MetricsCache, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from payload import PayloadCache, encode_json
+from sampler import Sampler, DEFAULT_INTERVAL, parse_seq
+from scheduler import parse_intervals
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+# 首次采集完成前，请求最多等待的秒数
+FIRST_SNAPSHOT_TIMEOUT = 10
+JSON_TYPE = 'application/json'
+
+# (状态码, 响应头, 响应体)
+Reply = Tuple[int, Dict[str, str], bytes]
+
+
+def json_reply(data: Any, status: int = 200) -> Reply:
+    return status, {'Content-Type': JSON_TYPE, 'Cache-Control': 'no-store'}, encode_json(data)
+
+
+class HeadlessMonitor:
+    """采样器、内存历史与响应缓存，不依赖Flask"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.hardware_info = HardwareInfo.from_env()
+        self.sampler = Sampler(self.hardware_info, interval=interval,
+                               intervals=parse_intervals(os.environ.get('MONITOR_COLLECTOR_INTERVALS')))
+        self.history = HistoryStore(capacity=int(os.environ.get('MONITOR_HISTORY_SIZE', DEFAULT_CAPACITY)))
+        self.payload_cache = PayloadCache()
+        self.metrics_cache = MetricsCache(self.hardware_info.cached_inventory)
+        self.sampler.subscribe(self.record_history)
+
+    def record_history(self, snapshot):
+        self.history.record_points(snapshot.timestamp, list(extract_series(snapshot.data)))
+
+    def current_snapshot(self):
+        return self.sampler.latest() or self.sampler.wait(FIRST_SNAPSHOT_TIMEOUT)
+
+    # ---- 接口 ----
+
+    def latest(self, query: Dict[str, str], headers) -> Reply:
+        snapshot = self.current_snapshot()
+        if snapshot is None:
+            return json_reply({'error': '硬件信息采集中'}, 503)
+        etag = f'W/"{snapshot.seq}"'
+        base_version = parse_seq(query.get('since_seq'), self.sampler.epoch)
+        common = {'ETag': etag, 'X-Snapshot-Seq': snapshot.seq, 'Cache-Control': 'no-cache'}
+        if etag in headers.get('If-None-Match', '') or base_version == snapshot.version:
+            return 304, common, b''
+        # 基准快照已被淘汰（或服务已重启）时返回完整数据
+        base = self.sampler.get(base_version) if base_version is not None and base_version < snapshot.version else None
+        body, compressed = self.payload_cache.body(
+            snapshot, base,
+            columnar=query.get('format') == 'columnar',
+            accept_gzip='gzip' in headers.get('Accept-Encoding', ''),
+        )
+        response_headers = {**common, 'Content-Type': JSON_TYPE, 'Vary': 'Accept-Encoding'}
+        if base is not None:
+            response_headers['X-Delta-Base'] = base.seq
+        if compressed:
+            response_headers['Content-Encoding'] = 'gzip'
+        return 200, response_headers, body
+
+    def history_query(self, query: Dict[str, str], headers) -> Reply:
+        series = [name for name in query.get('series', '').split(',') if name]
+        return json_reply(self.history.query(
+            series or None,
+            since=_float(query.get('since')),
+            until=_float(query.get('until')),
+            step=_float(query.get('step')),
+        ))
+
+    def processes(self, query: Dict[str, str], headers) -> Reply:
+        return json_reply(self.hardware_info.process_collector.top(query.get('sort', 'cpu'),
+                                                                   _int(query.get('limit')) or 20))
+
+    def cgroups(self, query: Dict[str, str], headers) -> Reply:
+        return json_reply(select_cgroups(self.hardware_info.cgroup_collector.latest(), query.get('sort', 'cpu'),
+                                         _int(query.get('limit')) or 20, query.get('prefix', '')))
+
+    def self_report(self, query: Dict[str, str], headers) -> Reply:
+        report = instrumentation.registry.report()
+        report['scheduler'] = self.sampler.scheduler.status()
+        report['backends'] = self.hardware_info.backend_status()
+        report['history_bytes'] = self.history.nbytes
+        return json_reply(report)
+
+    def metrics(self, query: Dict[str, str], headers) -> Reply:
+        snapshot = self.current_snapshot()
+        if snapshot is None:
+            return 503, {'Content-Type': 'text/plain'}, '# 硬件信息采集中\n'.encode()
+        body, compressed = self.metrics_cache.body(snapshot, 'gzip' in headers.get('Accept-Encoding', ''))
+        response_headers = {'Content-Type': METRICS_CONTENT_TYPE, 'Vary': 'Accept-Encoding'}
+        if compressed:
+            response_headers['Content-Encoding'] = 'gzip'
+        return 200, response_headers, body
+
+    def routes(self) -> Dict[str, Callable[[Dict[str, str], Any], Reply]]:
+        return {
+            '/api/hardware_info': self.latest,
+            '/api/history': self.history_query,
+            '/api/processes': self.processes,
+            '/api/cgroups': self.cgroups,
+            '/api/self': self.self_report,
+            '/metrics': self.metrics,
+        }
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    routes: Dict[str, Callable[[Dict[str, str], Any], Reply]] = {}
+
+    def do_GET(self):
+        started = monotonic()
+        parts = urlsplit(self.path)
+        route = self.routes.get(parts.path)
+        if route is None:
+            status, headers, body = json_reply({'error': '未知接口'}, 404)
+        else:
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            try:
+                status, headers, body = route(query, self.headers)
+            except Exception as e:
+                logging.error(f"处理请求 {parts.path} 失败: {str(e)}")
+                logging.error(traceback.format_exc())
+                status, headers, body = json_reply({'error': str(e)}, 500)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+        instrumentation.observe('routes', parts.path if route is not None else 'unmatched', monotonic() - started)
+
+    def log_message(self, format, *args):
+        # 不记录逐请求的访问日志
+        pass
+
+
+def make_server(monitor: HeadlessMonitor, host: str, port: int) -> ThreadingHTTPServer:
+    handler = type('MonitorHandler', (Handler,), {'routes': monitor.routes()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='硬件监控无界面模式，只提供采集与JSON接口')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--interval', type=float, default=float(os.environ.get('MONITOR_INTERVAL', DEFAULT_INTERVAL)),
+                        help='采样周期（秒）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    monitor = HeadlessMonitor(interval=args.interval)
+    server = make_server(monitor, args.host, args.port)
+    monitor.sampler.start()
+    logging.info(f"无界面模式启动，监听 {args.host}:{args.port}，每 {args.interval:g} 秒采样")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        monitor.sampler.stop(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+import fnmatch
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hwmon import core_temperatures
+
+DEFAULT_CAPACITY = 3600
+DEFAULT_MAX_SERIES = 4096
+
+
+class RingBuffer:
+    """固定容量的环形缓冲区，时间戳为uint32秒，数值为float32
+
+    每个点占用8字节，内存在创建时一次分配，之后不再增长。
+    """
+    __slots__ = ('capacity', 'timestamps', 'values', '_head', '_size')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array('I', bytes(4 * capacity))
+        self.values = array('f', bytes(4 * capacity))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp: float, value: float):
+        self.timestamps[self._head] = int(timestamp)
+        self.values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def _start(self) -> int:
+        return (self._head - self._size) % self.capacity
+
+    def _search(self, since: int) -> int:
+        # 数据按时间追加，二分查找第一个 >= since 的位置
+        lo, hi = 0, self._size
+        start = self._start()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[(start + mid) % self.capacity] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def items(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Tuple[int, float]]:
+        """按时间顺序返回 (时间戳, 数值)"""
+        first = self._search(int(since)) if since is not None else 0
+        start = self._start()
+        for i in range(first, self._size):
+            index = (start + i) % self.capacity
+            timestamp = self.timestamps[index]
+            if until is not None and timestamp > until:
+                break
+            yield timestamp, self.values[index]
+
+    def last(self) -> Optional[Tuple[int, float]]:
+        if not self._size:
+            return None
+        index = (self._head - 1) % self.capacity
+        return self.timestamps[index], self.values[index]
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * (self.timestamps.itemsize + self.values.itemsize)
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def extract_series(data: Dict[str, Any]) -> Iterator[Tuple[str, float]]:
+    """从一次采集结果中提取需要保存趋势的数值序列"""
+    cpu = data.get('cpu') or {}
+    value = _number(cpu.get('total_usage'))
+    if value is not None:
+        yield 'cpu.total', value
+    per_core = cpu.get('usage_per_core') or []
+    for i, usage in enumerate(per_core):
+        usage = _number(usage)
+        if usage is not None:
+            yield f'cpu.core.{i}', usage
+    if per_core:
+        usages = [u for u in per_core if _number(u) is not None]
+        if usages:
+            yield 'cpu.max_core', float(max(usages))
+    times = cpu.get('times') or {}
+    for field in ('iowait', 'steal'):
+        value = _number(times.get(field))
+        if value is not None:
+            yield f'cpu.{field}', value
+
+    temps = data.get('temperatures') or {}
+    core_temps = [value for _, _, value in core_temperatures(temps)]
+    if core_temps:
+        yield 'cpu.temperature', sum(core_temps) / len(core_temps)
+
+    memory = data.get('memory') or {}
+    for field in ('percent', 'used'):
+        value = _number(memory.get(field))
+        if value is not None:
+            yield f'memory.{field}', value
+
+    for gpu in data.get('gpu') or []:
+        if not isinstance(gpu, dict) or 'id' not in gpu:
+            continue
+        prefix = f"gpu.{gpu['id']}"
+        value = _number(gpu.get('load'))
+        if value is not None:
+            yield f'{prefix}.load', value
+        value = _number((gpu.get('memory') or {}).get('percent'))
+        if value is not None:
+            yield f'{prefix}.memory', value
+        value = _number(gpu.get('temperature'))
+        if value is not None:
+            yield f'{prefix}.temperature', value
+
+    network = data.get('network') or {}
+    for field, name in (('rx_speed', 'net.rx'), ('tx_speed', 'net.tx')):
+        value = _number(network.get(field))
+        if value is not None:
+            yield name, value
+    for nic, info in (network.get('interfaces') or {}).items():
+        for field, name in (('rx_speed', 'rx'), ('tx_speed', 'tx')):
+            value = _number(info.get(field))
+            if value is not None:
+                yield f'net.{nic}.{name}', value
+
+    for disk in data.get('disk') or []:
+        if not isinstance(disk, dict) or not disk.get('mountpoint'):
+            continue
+        for field, name in (('percent', 'percent'), ('read_speed', 'read'), ('write_speed', 'write'),
+                            ('utilization', 'util')):
+            value = _number(disk.get(field))
+            if value is not None:
+                yield f"disk.{disk['mountpoint']}.{name}", value
+
+
+class HistoryStore:
+    """服务端指标历史，每个序列一个固定容量的环形缓冲区
+
+    内存上限为 max_series * capacity * 8 字节，与运行时长无关。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_series: int = DEFAULT_MAX_SERIES):
+        self.capacity = capacity
+        self.max_series = max_series
+        self._series: Dict[str, RingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, timestamp: float, value: float):
+        with self._lock:
+            self._add(name, timestamp, value)
+
+    def _add(self, name: str, timestamp: float, value: float):
+        buffer = self._series.get(name)
+        if buffer is None:
+            if len(self._series) >= self.max_series:
+                return
+            buffer = self._series[name] = RingBuffer(self.capacity)
+        buffer.append(timestamp, value)
+
+    def record(self, timestamp: float, data: Dict[str, Any]):
+        """保存一次采集结果中的所有序列"""
+        self.record_points(timestamp, list(extract_series(data)))
+
+    def record_points(self, timestamp: float, points: Iterable[Tuple[str, float]]):
+        with self._lock:
+            for name, value in points:
+                self._add(name, timestamp, value)
+
+    def series_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def match(self, patterns: Iterable[str]) -> List[str]:
+        """按名称或通配符（如 cpu.core.*）匹配序列"""
+        names = self.series_names()
+        matched = {}
+        for pattern in patterns:
+            for name in names:
+                if name not in matched and (name == pattern or fnmatch.fnmatchcase(name, pattern)):
+                    matched[name] = True
+        return list(matched)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(buffer.nbytes for buffer in self._series.values())
+
+    def query(self, patterns: Optional[Iterable[str]] = None, since: Optional[float] = None,
+              until: Optional[float] = None, step: Optional[float] = None) -> Dict[str, Any]:
+        """按列返回历史数据
+
+        所有序列共用一条时间轴，某序列在该时刻没有数据时为None。指定step（秒）
+        时按step对齐分桶并取平均值。
+        """
+        names = self.match(patterns) if patterns else self.series_names()
+        step = int(step) if step and step > 1 else None
+        # 每个序列为平行的时间戳与数值列表；时间戳精度为秒，同一秒内的多个样本（亚秒采样、回放与实时数据重叠）都保留
+        columns: Dict[str, Tuple[List[int], List[float]]] = {}
+        with self._lock:
+            for name in names:
+                buffer = self._series.get(name)
+                if buffer is None:
+                    continue
+                if step is None:
+                    stamps, values = [], []
+                    for timestamp, value in buffer.items(since, until):
+                        stamps.append(timestamp)
+                        values.append(value)
+                    columns[name] = (stamps, values)
+                    continue
+                sums: Dict[int, List[float]] = {}
+                for timestamp, value in buffer.items(since, until):
+                    bucket = sums.setdefault(timestamp - timestamp % step, [0.0, 0])
+                    bucket[0] += value
+                    bucket[1] += 1
+                buckets = sorted(sums)
+                columns[name] = (buckets, [sums[ts][0] / sums[ts][1] for ts in buckets])
+
+        # 共用时间轴：同一时间戳出现的次数取各序列中的最大值，各序列的第k个同秒样本对齐到该秒的第k个位置
+        counts: Dict[int, int] = {}
+        for stamps, _ in columns.values():
+            seen: Dict[int, int] = {}
+            for timestamp in stamps:
+                seen[timestamp] = seen.get(timestamp, 0) + 1
+            for timestamp, count in seen.items():
+                if count > counts.get(timestamp, 0):
+                    counts[timestamp] = count
+        timestamps: List[int] = []
+        offsets: Dict[int, int] = {}
+        for timestamp in sorted(counts):
+            offsets[timestamp] = len(timestamps)
+            timestamps.extend([timestamp] * counts[timestamp])
+
+        series = {}
+        for name, (stamps, values) in columns.items():
+            column: List[Optional[float]] = [None] * len(timestamps)
+            seen = {}
+            for timestamp, value in zip(stamps, values):
+                occurrence = seen.get(timestamp, 0)
+                seen[timestamp] = occurrence + 1
+                column[offsets[timestamp] + occurrence] = self._round(value)
+            series[name] = column
+        return {
+            'timestamps': timestamps,
+            'step': step,
+            'series': series,
+        }
+
+    @staticmethod
+    def _round(value):
+        # float32只有约7位有效数字，多余的小数位只会增加响应体积
+        return None if value is None else round(value, 3)
@@ -0,0 +1,213 @@
+import fnmatch
+import gzip
+import io
+import json
+import logging
+import threading
+from time import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from history import HistoryStore
+
+# 中心节点默认保存的序列：不保存每核CPU等高基数序列，控制数百台主机时的内存
+DEFAULT_SERIES = (
+    'cpu.total', 'cpu.max_core', 'cpu.iowait', 'cpu.temperature',
+    'memory.percent', 'memory.used',
+    'gpu.*.load', 'gpu.*.memory', 'gpu.*.temperature',
+    'net.rx', 'net.tx',
+    'disk.*.percent',
+)
+# 每台主机保存最近1小时（5秒一个点）
+DEFAULT_HOST_CAPACITY = 720
+DEFAULT_MAX_SERIES = 64
+DEFAULT_STALE_AFTER = 30
+DEFAULT_MAX_HOSTS = 2000
+# 解压后的推送数据上限
+MAX_PAYLOAD_BYTES = 8 * 1024 * 1024
+
+
+class PushError(ValueError):
+    """推送数据格式错误"""
+
+
+def decode_push(body: bytes, content_encoding: str = '') -> Dict[str, Any]:
+    """解析Agent推送的数据（可gzip压缩）"""
+    if 'gzip' in content_encoding:
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                body = f.read(MAX_PAYLOAD_BYTES + 1)
+        except OSError as e:
+            raise PushError(f"解压失败: {str(e)}")
+    if len(body) > MAX_PAYLOAD_BYTES:
+        raise PushError("推送数据过大")
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise PushError(f"JSON格式错误: {str(e)}")
+    if not isinstance(payload, dict) or not payload.get('host'):
+        raise PushError("缺少host字段")
+    return payload
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_push(payload: Dict[str, Any]):
+    """检查推送数据各字段的类型，JSON合法但类型不对时同样视为格式错误"""
+    if not isinstance(payload.get('host'), str) or not payload['host']:
+        raise PushError("host字段必须是非空字符串")
+    names = payload.get('series') or []
+    if not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names):
+        raise PushError("series字段必须是字符串列表")
+    samples = payload.get('samples') or []
+    if not isinstance(samples, (list, tuple)):
+        raise PushError("samples字段必须是列表")
+    for sample in samples:
+        if not sample:
+            continue
+        if not isinstance(sample, (list, tuple)) or not _is_number(sample[0]):
+            raise PushError("样本必须是 [时间戳, 值...] 形式的列表")
+        if not all(value is None or _is_number(value) for value in sample[1:]):
+            raise PushError("样本值必须是数字或null")
+    for key in ('inventory', 'latest'):
+        if payload.get(key) is not None and not isinstance(payload[key], dict):
+            raise PushError(f"{key}字段必须是对象")
+
+
+class HostState:
+    """中心节点上一台主机的状态"""
+
+    def __init__(self, name: str, capacity: int, max_series: int):
+        self.name = name
+        self.address: Optional[str] = None
+        self.inventory: Optional[Dict[str, Any]] = None
+        self.latest: Optional[Dict[str, Any]] = None
+        self.latest_timestamp: Optional[float] = None
+        self.last_seen: Optional[float] = None
+        self.summary: Dict[str, Any] = {}
+        self.samples = 0
+        self.history = HistoryStore(capacity=capacity, max_series=max_series)
+
+
+def summarize(values: Dict[str, float]) -> Dict[str, Any]:
+    """从一次采样的序列值中提取总览页需要的几个数字"""
+    gpu_loads = [v for name, v in values.items() if name.startswith('gpu.') and name.endswith('.load')]
+    gpu_temps = [v for name, v in values.items() if name.startswith('gpu.') and name.endswith('.temperature')]
+    disks = [v for name, v in values.items() if name.startswith('disk.') and name.endswith('.percent')]
+    return {
+        'cpu': values.get('cpu.total'),
+        'memory': values.get('memory.percent'),
+        'gpu_count': len(gpu_loads),
+        'gpu_load': round(sum(gpu_loads) / len(gpu_loads), 1) if gpu_loads else None,
+        'gpu_temperature': max(gpu_temps) if gpu_temps else None,
+        'disk': max(disks) if disks else None,
+        'net_rx': values.get('net.rx'),
+        'net_tx': values.get('net.tx'),
+    }
+
+
+class Hub:
+    """多主机汇聚
+
+    Agent定期批量推送 {'host', 'series': [序列名...], 'samples': [[时间戳, 值...], ...],
+    'latest': 最新完整快照, 'inventory': 硬件清单（首次或中心要求时）}。中心为每台主机
+    维护固定容量的历史（只保存 series_patterns 匹配的序列）与最新快照，
+    总览数据在写入时计算，读取时不需要遍历历史。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HOST_CAPACITY, series_patterns: Iterable[str] = DEFAULT_SERIES,
+                 stale_after: float = DEFAULT_STALE_AFTER, max_hosts: int = DEFAULT_MAX_HOSTS,
+                 max_series: int = DEFAULT_MAX_SERIES):
+        self.capacity = capacity
+        self.series_patterns = tuple(series_patterns)
+        self.stale_after = stale_after
+        self.max_hosts = max_hosts
+        self.max_series = max_series
+        self._hosts: Dict[str, HostState] = {}
+        self._wanted: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def _keep(self, name: str) -> bool:
+        """序列名是否需要保存，结果缓存，避免每个点都做通配符匹配"""
+        keep = self._wanted.get(name)
+        if keep is None:
+            keep = any(fnmatch.fnmatchcase(name, pattern) for pattern in self.series_patterns)
+            if len(self._wanted) < 100000:
+                self._wanted[name] = keep
+        return keep
+
+    def _host(self, name: str) -> HostState:
+        host = self._hosts.get(name)
+        if host is None:
+            with self._lock:
+                host = self._hosts.get(name)
+                if host is None:
+                    if len(self._hosts) >= self.max_hosts:
+                        raise PushError("主机数量超过上限")
+                    host = self._hosts[name] = HostState(name, self.capacity, self.max_series)
+                    logging.info(f"新主机接入: {name}")
+        return host
+
+    def ingest(self, payload: Dict[str, Any], address: Optional[str] = None) -> Dict[str, Any]:
+        """写入一次推送，返回给Agent的应答
+
+        先检查整份数据再写入，格式错误（PushError）时不会留下写了一半的样本。
+        """
+        check_push(payload)
+        host = self._host(payload['host'])
+        now = time()
+        names = payload.get('series') or []
+        keep = [(index, name) for index, name in enumerate(names) if self._keep(name)]
+        samples = [sample for sample in payload.get('samples') or [] if sample]
+        for sample in samples:
+            values = sample[1:]
+            points = [(name, values[index]) for index, name in keep
+                      if index < len(values) and values[index] is not None]
+            host.history.record_points(sample[0], points)
+        if samples:
+            values = samples[-1][1:]
+            host.summary = summarize({name: value for name, value in zip(names, values) if value is not None})
+            host.latest_timestamp = samples[-1][0]
+            host.samples += len(samples)
+
+        if payload.get('inventory'):
+            host.inventory = payload['inventory']
+        if payload.get('latest') is not None:
+            host.latest = payload['latest']
+        host.last_seen = now
+        host.address = address
+        return {'ok': True, 'need_inventory': host.inventory is None}
+
+    def host(self, name: str) -> Optional[HostState]:
+        return self._hosts.get(name)
+
+    def hosts(self) -> List[Dict[str, Any]]:
+        """所有主机的总览，按主机名排序"""
+        now = time()
+        with self._lock:
+            hosts = list(self._hosts.values())
+        result = []
+        for host in sorted(hosts, key=lambda h: h.name):
+            system = (host.inventory or {}).get('system', {})
+            cpu = (host.inventory or {}).get('cpu', {})
+            result.append({
+                'host': host.name,
+                'address': host.address,
+                'os': system.get('os'),
+                'cpu_name': cpu.get('name'),
+                'last_seen': host.last_seen,
+                'stale': host.last_seen is None or now - host.last_seen > self.stale_after,
+                **host.summary,
+            })
+        return result
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            return self._hosts.pop(name, None) is not None
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return sum(host.history.nbytes for host in hosts)
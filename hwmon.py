@@ -0,0 +1,251 @@
+import logging
+import os
+import re
+import threading
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+
+import instrumentation
+
+DEFAULT_ROOT = '/sys'
+# 每隔多少秒检查一次传感器目录是否变化（热插拔），并重试读取失败的传感器
+DEFAULT_RESCAN_INTERVAL = 30
+TEMP_INPUT_RE = re.compile(r'^temp(\d+)_input$')
+CORE_LABEL_RE = re.compile(r'core\s*(\d+)', re.IGNORECASE)
+PACKAGE_LABEL_RE = re.compile(r'package\s*id\s*(\d+)', re.IGNORECASE)
+DEVICE_INDEX_RE = re.compile(r'\.(\d+)$')
+
+
+def core_index(label: str) -> Optional[int]:
+    """从 'Core 3' / 'core3' 这类标签中取出核心编号，不是核心温度时返回None"""
+    match = CORE_LABEL_RE.search(label or '')
+    return int(match.group(1)) if match else None
+
+
+def package_index(label: str) -> Optional[int]:
+    """从 'Package id 1' 标签中取出CPU插槽编号"""
+    match = PACKAGE_LABEL_RE.search(label or '')
+    return int(match.group(1)) if match else None
+
+
+def core_temperatures(temps: Dict[str, Any]) -> List[Tuple[Tuple[int, int], str, float]]:
+    """从温度字典中取出各核心温度，按 (插槽, 核心编号) 排序，返回 [((插槽, 编号), 名称, 温度)]
+
+    多路CPU上各插槽的核心编号都从0开始，只按编号会互相混淆。sysfs与psutil读取的条目带有
+    'core'/'package' 字段；其他来源（Windows）按标签中的 'Core N' 识别，插槽视为0。
+    """
+    cores = []
+    for name, reading in (temps or {}).items():
+        if not isinstance(reading, dict) or not isinstance(reading.get('value'), (int, float)):
+            continue
+        index = reading['core'] if 'core' in reading else core_index(name)
+        if index is not None:
+            cores.append(((reading.get('package') or 0, index), name, reading['value']))
+    cores.sort(key=lambda item: (item[0], item[1]))
+    return cores
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _read_millidegrees(path: str) -> Optional[float]:
+    value = _read_text(path)
+    try:
+        return int(value) / 1000 if value is not None else None
+    except ValueError:
+        return None
+
+
+class Sensor:
+    """一个温度输入：稳定ID（芯片+序号）、元数据与保持打开的文件描述符"""
+
+    __slots__ = ('id', 'chip', 'label', 'path', 'fd', 'high', 'critical', 'core', 'package', 'retry_at')
+
+    def __init__(self, sensor_id: str, chip: str, label: str, path: str,
+                 high: Optional[float] = None, critical: Optional[float] = None):
+        self.id = sensor_id
+        self.chip = chip
+        self.label = label
+        self.path = path
+        self.fd: Optional[int] = None
+        self.high = high
+        self.critical = critical
+        self.core = core_index(label)
+        # 所在CPU插槽，只有带核心温度的芯片才有
+        self.package: Optional[int] = None
+        # 读取失败后的下次重试时间（monotonic），None 表示正常
+        self.retry_at: Optional[float] = None
+
+    def metadata(self) -> Dict[str, Any]:
+        return {'chip': self.chip, 'label': self.label, 'max': self.high, 'critical': self.critical,
+                'core': self.core, 'package': self.package}
+
+
+class HwmonReader:
+    """直接读取sysfs的温度传感器（/sys/class/hwmon 与 /sys/class/thermal）
+
+    传感器只在启动或目录变化（热插拔）时扫描；每次采集只对保持打开的
+    temp*_input 描述符做一次 pread，不重新列目录、不重新打开文件。未接线或休眠的输入
+    （ENODATA、EAGAIN等）读取失败时只跳过该传感器，每 rescan_interval 秒重试一次。
+    ID 由芯片名与设备名组成（如 coretemp:coretemp.0/temp2），不依赖 hwmonN 的编号，重启后保持不变。
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, rescan_interval: float = DEFAULT_RESCAN_INTERVAL):
+        self.root = root
+        self.rescan_interval = rescan_interval
+        self.sensors: List[Sensor] = []
+        self._listing: Optional[Tuple] = None
+        self._checked = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    @property
+    def hwmon_dir(self) -> str:
+        return os.path.join(self.root, 'class', 'hwmon')
+
+    @property
+    def thermal_dir(self) -> str:
+        return os.path.join(self.root, 'class', 'thermal')
+
+    def _list(self) -> Tuple:
+        listing = []
+        for directory in (self.hwmon_dir, self.thermal_dir):
+            try:
+                listing.append(tuple(sorted(os.listdir(directory))))
+            except OSError:
+                listing.append(())
+        return tuple(listing)
+
+    def _discover_hwmon(self) -> List[Sensor]:
+        sensors = []
+        packages = 0
+        for entry in self._listing[0]:
+            path = os.path.join(self.hwmon_dir, entry)
+            name = _read_text(os.path.join(path, 'name')) or entry
+            device_link = os.path.join(path, 'device')
+            # hwmonN 的编号随加载顺序变化，用设备名区分同名芯片
+            device = os.path.basename(os.path.realpath(device_link)) if os.path.exists(device_link) else entry
+            chip = f'{name}:{device}'
+            try:
+                files = os.listdir(path)
+            except OSError:
+                continue
+            inputs = sorted((int(m.group(1)), f) for f in files for m in [TEMP_INPUT_RE.match(f)] if m)
+            chip_sensors = []
+            for index, filename in inputs:
+                prefix = os.path.join(path, f'temp{index}')
+                chip_sensors.append(Sensor(
+                    f'{chip}/temp{index}', chip,
+                    _read_text(prefix + '_label') or f'{name} temp{index}',
+                    os.path.join(path, filename),
+                    high=_read_millidegrees(prefix + '_max'),
+                    critical=_read_millidegrees(prefix + '_crit'),
+                ))
+            if any(sensor.core is not None for sensor in chip_sensors):
+                # 每路CPU一个coretemp设备：插槽号取自 'Package id N' 标签，其次为设备名后缀（coretemp.N），
+                # 都没有时按出现顺序编号
+                package = next((package_index(sensor.label) for sensor in chip_sensors
+                                if package_index(sensor.label) is not None), None)
+                if package is None:
+                    match = DEVICE_INDEX_RE.search(device)
+                    package = int(match.group(1)) if match else packages
+                packages += 1
+                for sensor in chip_sensors:
+                    sensor.package = package
+            sensors.extend(chip_sensors)
+        return sensors
+
+    def _discover_thermal(self) -> List[Sensor]:
+        sensors = []
+        for entry in self._listing[1]:
+            if not entry.startswith('thermal_zone'):
+                continue
+            path = os.path.join(self.thermal_dir, entry)
+            try:
+                # 带hwmon接口的温区已经出现在 /sys/class/hwmon 中，跳过以免重复
+                if any(name.startswith('hwmon') for name in os.listdir(path)):
+                    continue
+            except OSError:
+                continue
+            if not os.path.exists(os.path.join(path, 'temp')):
+                continue
+            zone_type = _read_text(os.path.join(path, 'type')) or entry
+            chip = f'thermal:{entry}'
+            sensors.append(Sensor(f'{chip}/{zone_type}', chip, zone_type, os.path.join(path, 'temp')))
+        return sensors
+
+    def _close(self):
+        for sensor in self.sensors:
+            if sensor.fd is not None:
+                try:
+                    os.close(sensor.fd)
+                except OSError:
+                    pass
+                sensor.fd = None
+
+    def discover(self):
+        """重新扫描传感器并打开各输入文件"""
+        self._close()
+        self._listing = self._list()
+        sensors = []
+        for sensor in self._discover_hwmon() + self._discover_thermal():
+            try:
+                sensor.fd = os.open(sensor.path, os.O_RDONLY)
+            except OSError:
+                continue
+            sensors.append(sensor)
+        self.sensors = sensors
+        self._checked = monotonic()
+        self._dirty = False
+        self.scans += 1
+        logging.info(f"发现 {len(sensors)} 个sysfs温度传感器（{self.root}）")
+
+    def _maybe_rescan(self):
+        now = monotonic()
+        if self._dirty:
+            self.discover()
+        elif now - self._checked >= self.rescan_interval:
+            self._checked = now
+            if self._list() != self._listing:
+                self.discover()
+
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        """读取所有传感器，返回 {传感器ID: {'value', 'max', 'critical', 'label', 'chip', 'core', 'package'}}"""
+        with self._lock:
+            self._maybe_rescan()
+            now = monotonic()
+            temps = {}
+            for sensor in self.sensors:
+                if sensor.retry_at is not None and now < sensor.retry_at:
+                    continue
+                try:
+                    raw = os.pread(sensor.fd, 32, 0)
+                    value = int(raw) / 1000
+                except (OSError, ValueError, TypeError) as e:
+                    # 暂时不可读的输入只跳过自身；设备移除由目录变化检测发现
+                    if sensor.retry_at is None:
+                        instrumentation.record_exception('temperature.sysfs')
+                        logging.info(f"sysfs温度传感器 {sensor.id} 读取失败，暂时跳过: {e}")
+                    sensor.retry_at = now + self.rescan_interval
+                    continue
+                if sensor.retry_at is not None:
+                    logging.info(f"sysfs温度传感器 {sensor.id} 已恢复")
+                    sensor.retry_at = None
+                temps[sensor.id] = {'value': round(value, 1), 'min': None, **sensor.metadata()}
+            return temps
+
+    def available(self) -> bool:
+        with self._lock:
+            self._maybe_rescan()
+            return bool(self.sensors)
+
+    def close(self):
+        with self._lock:
+            self._close()
+            self.sensors = []
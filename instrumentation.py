@@ -0,0 +1,183 @@
+import os
+import subprocess
+import threading
+from array import array
+from time import monotonic, time
+from typing import Any, Dict, Optional
+
+import psutil
+
+# 每个2的幂区间划分的子桶数（2^4=16），相对误差约6%
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 以微秒记录，最大约 2^40 微秒（12天），更大的值计入最后一个桶
+MAX_SHIFT = 36
+BUCKET_COUNT = (MAX_SHIFT + 2) * SUB_BUCKETS
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _bucket_index(value: int) -> int:
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return min((shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS, BUCKET_COUNT - 1)
+
+
+def _bucket_value(index: int) -> float:
+    """桶的代表值（区间中点）"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    low = (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class Histogram:
+    """HDR风格的对数线性直方图
+
+    固定 608 个计数桶（约5KB），记录一次只是一次下标计算和一次自增，
+    分位数误差约6%，可以在生产环境中常开。数值单位为秒，内部按微秒存储。
+    """
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        index = _bucket_index(max(0, int(seconds * 1e6)))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def percentiles(self, quantiles=PERCENTILES) -> Dict[str, float]:
+        with self._lock:
+            counts = self.counts.tolist()
+            total = self.count
+        result = {}
+        if not total:
+            return result
+        targets = sorted(quantiles)
+        seen = 0
+        position = 0
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            seen += count
+            while position < len(targets) and seen >= total * targets[position] / 100:
+                result[f"p{targets[position]:g}"] = round(_bucket_value(index) / 1e6, 6)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        info = {
+            'count': self.count,
+            'mean': round(self.total / self.count, 6) if self.count else None,
+            'min': round(self.min, 6) if self.min is not None else None,
+            'max': round(self.max, 6) if self.max is not None else None,
+        }
+        for key, value in self.percentiles().items():
+            # 桶中点可能略超出实际范围，收敛到[min, max]
+            info[key] = min(max(value, info['min']), info['max'])
+        return info
+
+
+class Registry:
+    """进程内的自监控数据：各数据源/路由的耗时直方图与各类计数器"""
+
+    def __init__(self):
+        self.started = time()
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._last_cpu = None
+
+    def histogram(self, group: str, name: str) -> Histogram:
+        histograms = self._histograms.get(group, {})
+        histogram = histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(group, {}).setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, group: str, name: str, seconds: float):
+        self.histogram(group, name).record(seconds)
+
+    def count(self, group: str, name: str, value: int = 1):
+        with self._lock:
+            counters = self._counters.setdefault(group, {})
+            counters[name] = counters.get(name, 0) + value
+
+    def process_stats(self) -> Dict[str, Any]:
+        """本进程的CPU与内存占用，cpu_percent为距上次调用以来的平均值"""
+        process = self._process
+        with process.oneshot():
+            cpu = process.cpu_times()
+            memory = process.memory_info()
+            info = {
+                'pid': process.pid,
+                'threads': process.num_threads(),
+                'rss': memory.rss,
+                'vms': memory.vms,
+                'cpu_user': round(cpu.user, 3),
+                'cpu_system': round(cpu.system, 3),
+                'uptime': round(time() - self.started, 1),
+            }
+            if hasattr(process, 'num_fds'):
+                info['fds'] = process.num_fds()
+        now = monotonic()
+        used = cpu.user + cpu.system
+        with self._lock:
+            previous, self._last_cpu = self._last_cpu, (now, used)
+        if previous is not None and now > previous[0]:
+            info['cpu_percent'] = round((used - previous[1]) / (now - previous[0]) * 100, 2)
+        else:
+            info['cpu_percent'] = round(used / max(info['uptime'], 1e-6) * 100, 2)
+        return info
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            histograms = {group: dict(items) for group, items in self._histograms.items()}
+            counters = {group: dict(items) for group, items in self._counters.items()}
+        return {
+            'process': self.process_stats(),
+            'latency': {
+                group: {name: histogram.summary() for name, histogram in sorted(items.items())}
+                for group, items in histograms.items()
+            },
+            'counters': counters,
+        }
+
+
+# 全局实例，各模块直接调用下面的辅助函数记录
+registry = Registry()
+
+
+def observe(group: str, name: str, seconds: float):
+    registry.observe(group, name, seconds)
+
+
+def record_exception(where: str):
+    """记录一次被吞掉的异常（回退到默认值的except分支）"""
+    registry.count('exceptions', where)
+
+
+def record_timeout(where: str):
+    registry.count('timeouts', where)
+
+
+def popen(cmd, **kwargs) -> subprocess.Popen:
+    """创建子进程并按命令名计数"""
+    registry.count('subprocess_spawns', os.path.basename(str(cmd[0])))
+    return subprocess.Popen(cmd, **kwargs)
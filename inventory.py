@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+from datetime import datetime
+from time import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from backends import Backend
+from gpu_collector import query_gpus
+import instrumentation
+
+# 缓存格式变化时递增，旧缓存自动失效
+INVENTORY_VERSION = 1
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+
+
+def get_boot_id() -> str:
+    """获取本次开机的唯一标识，重启后变化"""
+    try:
+        with open(BOOT_ID_PATH) as f:
+            return f.read().strip()
+    except OSError:
+        # 非Linux系统使用开机时间代替
+        return str(int(psutil.boot_time()))
+
+
+def _load_cpuinfo():
+    from cpuinfo import get_cpu_info
+    return get_cpu_info
+
+
+# py-cpuinfo 只在第一次采集硬件清单时导入
+CPUINFO = Backend('cpuinfo', _load_cpuinfo)
+
+
+def probe_cpu() -> Dict[str, Any]:
+    """CPU型号、核心数与频率范围"""
+    info = {
+        'name': 'Unknown CPU',
+        'cores': psutil.cpu_count() or 0,
+        'physical_cores': psutil.cpu_count(logical=False) or 0,
+    }
+    get_cpu_info = CPUINFO.get()
+    if get_cpu_info is not None:
+        try:
+            info['name'] = get_cpu_info().get('brand_raw', 'Unknown CPU')
+        except Exception as e:
+            logging.warning(f"获取CPU型号失败: {str(e)}")
+            instrumentation.record_exception('inventory.cpu')
+    try:
+        cpu_freq = psutil.cpu_freq(percpu=False)
+        if cpu_freq:
+            info['min_freq'] = round(cpu_freq.min, 2)
+            info['max_freq'] = round(cpu_freq.max, 2)
+    except Exception:
+        instrumentation.record_exception('inventory.cpu_freq')
+    return info
+
+
+def probe_memory() -> Dict[str, Any]:
+    """获取内存类型、频率和通道数"""
+    memory_info = {
+        'total': psutil.virtual_memory().total,
+        # 提供默认值，避免卡住
+        'type': "DDR4",
+        'frequency': "3200",
+        'channels': "Dual",
+    }
+
+    # Linux系统使用lshw替代dmidecode (无需sudo)
+    if platform.system() == "Linux":
+        try:
+            # 使用lshw命令获取内存信息 (不需要sudo)
+            cmd = ["lshw", "-class", "memory", "-short"]
+            proc = instrumentation.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # 添加超时机制
+            try:
+                stdout, stderr = proc.communicate(timeout=2)
+                mem_info = stdout.decode()
+
+                # 解析内存类型 (通常显示为DDR4或类似信息)
+                if "DDR5" in mem_info:
+                    memory_info["type"] = "DDR5"
+                elif "DDR4" in mem_info:
+                    memory_info["type"] = "DDR4"
+                elif "DDR3" in mem_info:
+                    memory_info["type"] = "DDR3"
+
+                # 使用dmidecode获取频率信息 (如果存在不需要密码的情况)
+                try:
+                    # 非阻塞式执行，有超时控制
+                    freq_proc = instrumentation.popen(["dmidecode", "-t", "memory"],
+                                                     stdout=subprocess.PIPE,
+                                                     stderr=subprocess.PIPE)
+                    stdout, stderr = freq_proc.communicate(timeout=1)
+                    mem_info = stdout.decode()
+
+                    # 解析内存频率
+                    speed_match = re.search(r"Speed:\s*(\d+)\s*MHz", mem_info)
+                    if speed_match:
+                        memory_info["frequency"] = speed_match.group(1)
+                except subprocess.TimeoutExpired:
+                    # 如果超时，使用默认值
+                    instrumentation.record_timeout('inventory.dmidecode')
+                    freq_proc.kill()
+                except subprocess.SubprocessError:
+                    instrumentation.record_exception('inventory.dmidecode')
+            except subprocess.TimeoutExpired:
+                instrumentation.record_timeout('inventory.lshw')
+                proc.kill()
+                # 使用默认值
+        except Exception:
+            # 如果出错，使用已设置的默认值
+            instrumentation.record_exception('inventory.memory')
+
+    # Windows系统下使用wmic命令
+    elif platform.system() == "Windows":
+        try:
+            # 获取内存类型
+            proc = instrumentation.popen(["wmic", "memorychip", "get", "SMBIOSMemoryType"],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                stdout, stderr = proc.communicate(timeout=2)
+                memory_type_output = stdout.decode()
+
+                if "21" in memory_type_output:  # 21对应DDR2
+                    memory_info["type"] = "DDR2"
+                elif "24" in memory_type_output:  # 24对应DDR3
+                    memory_info["type"] = "DDR3"
+                elif "26" in memory_type_output:  # 26对应DDR4
+                    memory_info["type"] = "DDR4"
+                elif "30" in memory_type_output:  # 30对应DDR5
+                    memory_info["type"] = "DDR5"
+            except subprocess.TimeoutExpired:
+                instrumentation.record_timeout('inventory.wmic')
+                proc.kill()
+                # 使用默认值
+
+            # 获取内存频率 (添加超时)
+            proc = instrumentation.popen(["wmic", "memorychip", "get", "Speed"],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                stdout, stderr = proc.communicate(timeout=2)
+                memory_speed_output = stdout.decode()
+
+                speed_match = re.search(r"(\d+)", memory_speed_output)
+                if speed_match:
+                    memory_info["frequency"] = speed_match.group(1)
+            except subprocess.TimeoutExpired:
+                instrumentation.record_timeout('inventory.wmic')
+                proc.kill()
+                # 使用默认值
+        except Exception:
+            # 错误处理，已设置默认值
+            instrumentation.record_exception('inventory.memory')
+
+    return memory_info
+
+
+def probe_gpus() -> List[Dict[str, Any]]:
+    """GPU名称、UUID与显存总量"""
+    gpus = []
+    try:
+        for reading in query_gpus(('index', 'name', 'uuid', 'memory.total')):
+            gpus.append({
+                'id': reading['index'],
+                'name': reading['name'],
+                'uuid': reading['uuid'],
+                'memory_total': reading['memory.total'],
+            })
+    except Exception as e:
+        logging.warning(f"获取GPU清单失败: {str(e)}")
+        instrumentation.record_exception('inventory.gpu')
+    return gpus
+
+
+def probe_system() -> Dict[str, Any]:
+    """操作系统与开机时间"""
+    boot_time = psutil.boot_time()
+    return {
+        'hostname': platform.node(),
+        'os': f"{platform.system()} {platform.release()}",
+        'version': platform.version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'boot_timestamp': boot_time,
+        'boot_time': datetime.fromtimestamp(boot_time).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def collect_inventory() -> Dict[str, Any]:
+    """采集运行期间不会变化的硬件清单"""
+    return {
+        'version': INVENTORY_VERSION,
+        'boot_id': get_boot_id(),
+        'collected_at': time(),
+        'cpu': probe_cpu(),
+        'memory': probe_memory(),
+        'gpu': probe_gpus(),
+        'system': probe_system(),
+    }
+
+
+def load_inventory(cache_path: Optional[str] = None) -> Dict[str, Any]:
+    """加载硬件清单
+
+    指定cache_path时，若缓存属于本次开机则直接使用，否则重新采集并写回缓存，
+    这样进程重启不需要再次执行lshw/dmidecode等耗时探测。
+    """
+    if cache_path:
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == INVENTORY_VERSION and cached.get('boot_id') == get_boot_id():
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    inventory = collect_inventory()
+
+    if cache_path:
+        try:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # 先写临时文件再替换，避免并发启动读到半个文件
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(inventory, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logging.warning(f"写入硬件清单缓存失败: {str(e)}")
+    return inventory
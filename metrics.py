@@ -0,0 +1,215 @@
+import gzip
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from payload import GZIP_LEVEL
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'monitor_'
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+class Exposition:
+    """按Prometheus文本格式组装指标，同名指标归为一组输出"""
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def add(self, name: str, value, labels: Optional[Dict[str, Any]] = None, help_text: str = '',
+            metric_type: str = 'gauge'):
+        """value不是数值（None、字符串等）时跳过"""
+        value = _number(value)
+        if value is None:
+            return
+        name = PREFIX + name
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (help_text, metric_type, [])
+        if labels:
+            label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels.items() if val is not None)
+            family[2].append(f'{name}{{{label_text}}} {format_value(value)}')
+        else:
+            family[2].append(f'{name} {format_value(value)}')
+
+    def render(self) -> bytes:
+        lines = []
+        for name, (help_text, metric_type, samples) in self._families.items():
+            if help_text:
+                lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.extend(samples)
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _add_cpu(out: Exposition, cpu: Dict[str, Any]):
+    for core, usage in enumerate(cpu.get('usage_per_core') or []):
+        out.add('cpu_usage_percent', usage, {'core': core}, 'CPU usage per logical core')
+    out.add('cpu_total_usage_percent', cpu.get('total_usage'), help_text='Total CPU usage')
+    for mode, value in (cpu.get('times') or {}).items():
+        out.add('cpu_time_percent', value, {'mode': mode}, 'Share of CPU time by mode')
+    for core, freq in enumerate(cpu.get('freq_per_core') or []):
+        out.add('cpu_frequency_mhz', freq, {'core': core}, 'Current CPU frequency per core')
+
+
+def _add_memory(out: Exposition, memory: Dict[str, Any]):
+    out.add('memory_total_bytes', memory.get('total'), help_text='Total physical memory')
+    out.add('memory_used_bytes', memory.get('used'), help_text='Used physical memory')
+    out.add('memory_available_bytes', memory.get('free'), help_text='Memory available for new processes')
+    out.add('memory_usage_percent', memory.get('percent'), help_text='Memory usage')
+
+
+def _add_gpus(out: Exposition, gpus: List[Dict[str, Any]], inventory: Dict[str, Any]):
+    names = {gpu.get('id'): gpu for gpu in inventory.get('gpu') or []}
+    for gpu in gpus:
+        if not isinstance(gpu, dict) or 'id' not in gpu:
+            continue
+        static = names.get(gpu['id'], {})
+        labels = {'gpu': gpu['id'], 'uuid': static.get('uuid'), 'name': static.get('name')}
+        memory = gpu.get('memory') or {}
+        out.add('gpu_utilization_percent', gpu.get('load'), labels, 'GPU core utilization')
+        out.add('gpu_memory_utilization_percent', memory.get('utilization'), labels, 'GPU memory controller utilization')
+        if _number(memory.get('used_raw')) is not None:
+            out.add('gpu_memory_used_bytes', memory['used_raw'] * 1024 * 1024, labels, 'GPU memory used')
+        if _number(memory.get('total_raw')) is not None:
+            out.add('gpu_memory_total_bytes', memory['total_raw'] * 1024 * 1024, labels, 'GPU memory total')
+        out.add('gpu_temperature_celsius', gpu.get('temperature'), labels, 'GPU temperature')
+        out.add('gpu_core_clock_mhz', gpu.get('core_clock'), labels, 'GPU graphics clock')
+        out.add('gpu_memory_clock_mhz', gpu.get('memory_clock'), labels, 'GPU memory clock')
+        out.add('gpu_power_draw_watts', gpu.get('power_draw'), labels, 'GPU power draw')
+        out.add('gpu_power_limit_watts', gpu.get('power_limit'), labels, 'GPU power limit')
+        out.add('gpu_fan_speed_percent', gpu.get('fan_speed'), labels, 'GPU fan speed')
+        for kind, value in (gpu.get('ecc_errors') or {}).items():
+            out.add('gpu_ecc_errors', value, dict(labels, type=kind), 'Volatile ECC error count')
+        out.add('gpu_stale', gpu.get('stale'), labels, '1 if the last GPU reading is older than expected')
+
+
+def _add_disks(out: Exposition, disks: List[Dict[str, Any]]):
+    for disk in disks:
+        if not isinstance(disk, dict) or not disk.get('mountpoint'):
+            continue
+        labels = {'device': disk.get('device'), 'mountpoint': disk['mountpoint'], 'fstype': disk.get('filesystem')}
+        out.add('disk_total_bytes', disk.get('total'), labels, 'Filesystem size')
+        out.add('disk_used_bytes', disk.get('used'), labels, 'Filesystem used bytes')
+        out.add('disk_free_bytes', disk.get('free'), labels, 'Filesystem free bytes')
+        out.add('disk_usage_percent', disk.get('percent'), labels, 'Filesystem usage')
+        out.add('disk_available', disk.get('available'), labels, '0 if the last usage probe timed out')
+        out.add('disk_read_bytes_total', disk.get('read_bytes'), labels, 'Bytes read from the device', 'counter')
+        out.add('disk_written_bytes_total', disk.get('write_bytes'), labels, 'Bytes written to the device', 'counter')
+        out.add('disk_read_bytes_per_second', disk.get('read_speed'), labels, 'Device read throughput')
+        out.add('disk_write_bytes_per_second', disk.get('write_speed'), labels, 'Device write throughput')
+        out.add('disk_read_iops', disk.get('read_iops'), labels, 'Device read operations per second')
+        out.add('disk_write_iops', disk.get('write_iops'), labels, 'Device write operations per second')
+        for field, name in (('read_latency', 'disk_read_latency_seconds'), ('write_latency', 'disk_write_latency_seconds')):
+            if _number(disk.get(field)) is not None:
+                out.add(name, disk[field] / 1000, labels, 'Average latency per completed operation')
+        out.add('disk_utilization_percent', disk.get('utilization'), labels, 'Share of time the device was busy')
+
+
+def _add_temperatures(out: Exposition, temperatures: Dict[str, Any]):
+    for sensor, reading in temperatures.items():
+        if not isinstance(reading, dict):
+            continue
+        labels = {'sensor': sensor}
+        if reading.get('label'):
+            labels['label'] = reading['label']
+        out.add('temperature_celsius', reading.get('value'), labels, 'Sensor temperature')
+        out.add('temperature_high_celsius', reading.get('max'), labels, 'Sensor high threshold')
+        out.add('temperature_critical_celsius', reading.get('critical'), labels, 'Sensor critical threshold')
+
+
+def _add_network(out: Exposition, network: Dict[str, Any]):
+    for interface, info in (network.get('interfaces') or {}).items():
+        labels = {'interface': interface}
+        out.add('network_receive_bytes_total', info.get('rx_bytes'), labels, 'Bytes received', 'counter')
+        out.add('network_transmit_bytes_total', info.get('tx_bytes'), labels, 'Bytes transmitted', 'counter')
+        for field, name, help_text in (
+            ('rx_speed', 'network_receive_bytes_per_second', 'Receive throughput'),
+            ('tx_speed', 'network_transmit_bytes_per_second', 'Transmit throughput'),
+            ('rx_packets', 'network_receive_packets_per_second', 'Packets received per second'),
+            ('tx_packets', 'network_transmit_packets_per_second', 'Packets transmitted per second'),
+            ('rx_errors', 'network_receive_errors_per_second', 'Receive errors per second'),
+            ('tx_errors', 'network_transmit_errors_per_second', 'Transmit errors per second'),
+            ('rx_drops', 'network_receive_drops_per_second', 'Dropped inbound packets per second'),
+            ('tx_drops', 'network_transmit_drops_per_second', 'Dropped outbound packets per second'),
+            ('utilization', 'network_utilization_percent', 'Link utilization of the busier direction'),
+            ('isup', 'network_up', '1 if the interface is up'),
+            ('speed', 'network_speed_mbps', 'Negotiated link speed'),
+        ):
+            out.add(name, info.get(field), labels, help_text)
+
+
+def render(snapshot, inventory: Optional[Dict[str, Any]] = None) -> bytes:
+    """把一个快照渲染为Prometheus文本格式"""
+    data = snapshot.data
+    inventory = inventory or {}
+    out = Exposition()
+    out.add('snapshot_version', snapshot.version, help_text='Sequence number of the snapshot')
+    out.add('snapshot_timestamp_seconds', snapshot.timestamp, help_text='Unix time the snapshot was published')
+    out.add('snapshot_duration_seconds', snapshot.duration, help_text='Time spent collecting the snapshot')
+    for name, status in (data.get('collected') or {}).items():
+        labels = {'collector': name}
+        out.add('collector_stale', status.get('stale'), labels, '1 if the collector result is stale')
+        out.add('collector_last_success_timestamp_seconds', status.get('timestamp'), labels,
+                'Unix time of the last successful collection')
+        out.add('collector_duration_seconds', status.get('duration'), labels, 'Duration of the last collection')
+    _add_cpu(out, data.get('cpu') or {})
+    _add_memory(out, data.get('memory') or {})
+    _add_gpus(out, data.get('gpu') or [], inventory)
+    _add_disks(out, data.get('disk') or [])
+    _add_temperatures(out, data.get('temperatures') or {})
+    _add_network(out, data.get('network') or {})
+    return out.render()
+
+
+class MetricsCache:
+    """每个快照只渲染一次 /metrics 文本（及其gzip版本）
+
+    首次被抓取时渲染并缓存，同一快照内的所有抓取直接返回缓存的字节，
+    抓取方数量和频率不影响开销；没有抓取方时不做任何渲染。
+    inventory_getter 必须不阻塞（如 HardwareInfo.cached_inventory），清单尚未就绪时返回None，
+    此时不输出来自清单的标签（GPU名称、UUID），清单就绪后的下一次抓取重新渲染。
+    """
+
+    def __init__(self, inventory_getter=None):
+        self.inventory_getter = inventory_getter
+        self._version = None
+        self._body: Optional[bytes] = None
+        self._gzipped: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def body(self, snapshot, accept_gzip: bool = False) -> Tuple[bytes, bool]:
+        """返回 (响应体, 是否已gzip压缩)"""
+        # 在锁外读取清单，不让并发的抓取排队等待
+        inventory = self.inventory_getter() if self.inventory_getter is not None else None
+        key = (snapshot.version, inventory is not None)
+        with self._lock:
+            if self._version != key:
+                self._body = render(snapshot, inventory)
+                self._gzipped = None
+                self._version = key
+            if not accept_gzip:
+                return self._body, False
+            if self._gzipped is None:
+                self._gzipped = gzip.compress(self._body, GZIP_LEVEL)
+            return self._gzipped, True
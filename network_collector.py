@@ -0,0 +1,152 @@
+import fnmatch
+import math
+import os
+import threading
+from time import monotonic
+from typing import Any, Dict, Iterable, Optional
+
+import psutil
+
+import instrumentation
+
+# 默认忽略的虚拟网卡
+DEFAULT_EXCLUDE = ('lo', 'veth*', 'docker*', 'br-*', 'virbr*', 'cni*', 'flannel*', 'cali*', 'tun*', 'tap*')
+# psutil计数器 -> 输出的速率字段
+RATE_FIELDS = (
+    ('bytes_recv', 'rx_speed'),
+    ('bytes_sent', 'tx_speed'),
+    ('packets_recv', 'rx_packets'),
+    ('packets_sent', 'tx_packets'),
+    ('errin', 'rx_errors'),
+    ('errout', 'tx_errors'),
+    ('dropin', 'rx_drops'),
+    ('dropout', 'tx_drops'),
+)
+COUNTER_WRAP = 2 ** 32
+SYS_CLASS_NET = '/sys/class/net'
+
+
+def counter_delta(previous: int, current: int) -> Optional[int]:
+    """计算计数器增量，处理32位回绕；计数器被重置时返回None"""
+    if current >= previous:
+        return current - previous
+    if previous < COUNTER_WRAP:
+        wrapped = current + COUNTER_WRAP - previous
+        # 回绕后的增量应当远小于计数器范围，否则视为重置
+        if wrapped < COUNTER_WRAP // 2:
+            return wrapped
+    return None
+
+
+class NetworkCollector:
+    """按网卡计算吞吐、包速率、错误与丢包速率
+
+    每个采样周期只调用一次 net_io_counters(pernic=True)，状态只在采集器内部
+    维护，并发读取不会破坏差值。exclude为网卡名通配符，ewma_tau为指数平滑的
+    时间常数（秒），0表示不平滑。汇总值不计入bond成员，避免重复统计。
+    """
+
+    def __init__(self, exclude: Iterable[str] = DEFAULT_EXCLUDE, ewma_tau: float = 0.0,
+                 sys_class_net: str = SYS_CLASS_NET):
+        self.exclude = tuple(exclude)
+        self.ewma_tau = ewma_tau
+        self.sys_class_net = sys_class_net
+        self._previous: Dict[str, Any] = {}
+        self._previous_time: Optional[float] = None
+        self._rates: Dict[str, Dict[str, float]] = {}
+        self._masters: Dict[str, Optional[str]] = {}
+        self._latest: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def excluded(self, name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.exclude)
+
+    def _master(self, name: str) -> Optional[str]:
+        """bond/team成员所属的主网卡（Linux）"""
+        if name not in self._masters:
+            try:
+                self._masters[name] = os.path.basename(os.readlink(os.path.join(self.sys_class_net, name, 'master')))
+            except OSError:
+                self._masters[name] = None
+        return self._masters[name]
+
+    def sample(self) -> Dict[str, Any]:
+        """读取一次计数器并计算各网卡速率"""
+        counters = psutil.net_io_counters(pernic=True)
+        try:
+            stats = psutil.net_if_stats()
+        except Exception:
+            instrumentation.record_exception('network.if_stats')
+            stats = {}
+        now = monotonic()
+
+        with self._lock:
+            elapsed = now - self._previous_time if self._previous_time is not None else None
+            if set(counters) != set(self._previous):
+                # 网卡增减时重新识别bond成员，清理已消失网卡的平滑状态
+                self._masters = {}
+                self._rates = {name: rates for name, rates in self._rates.items() if name in counters}
+            interfaces = {}
+            total_rx = total_tx = 0.0
+            total_rx_bytes = total_tx_bytes = 0
+            for name, current in counters.items():
+                if self.excluded(name):
+                    continue
+                info = self._interface_rates(name, current, elapsed)
+                info['rx_bytes'] = current.bytes_recv
+                info['tx_bytes'] = current.bytes_sent
+                stat = stats.get(name)
+                if stat is not None:
+                    info['isup'] = stat.isup
+                    info['speed'] = stat.speed
+                    if stat.speed > 0:
+                        # 网卡速率单位为Mbps，取收发中较大者计算利用率
+                        capacity = stat.speed * 1e6 / 8
+                        info['utilization'] = round(max(info['rx_speed'], info['tx_speed']) / capacity * 100, 2)
+                master = self._master(name)
+                if master:
+                    info['master'] = master
+                else:
+                    total_rx += info['rx_speed']
+                    total_tx += info['tx_speed']
+                    total_rx_bytes += current.bytes_recv
+                    total_tx_bytes += current.bytes_sent
+                interfaces[name] = info
+
+            self._previous = counters
+            self._previous_time = now
+            self._latest = {
+                'rx_bytes': total_rx_bytes,
+                'tx_bytes': total_tx_bytes,
+                'rx_speed': total_rx,
+                'tx_speed': total_tx,
+                'interfaces': interfaces,
+            }
+            return self._latest
+
+    def _interface_rates(self, name: str, current, elapsed: Optional[float]) -> Dict[str, Any]:
+        previous = self._previous.get(name)
+        smoothed = self._rates.setdefault(name, {})
+        info: Dict[str, Any] = {}
+        reset = False
+        for counter, field in RATE_FIELDS:
+            rate = 0.0
+            if previous is not None and elapsed:
+                delta = counter_delta(getattr(previous, counter), getattr(current, counter))
+                if delta is None:
+                    reset = True
+                else:
+                    rate = delta / elapsed
+            if self.ewma_tau > 0 and elapsed and field in smoothed and not reset:
+                alpha = 1 - math.exp(-elapsed / self.ewma_tau)
+                rate = smoothed[field] + alpha * (rate - smoothed[field])
+            smoothed[field] = rate
+            info[field] = round(rate, 2)
+        if reset:
+            info['counter_reset'] = True
+        return info
+
+    def latest(self) -> Dict[str, Any]:
+        """返回最近一次采样结果，不触发新的采样"""
+        with self._lock:
+            return self._latest
@@ -0,0 +1,120 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 小于该大小的响应不压缩，压缩收益抵不过CPU开销
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+
+
+def encode_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def diff(old: Any, new: Any, path: Optional[List] = None, changes: Optional[List] = None,
+         removed: Optional[List] = None) -> Tuple[List, List]:
+    """比较两次采集结果，返回 (set, unset)
+
+    set 为 [路径, 新值] 列表，unset 为被删除的路径列表，路径是键名/下标组成的数组。
+    字典逐键比较；等长列表逐项比较，长度变化时整体替换。
+    """
+    path = path or []
+    changes = [] if changes is None else changes
+    removed = [] if removed is None else removed
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                changes.append([path + [key], value])
+            elif old[key] != value:
+                diff(old[key], value, path + [key], changes, removed)
+        for key in old:
+            if key not in new:
+                removed.append(path + [key])
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            if old_item != new_item:
+                diff(old_item, new_item, path + [index], changes, removed)
+    elif old != new:
+        changes.append([path, new])
+    return changes, removed
+
+
+def apply_delta(data: Any, delta: Dict[str, Any]) -> Any:
+    """把delta应用到旧数据上（原地修改），主要用于测试和Python客户端"""
+    for path in delta.get('unset', []):
+        target = data
+        for key in path[:-1]:
+            target = target[key]
+        target.pop(path[-1], None)
+    for path, value in delta.get('set', []):
+        if not path:
+            data = value
+            continue
+        target = data
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return data
+
+
+def to_columnar(value: Any) -> Any:
+    """把由字典组成的列表（磁盘、GPU、各核心时间占比等）转换为按列存储
+
+    [{'a': 1, 'b': 2}, {'a': 3, 'b': 4}] -> {'$columns': {'a': [1, 3], 'b': [2, 4]}}
+    列内的字典列表会继续递归转换，省去每行重复的键名。
+    """
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if len(value) > 1 and all(isinstance(item, dict) for item in value):
+            keys = list(dict.fromkeys(key for item in value for key in item))
+            return {'$columns': {key: to_columnar([item.get(key) for item in value]) for key in keys}}
+        return [to_columnar(item) for item in value]
+    return value
+
+
+class PayloadCache:
+    """缓存编码后的响应体
+
+    多数客户端在同一时刻请求同一个快照或同一个增量，结果按
+    (基准版本, 目标版本, 格式, 是否压缩) 缓存，每种组合只编码/压缩一次。
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = build()
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def body(self, snapshot, base=None, columnar: bool = False, accept_gzip: bool = False) -> Tuple[bytes, bool]:
+        """生成完整或增量响应体，返回 (响应体, 是否已gzip压缩)
+
+        base为旧快照时返回增量 {'seq', 'base', 'set', 'unset'}；columnar只作用于完整响应。
+        """
+        key = (base.version if base is not None else None, snapshot.version, columnar, accept_gzip)
+
+        def build():
+            if base is None:
+                raw = encode_json(to_columnar(snapshot.data)) if columnar else snapshot.json
+            else:
+                changes, removed = diff(base.data, snapshot.data)
+                raw = encode_json({'seq': snapshot.seq, 'base': base.seq, 'set': changes, 'unset': removed})
+            if accept_gzip and len(raw) >= GZIP_MIN_SIZE:
+                return gzip.compress(raw, GZIP_LEVEL), True
+            return raw, False
+
+        return self.get(key, build)
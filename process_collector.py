@@ -0,0 +1,154 @@
+import heapq
+import threading
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+import instrumentation
+
+# 每种排序方式保留的进程数，/api/processes 的 limit 不能超过该值
+DEFAULT_KEEP = 50
+# 采集耗时占采样周期的上限：进程很多时自动拉长采集间隔，最多占用约10%的单核
+DEFAULT_MAX_SHARE = 0.1
+SORT_KEYS = ('cpu', 'memory', 'io')
+
+HAS_IO = hasattr(psutil.Process, 'io_counters')
+# 只读取需要的字段；用户名在选出前N名之后再解析，避免对每个进程查询passwd
+ATTRS = ['pid', 'name', 'cpu_times', 'memory_info', 'num_threads', 'status', 'create_time']
+if HAS_IO:
+    ATTRS.append('io_counters')
+if hasattr(psutil.Process, 'uids'):
+    ATTRS.append('uids')
+else:
+    ATTRS.append('username')
+
+
+class ProcessCollector:
+    """按CPU、内存、I/O排序的前N个进程
+
+    每次采集只遍历一次 process_iter(attrs=...)。psutil.Process 对象按 (pid, 启动时间) 跨周期保留，
+    连同上次的CPU时间与I/O字节数一起保存，CPU占用与I/O速率由两次读数求差得到；pid被新进程复用时
+    启动时间不同，视为新进程；本次遍历中不存在的进程（已退出）随即清理。
+    每种排序用 heapq.nlargest 选出前 keep 个，复杂度 O(n log keep)，不对全部进程排序。
+    单次耗时超过 max_share 个采样周期时，自动推迟下一次采集，返回上一次的结果。
+    """
+
+    def __init__(self, keep: int = DEFAULT_KEEP, max_share: float = DEFAULT_MAX_SHARE):
+        self.keep = keep
+        self.max_share = max_share
+        # (pid, 启动时间) -> [psutil.Process, 上次CPU时间, 上次I/O字节数]
+        self._tracked: Dict[Tuple[int, Optional[float]], list] = {}
+        self._previous_time: Optional[float] = None
+        self._next_allowed = 0.0
+        self._latest: Dict[str, Any] = {'count': 0, 'top': {key: [] for key in SORT_KEYS}}
+        self._usernames: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _username(self, info: Dict[str, Any]) -> Optional[str]:
+        if 'username' in info:
+            return info['username']
+        uids = info.get('uids')
+        if uids is None:
+            return None
+        uid = uids.real
+        name = self._usernames.get(uid)
+        if name is None:
+            try:
+                import pwd
+                name = pwd.getpwuid(uid).pw_name
+            except (ImportError, KeyError):
+                name = str(uid)
+            self._usernames[uid] = name
+        return name
+
+    def sample(self) -> Dict[str, Any]:
+        now = monotonic()
+        with self._lock:
+            if now < self._next_allowed:
+                return self._latest
+            started = now
+            elapsed = now - self._previous_time if self._previous_time is not None else None
+            total_memory = psutil.virtual_memory().total or 1
+            current: Dict[Tuple[int, Optional[float]], list] = {}
+            entries: List[tuple] = []
+            for proc in psutil.process_iter(attrs=ATTRS, ad_value=None):
+                info = proc.info
+                pid = info['pid']
+                cpu_times = info.get('cpu_times')
+                memory = info.get('memory_info')
+                io = info.get('io_counters')
+                cpu_total = cpu_times.user + cpu_times.system if cpu_times is not None else None
+                io_total = io.read_bytes + io.write_bytes if io is not None else None
+                key = (pid, info.get('create_time'))
+
+                cpu_percent = io_rate = 0.0
+                tracked = self._tracked.get(key)
+                if tracked is None:
+                    tracked = [proc, cpu_total, io_total]
+                else:
+                    if elapsed:
+                        if cpu_total is not None and tracked[1] is not None:
+                            cpu_percent = max(0.0, cpu_total - tracked[1]) / elapsed * 100
+                        if io_total is not None and tracked[2] is not None:
+                            io_rate = max(0, io_total - tracked[2]) / elapsed
+                    tracked[1], tracked[2] = cpu_total, io_total
+                current[key] = tracked
+                rss = memory.rss if memory is not None else 0
+                entries.append((cpu_percent, rss, io_rate, info))
+
+            # 只保留本次仍存在的进程，退出的进程自然被清理
+            self._tracked = current
+            self._previous_time = now
+
+            top = {}
+            for index, sort_key in enumerate(SORT_KEYS):
+                top[sort_key] = [
+                    self._format(entry, total_memory)
+                    for entry in heapq.nlargest(self.keep, entries, key=lambda entry: entry[index])
+                ]
+
+            duration = monotonic() - started
+            instrumentation.observe('processes', 'scan', duration)
+            if self.max_share > 0:
+                self._next_allowed = started + duration / self.max_share
+            self._latest = {
+                'count': len(entries),
+                'duration': round(duration, 4),
+                'top': top,
+            }
+            return self._latest
+
+    def _format(self, entry: tuple, total_memory: int) -> Dict[str, Any]:
+        cpu_percent, rss, io_rate, info = entry
+        return {
+            'pid': info['pid'],
+            'name': info.get('name'),
+            'username': self._username(info),
+            'status': info.get('status'),
+            'threads': info.get('num_threads'),
+            'cpu_percent': round(cpu_percent, 1),
+            'rss': rss,
+            'memory_percent': round(rss / total_memory * 100, 2),
+            'io_rate': round(io_rate, 1) if HAS_IO else None,
+        }
+
+    def latest(self) -> Dict[str, Any]:
+        """返回最近一次采集结果，不触发新的采集"""
+        return self._latest
+
+    def top(self, sort: str = 'cpu', limit: int = 20) -> Dict[str, Any]:
+        return select_top(self._latest, sort, limit, self.keep)
+
+
+def select_top(latest: Dict[str, Any], sort: str = 'cpu', limit: int = 20, keep: int = DEFAULT_KEEP) -> Dict[str, Any]:
+    """从一次采集结果中取出按sort排序的前limit个进程"""
+    if sort not in SORT_KEYS:
+        sort = 'cpu'
+    limit = max(1, min(limit, keep))
+    return {
+        'count': latest.get('count', 0),
+        'duration': latest.get('duration'),
+        'sort': sort,
+        'processes': (latest.get('top') or {}).get(sort, [])[:limit],
+    }
@@ -0,0 +1,232 @@
+import fnmatch
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from history import HistoryStore, extract_series
+
+# (分辨率秒, 保留秒)：10秒保留6小时，1分钟保留2天，15分钟保留14天
+DEFAULT_TIERS = ((10, 6 * 3600), (60, 2 * 86400), (900, 14 * 86400))
+
+
+class RollupBuffer:
+    """单个序列在某一分辨率下的聚合桶环形缓冲区
+
+    每个桶保存起始时间、min、max、sum、count和last，共24字节。
+    新样本落在最新桶内时原地更新，否则开启新桶并覆盖最旧的桶。
+    """
+    __slots__ = ('capacity', 'starts', 'mins', 'maxs', 'sums', 'counts', 'lasts', '_head', '_size')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        zeros = bytes(4 * capacity)
+        self.starts = array('I', zeros)
+        self.mins = array('f', zeros)
+        self.maxs = array('f', zeros)
+        self.sums = array('f', zeros)
+        self.counts = array('I', zeros)
+        self.lasts = array('f', zeros)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, bucket_start: int, value: float):
+        if self._size:
+            last = (self._head - 1) % self.capacity
+            if self.starts[last] == bucket_start:
+                if value < self.mins[last]:
+                    self.mins[last] = value
+                if value > self.maxs[last]:
+                    self.maxs[last] = value
+                self.sums[last] += value
+                self.counts[last] += 1
+                self.lasts[last] = value
+                return
+            if bucket_start < self.starts[last]:
+                # 时钟回拨，丢弃乱序样本
+                return
+        i = self._head
+        self.starts[i] = bucket_start
+        self.mins[i] = self.maxs[i] = self.sums[i] = self.lasts[i] = value
+        self.counts[i] = 1
+        self._head = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def first_start(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return self.starts[(self._head - self._size) % self.capacity]
+
+    def buckets(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, List]:
+        result = {'timestamps': [], 'min': [], 'max': [], 'avg': [], 'last': []}
+        start = (self._head - self._size) % self.capacity
+        for n in range(self._size):
+            i = (start + n) % self.capacity
+            bucket_start = self.starts[i]
+            if since is not None and bucket_start < since:
+                continue
+            if until is not None and bucket_start > until:
+                break
+            result['timestamps'].append(bucket_start)
+            result['min'].append(self.mins[i])
+            result['max'].append(self.maxs[i])
+            result['avg'].append(self.sums[i] / self.counts[i])
+            result['last'].append(self.lasts[i])
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * 24
+
+
+def lttb(timestamps: Sequence[float], values: Sequence[float], threshold: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets降采样，返回保留点的下标
+
+    在保持曲线形状（峰值、拐点）的前提下把点数降到threshold。
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点作为三角形的第三个顶点
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(timestamps[next_start:next_end]) / count
+        avg_y = sum(values[next_start:next_end]) / count
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = timestamps[a], values[a]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - timestamps[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+class RollupStore:
+    """多分辨率聚合历史
+
+    每个样本按各层分辨率增量聚合为 min/max/avg/last，各层保留时长可配置。
+    查询时选择满足点数要求的最粗一层，可再用LTTB降采样到指定点数。
+    raw 为可选的原始数据层（HistoryStore），作为最细的一层参与选择。
+    """
+
+    def __init__(self, tiers: Iterable[Tuple[int, int]] = DEFAULT_TIERS, raw: Optional[HistoryStore] = None,
+                 raw_resolution: float = 1.0):
+        self.tiers = sorted((int(resolution), int(retention)) for resolution, retention in tiers)
+        self.raw = raw
+        self.raw_resolution = raw_resolution
+        self._buffers: List[Dict[str, RollupBuffer]] = [{} for _ in self.tiers]
+        self.max_series = raw.max_series if raw is not None else 4096
+        self._lock = threading.Lock()
+
+    def record(self, timestamp: float, data: Dict[str, Any]):
+        """聚合一次采集结果中的所有序列"""
+        self.record_points(timestamp, list(extract_series(data)))
+
+    def record_points(self, timestamp: float, points: Iterable[Tuple[str, float]]):
+        timestamp = int(timestamp)
+        with self._lock:
+            for (resolution, retention), buffers in zip(self.tiers, self._buffers):
+                bucket_start = timestamp - timestamp % resolution
+                for name, value in points:
+                    buffer = buffers.get(name)
+                    if buffer is None:
+                        if len(buffers) >= self.max_series:
+                            continue
+                        buffer = buffers[name] = RollupBuffer(max(1, retention // resolution))
+                    buffer.add(bucket_start, value)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(buffer.nbytes for buffers in self._buffers for buffer in buffers.values())
+
+    def series_names(self) -> List[str]:
+        with self._lock:
+            names = set()
+            for buffers in self._buffers:
+                names.update(buffers)
+        if self.raw is not None:
+            names.update(self.raw.series_names())
+        return sorted(names)
+
+    def _choose_tier(self, since: float, until: float, points: int) -> Optional[int]:
+        """选择层级，None表示原始数据层
+
+        优先选择覆盖整个时间范围且点数不少于points的最粗一层；都不满足时
+        选择覆盖范围的最细一层；仍没有则用保留时间最长的一层。
+        """
+        span = max(0.0, until - since)
+        candidates = []  # (分辨率, 层级下标, 是否覆盖时间范围)
+        if self.raw is not None:
+            candidates.append((self.raw_resolution, None, span <= self.raw.capacity * self.raw_resolution))
+        for index, (resolution, retention) in enumerate(self.tiers):
+            candidates.append((resolution, index, span <= retention))
+
+        covering = [c for c in candidates if c[2]]
+        enough = [c for c in covering if span / c[0] >= points]
+        if enough:
+            return max(enough, key=lambda c: c[0])[1]
+        if covering:
+            return min(covering, key=lambda c: c[0])[1]
+        return max(candidates, key=lambda c: c[0])[1] if candidates else None
+
+    def query(self, patterns: Optional[Iterable[str]], since: float, until: float, points: int = 1000,
+              downsample: Optional[str] = None) -> Dict[str, Any]:
+        """查询时间范围内的聚合数据
+
+        返回每个序列各自的时间轴与 min/max/avg/last 列；downsample='lttb' 时
+        按avg列用LTTB把每个序列降到最多points个点。
+        """
+        names = self._match(patterns)
+        tier = self._choose_tier(since, until, points)
+        series = {}
+        if tier is None:
+            raw = self.raw.query(names, since=since, until=until) if self.raw is not None else {'series': {}}
+            for name, values in raw['series'].items():
+                pairs = [(t, v) for t, v in zip(raw['timestamps'], values) if v is not None]
+                column = [v for _, v in pairs]
+                series[name] = {'timestamps': [t for t, _ in pairs], 'min': column, 'max': column,
+                                'avg': column, 'last': column}
+            resolution = self.raw_resolution
+        else:
+            resolution = self.tiers[tier][0]
+            with self._lock:
+                buffers = self._buffers[tier]
+                for name in names:
+                    buffer = buffers.get(name)
+                    if buffer is not None:
+                        series[name] = buffer.buckets(since, until)
+
+        for name, columns in series.items():
+            if downsample == 'lttb' and len(columns['timestamps']) > points:
+                keep = lttb(columns['timestamps'], columns['avg'], points)
+                columns = {key: [column[i] for i in keep] for key, column in columns.items()}
+            series[name] = {
+                key: column if key == 'timestamps' else [round(v, 3) for v in column]
+                for key, column in columns.items()
+            }
+
+        return {'resolution': resolution, 'since': since, 'until': until, 'series': series}
+
+    def _match(self, patterns: Optional[Iterable[str]]) -> List[str]:
+        names = self.series_names()
+        if not patterns:
+            return names
+        return [name for name in names if any(name == p or fnmatch.fnmatchcase(name, p) for p in patterns)]
@@ -0,0 +1,193 @@
+import threading
+import logging
+import traceback
+import json
+import os
+import secrets
+from collections import deque
+from dataclasses import dataclass
+from functools import cached_property
+from time import time, monotonic
+from typing import Any, Callable, Dict, List, Optional
+
+from hardware_info import HardwareInfo
+from scheduler import Scheduler
+
+DEFAULT_INTERVAL = 1.0
+# 保留最近多少个快照，用于断线续传和增量响应
+DEFAULT_RECENT = 300
+
+
+def new_epoch() -> str:
+    """本次启动的标记，快照序号与ETag带上它，服务重启后客户端保存的旧序号不会与新快照混淆
+
+    多进程模式下由 serve.py 生成，通过 MONITOR_EPOCH 传给primary与各worker，使序号在进程间通用。
+    """
+    return os.environ.get('MONITOR_EPOCH') or secrets.token_hex(4)
+
+
+def parse_seq(text: Optional[str], epoch: str) -> Optional[int]:
+    """解析 '<epoch>-<version>' 形式的快照序号，属于其他启动或格式不符时返回None"""
+    if not text:
+        return None
+    prefix, _, version = text.strip().rpartition('-')
+    if prefix != epoch:
+        return None
+    try:
+        return int(version)
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """一次采集结果的不可变快照
+
+    data 由所有请求共享，调用方只能读取，不得修改。
+    """
+    version: int
+    timestamp: float
+    duration: float
+    data: Dict[str, Any]
+    epoch: str = ''
+
+    @property
+    def seq(self) -> str:
+        """对外的快照序号（ETag、X-Snapshot-Seq、SSE事件id），见 parse_seq"""
+        return f'{self.epoch}-{self.version}'
+
+    @cached_property
+    def json(self) -> bytes:
+        """序列化后的JSON，每个快照只生成一次"""
+        return json.dumps(self.data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class Sampler:
+    """后台采样器，按固定周期运行调度器并发布最新快照
+
+    无论有多少客户端，采集成本只取决于采样周期；HTTP处理函数直接读取快照，
+    响应延迟与采集耗时无关。各数据源有各自的采集周期和时间预算（见Scheduler），
+    快照中的 'collected' 记录每一节的采集时间与是否过期。
+    """
+
+    def __init__(self, hardware_info: Optional[HardwareInfo] = None, interval: float = DEFAULT_INTERVAL,
+                 recent: int = DEFAULT_RECENT, intervals: Optional[Dict[str, float]] = None):
+        self.hardware_info = hardware_info or HardwareInfo()
+        self.interval = max(0.1, float(interval))
+        self.scheduler = Scheduler()
+        # 跟随采样周期的数据源，其余周期性数据源在采样放慢时也不会比快照更频繁
+        self._follow = set(self.hardware_info.register_collectors(self.scheduler, self.interval, intervals) or ())
+        self._base_intervals = {c.name: c.interval for c in self.scheduler.collectors if not c.once}
+        self._snapshot: Optional[Snapshot] = None
+        self._recent = deque(maxlen=recent)
+        self._version = 0
+        self.epoch = new_epoch()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._listeners: List[Callable[[Snapshot], None]] = []
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台采样线程（重复调用无副作用）"""
+        if self.running:
+            return
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='hardware-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台采样线程"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_interval(self, interval: float):
+        """调整采样周期（自适应采样），周期缩短时立即开始下一轮采集"""
+        interval = max(0.1, float(interval))
+        if interval == self.interval:
+            return
+        faster = interval < self.interval
+        self.interval = interval
+        for name, base in self._base_intervals.items():
+            self.scheduler.set_interval(name, interval if name in self._follow else max(base, interval))
+        if faster:
+            self._wake.set()
+
+    def subscribe(self, listener: Callable[[Snapshot], None]):
+        """注册快照监听器，每次发布新快照后在采样线程中调用"""
+        self._listeners.append(listener)
+
+    def latest(self) -> Optional[Snapshot]:
+        """返回最新快照，尚未完成首次采集时返回None"""
+        return self._snapshot
+
+    def recent(self, after_version: int = 0) -> List[Snapshot]:
+        """返回版本号大于after_version的近期快照，按版本递增"""
+        with self._cond:
+            return [snapshot for snapshot in self._recent if snapshot.version > after_version]
+
+    def get(self, version: int) -> Optional[Snapshot]:
+        """按版本号查找近期快照，已淘汰时返回None"""
+        with self._cond:
+            if not self._recent:
+                return None
+            index = version - self._recent[0].version
+            if 0 <= index < len(self._recent):
+                return self._recent[index]
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        """等待首个快照可用"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._snapshot is not None, timeout)
+            return self._snapshot
+
+    def sample_once(self) -> Snapshot:
+        """运行到期的数据源并发布快照"""
+        started = monotonic()
+        # 最多等待半个周期，慢数据源不拖慢快照发布
+        data = self.scheduler.collect(max_wait=self.interval / 2)
+        duration = monotonic() - started
+        with self._cond:
+            self._version += 1
+            snapshot = Snapshot(self._version, time(), duration, data, self.epoch)
+            self._snapshot = snapshot
+            self._recent.append(snapshot)
+            self._cond.notify_all()
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logging.error(f"快照监听器执行失败: {str(e)}")
+                logging.error(traceback.format_exc())
+        return snapshot
+
+    def _run(self):
+        next_tick = monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample_once()
+            except Exception as e:
+                logging.error(f"采样失败: {str(e)}")
+                logging.error(traceback.format_exc())
+
+            # 按固定节拍推进；采集超时则立即开始下一轮，不累积欠账
+            next_tick += self.interval
+            now = monotonic()
+            if next_tick < now:
+                next_tick = now
+            if self._wake.wait(next_tick - now):
+                # 周期缩短（如客户端连接）时提前开始下一轮
+                self._wake.clear()
+                next_tick = monotonic()
@@ -0,0 +1,212 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import monotonic, time
+from typing import Any, Callable, Dict, List, Optional
+
+import instrumentation
+
+DEFAULT_WORKERS = 8
+# 连续失败时的最长退避间隔（秒）
+MAX_BACKOFF = 300
+# 到期判断的容差（占周期的比例），吸收采样循环的调度抖动，避免与采样周期相同的数据源隔轮才采一次
+DUE_SLACK = 0.05
+
+
+class Collector:
+    """调度器中的一个数据源
+
+    interval 为采集周期（秒），once=True 表示只成功采集一次；budget 为每次采集的
+    时间预算，超出后本轮快照沿用上次结果并标记为过期，采集本身继续在后台完成。
+    连续失败时按 interval * 2^n 退避，最长 MAX_BACKOFF 秒。publish=False 的数据源
+    只在后台运行（如预热硬件清单），结果不放入快照。
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: float, budget: Optional[float] = None,
+                 once: bool = False, stale_after: Optional[float] = None, publish: bool = True):
+        self.name = name
+        self.func = func
+        self.interval = max(0.1, float(interval))
+        self.budget = budget if budget is not None else self.interval
+        self.once = once
+        self._auto_stale = stale_after is None
+        self.stale_after = stale_after if stale_after is not None else 2 * self.interval + self.budget
+        self.publish = publish
+
+        self.result: Any = None
+        self.has_result = False
+        self.timestamp: Optional[float] = None  # 最近一次成功采集完成的时间（time()）
+        self.finished_at: Optional[float] = None  # 同上，monotonic()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.failures = 0
+        self.timeouts = 0
+        self.next_due = 0.0
+        self.started_at: Optional[float] = None
+        self.future = None
+
+    @property
+    def running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def due(self, now: float) -> bool:
+        if self.running:
+            return False
+        if self.once and self.has_result:
+            return False
+        return now >= self.next_due - DUE_SLACK * self.interval
+
+    def stale(self, now: float) -> bool:
+        if not self.has_result or self.error is not None:
+            return True
+        if self.once:
+            return False
+        return now - self.finished_at > self.stale_after
+
+    def status(self, now: float) -> Dict[str, Any]:
+        info = {
+            'timestamp': self.timestamp,
+            'duration': round(self.duration, 4) if self.duration is not None else None,
+            'stale': self.stale(now),
+        }
+        if self.error is not None:
+            info['error'] = self.error
+        if self.running:
+            info['running'] = round(now - self.started_at, 3)
+        return info
+
+
+class Scheduler:
+    """按各自的周期并发运行已注册的数据源，合并为一份快照
+
+    每个数据源在线程池中执行，同一数据源不会并发运行。collect() 提交到期的数据源，
+    最多等待各自的时间预算，然后用各数据源最近一次的结果组装快照；慢数据源
+    （lshw、失联的挂载点等）不再拖慢CPU等快速指标。
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self._collectors: Dict[str, Collector] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='collector')
+        self._lock = threading.Lock()
+
+    def register(self, name: str, func: Callable[[], Any], interval: float, **kwargs) -> Collector:
+        collector = Collector(name, func, interval, **kwargs)
+        with self._lock:
+            self._collectors[name] = collector
+        return collector
+
+    def set_interval(self, name: str, interval: float):
+        """调整数据源的采集周期，下一次到期时间随之提前或推后"""
+        with self._lock:
+            collector = self._collectors[name]
+            collector.next_due += max(0.1, float(interval)) - collector.interval
+            collector.interval = max(0.1, float(interval))
+            if collector._auto_stale:
+                collector.stale_after = 2 * collector.interval + collector.budget
+
+    @property
+    def collectors(self) -> List[Collector]:
+        with self._lock:
+            return list(self._collectors.values())
+
+    def _run(self, collector: Collector):
+        started = monotonic()
+        try:
+            result = collector.func()
+        except Exception as e:
+            finished = monotonic()
+            instrumentation.observe('collectors', collector.name, finished - started)
+            instrumentation.record_exception(f'collector.{collector.name}')
+            with self._lock:
+                collector.failures += 1
+                collector.error = str(e) or e.__class__.__name__
+                collector.duration = finished - started
+                backoff = min(collector.interval * 2 ** collector.failures, MAX_BACKOFF)
+                collector.next_due = finished + backoff
+            logging.error(f"采集 {collector.name} 失败（连续 {collector.failures} 次），{backoff:.0f} 秒后重试: {str(e)}")
+            logging.debug(traceback.format_exc())
+            return
+        finished = monotonic()
+        instrumentation.observe('collectors', collector.name, finished - started)
+        if finished - started > collector.budget:
+            instrumentation.record_timeout(f'collector.{collector.name}')
+            logging.warning(f"采集 {collector.name} 耗时 {finished - started:.1f} 秒，超出时间预算 {collector.budget:.1f} 秒")
+        with self._lock:
+            if finished - started > collector.budget:
+                collector.timeouts += 1
+            if collector.failures:
+                logging.info(f"采集 {collector.name} 已恢复")
+            collector.result = result
+            collector.has_result = True
+            collector.timestamp = time()
+            collector.finished_at = finished
+            collector.duration = finished - started
+            collector.error = None
+            collector.failures = 0
+            # 按提交时间推进节拍：工作线程开始执行总是晚于提交，以此为基准会错过下一轮采样
+            collector.next_due = max(collector.started_at + collector.interval, finished)
+
+    def submit_due(self, now: Optional[float] = None) -> Dict[Collector, float]:
+        """提交所有到期的数据源，返回 {数据源: 截止时间}"""
+        now = monotonic() if now is None else now
+        deadlines = {}
+        with self._lock:
+            for collector in self._collectors.values():
+                if collector.due(now):
+                    collector.started_at = now
+                    collector.future = self._executor.submit(self._run, collector)
+                    deadlines[collector] = now + collector.budget
+        return deadlines
+
+    def collect(self, max_wait: Optional[float] = None) -> Dict[str, Any]:
+        """运行一轮到期的数据源并返回合并后的快照数据
+
+        等待各数据源直到其时间预算用完，但总共不超过 max_wait 秒；未完成的数据源
+        沿用上次结果。各节的采集时间与是否过期见返回值中的 'collected'。
+        """
+        deadlines = self.submit_due()
+        cutoff = monotonic() + max_wait if max_wait is not None else None
+        for collector, deadline in sorted(deadlines.items(), key=lambda item: item[1]):
+            remaining = (min(deadline, cutoff) if cutoff is not None else deadline) - monotonic()
+            if remaining > 0:
+                wait([collector.future], timeout=remaining)
+
+        now = monotonic()
+        data: Dict[str, Any] = {}
+        collected: Dict[str, Any] = {}
+        with self._lock:
+            for name, collector in self._collectors.items():
+                if not collector.publish:
+                    continue
+                if collector.has_result:
+                    data[name] = collector.result
+                collected[name] = collector.status(now)
+        data['collected'] = collected
+        return data
+
+    def status(self) -> Dict[str, Any]:
+        """各数据源的运行状态，用于自监控"""
+        now = monotonic()
+        with self._lock:
+            return {
+                name: dict(collector.status(now), interval=collector.interval, budget=collector.budget,
+                           failures=collector.failures, timeouts=collector.timeouts)
+                for name, collector in self._collectors.items()
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_intervals(text: Optional[str]) -> Dict[str, float]:
+    """解析 'disk=30,temperatures=5' 形式的周期配置"""
+    intervals = {}
+    for item in (text or '').split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            try:
+                intervals[name.strip()] = float(value)
+            except ValueError:
+                logging.warning(f"忽略无效的采集周期配置: {item}")
+    return intervals
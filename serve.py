@@ -0,0 +1,181 @@
+"""生产环境多进程服务
+
+只有一个primary进程负责采集，快照通过共享内存（mmap文件+seqlock）发布；多个worker进程
+共享同一个监听socket处理HTTP请求，直接读取最新快照，不重复采集。
+各进程使用 waitress（纯Python的生产级WSGI服务器，Linux/Windows通用）而不是werkzeug开发服务器。
+
+用法:
+    python serve.py --workers 4 --threads 32 --host 0.0.0.0 --port 5000
+"""
+import argparse
+import logging
+import os
+import secrets
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from time import monotonic
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+DEFAULT_BACKLOG = 1024
+# 每个进程的请求线程数；每个SSE连接占用一个线程
+DEFAULT_THREADS = 32
+# worker异常退出后重启的最小间隔（秒），避免启动即崩溃时反复重启
+RESTART_DELAY = 1.0
+
+
+def shared_directory() -> str:
+    """共享快照文件目录，优先放在内存文件系统 /dev/shm"""
+    if os.environ.get('MONITOR_SHARED_DIR'):
+        os.makedirs(os.environ['MONITOR_SHARED_DIR'], exist_ok=True)
+        return os.environ['MONITOR_SHARED_DIR']
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    return tempfile.mkdtemp(prefix='monitor-', dir=base)
+
+
+def listen(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(DEFAULT_BACKLOG)
+    # 多个worker在同一个socket上accept，非阻塞时没抢到连接的worker不会卡在accept中
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+def wsgi_server(application, threads: int, **kwargs):
+    """创建waitress服务器（不输出逐请求的访问日志）"""
+    from waitress.server import create_server
+
+    # 请求排队是正常的负载波动，waitress默认对每个排队的请求输出一条警告
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+    return create_server(application, threads=threads, ident='monitor', **kwargs)
+
+
+def run_worker(fd: int, threads: int):
+    """worker进程：在继承的监听socket上处理请求，父进程退出时随之退出"""
+    import app as monitor
+
+    parent = os.getppid()
+
+    def watch_parent():
+        while True:
+            if os.getppid() != parent:
+                os._exit(0)
+            threading.Event().wait(1)
+
+    threading.Thread(target=watch_parent, name='parent-watch', daemon=True).start()
+    monitor.sampler.start()
+    server = wsgi_server(monitor.app, threads, sockets=[socket.socket(fileno=fd)])
+    server.run()
+
+
+class Supervisor:
+    """primary进程：采集并发布快照，为worker提供内部接口，worker退出时重启"""
+
+    def __init__(self, sock: socket.socket, host: str, port: int, workers: int, threads: int, directory: str):
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.directory = directory
+        self._processes = {}
+        self._stop = threading.Event()
+
+    def spawn(self, index: int):
+        env = {**os.environ, 'MONITOR_ROLE': 'worker', 'MONITOR_SHARED_DIR': self.directory}
+        command = [sys.executable, os.path.abspath(__file__), '--worker-fd', str(self.sock.fileno()),
+                   '--threads', str(self.threads)]
+        process = subprocess.Popen(command, env=env, pass_fds=(self.sock.fileno(),))
+        self._processes[index] = (process, monotonic())
+        logging.info(f"worker {index} 已启动 (pid {process.pid})")
+
+    def serve_internal(self, monitor):
+        """在Unix socket上运行完整应用，处理worker转发的请求
+
+        只有worker能连接这个socket，保留其转发的 X-Forwarded-For（中心节点据此记录Agent地址）。
+        """
+        from shared_snapshot import PRIMARY_SOCKET
+
+        server = wsgi_server(monitor.app, self.threads, unix_socket=os.path.join(self.directory, PRIMARY_SOCKET),
+                             clear_untrusted_proxy_headers=False)
+        threading.Thread(target=server.run, name='primary-server', daemon=True).start()
+        return server
+
+    def run(self):
+        os.environ['MONITOR_ROLE'] = 'primary'
+        os.environ['MONITOR_SHARED_DIR'] = self.directory
+        # 本次启动的快照序号前缀，primary与各worker相同（见 sampler.new_epoch）
+        os.environ['MONITOR_EPOCH'] = secrets.token_hex(4)
+        import app as monitor
+
+        monitor.sampler.start()
+        server = self.serve_internal(monitor)
+        for index in range(self.workers):
+            self.spawn(index)
+        logging.info(f"监听 http://{self.host}:{self.port}，{self.workers} 个worker，共享快照目录 {self.directory}")
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: self._stop.set())
+        try:
+            while not self._stop.wait(1):
+                for index, (process, started) in list(self._processes.items()):
+                    if process.poll() is None:
+                        continue
+                    logging.warning(f"worker {index} 已退出（返回码 {process.returncode}），重新启动")
+                    if monotonic() - started < RESTART_DELAY:
+                        self._stop.wait(RESTART_DELAY)
+                    if not self._stop.is_set():
+                        self.spawn(index)
+        finally:
+            logging.info("正在停止")
+            for process, _ in self._processes.values():
+                process.terminate()
+            for process, _ in self._processes.values():
+                try:
+                    process.wait(5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            server.close()
+            monitor.sampler.stop(timeout=5)
+            if monitor.publisher is not None:
+                monitor.publisher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='硬件监控多进程服务')
+    parser.add_argument('--host', default=os.environ.get('MONITOR_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MONITOR_PORT', DEFAULT_PORT)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MONITOR_WORKERS', os.cpu_count() or 1)),
+                        help='处理请求的worker进程数，默认为CPU核心数')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('MONITOR_THREADS', DEFAULT_THREADS)),
+                        help=f'每个进程的请求线程数，每个SSE连接占用一个，默认 {DEFAULT_THREADS}')
+    parser.add_argument('--worker-fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.worker_fd is not None:
+        run_worker(args.worker_fd, max(1, args.threads))
+        return
+
+    created = not os.environ.get('MONITOR_SHARED_DIR')
+    directory = shared_directory()
+    sock = listen(args.host, args.port)
+    try:
+        Supervisor(sock, args.host, args.port, max(1, args.workers), max(1, args.threads), directory).run()
+    finally:
+        sock.close()
+        if created:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+import http.client
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import threading
+from collections import deque
+from time import sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import instrumentation
+from sampler import DEFAULT_INTERVAL, DEFAULT_RECENT, Snapshot, new_epoch
+
+# 槽文件头: 魔数、序号(seqlock)、快照版本、时间戳、采集耗时、数据长度
+HEADER = struct.Struct('<8sQQddQ')
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+# 序号之后的元数据: 快照版本、时间戳、采集耗时、数据长度
+META = struct.Struct('<QddQ')
+META_OFFSET = 16
+MAGIC = b'HWSNAP01'
+DATA_OFFSET = 64
+DEFAULT_CAPACITY = 8 * 1024 * 1024
+# 工作进程检查新快照的周期（秒），只读8字节序号，开销可以忽略
+DEFAULT_POLL = 0.05
+# 读取时写入方正在更新的重试次数
+READ_RETRIES = 100
+
+PRIMARY_SOCKET = 'primary.sock'
+# 工作进程转发给主进程的请求头与转发回客户端的响应头
+FORWARD_REQUEST_HEADERS = ('Content-Type', 'Content-Encoding', 'Accept-Encoding', 'Authorization',
+                           'If-None-Match', 'X-Forwarded-For')
+FORWARD_RESPONSE_HEADERS = ('Content-Type', 'Content-Encoding', 'ETag', 'Vary')
+
+SNAPSHOT_SLOT = 'snapshot'
+INVENTORY_SLOT = 'inventory'
+PROCESSES_SLOT = 'processes'
+CGROUPS_SLOT = 'cgroups'
+
+
+class Slot:
+    """mmap共享文件中的一个seqlock槽，一个写入进程、任意多个读取进程
+
+    写入: 序号+1（奇数表示正在写）-> 写数据与元数据 -> 单独写入序号+1（偶数），偶数序号最后发布，
+    读取方看到偶数序号时数据与元数据都已写完。
+    读取: 读序号，为奇数则重试；复制数据后再次读序号，两次相同才算读到完整数据。
+    读取方从不加锁，也不阻塞写入方；序号未变化时只读8字节。
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY, create: bool = False):
+        self.path = path
+        if create:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                os.ftruncate(fd, DATA_OFFSET + capacity)
+                self._mm = mmap.mmap(fd, DATA_OFFSET + capacity)
+            finally:
+                os.close(fd)
+            HEADER.pack_into(self._mm, 0, MAGIC, 0, 0, 0.0, 0.0, 0)
+        else:
+            with open(path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"不是快照共享文件: {path}")
+        self.capacity = len(self._mm) - DATA_OFFSET
+        self._seq = SEQ.unpack_from(self._mm, SEQ_OFFSET)[0]
+
+    def write(self, payload: bytes, version: int = 0, timestamp: float = 0.0, duration: float = 0.0) -> bool:
+        if len(payload) > self.capacity:
+            return False
+        mm = self._mm
+        self._seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self._seq)
+        mm[DATA_OFFSET:DATA_OFFSET + len(payload)] = payload
+        META.pack_into(mm, META_OFFSET, version, timestamp, duration, len(payload))
+        self._seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self._seq)
+        return True
+
+    def sequence(self) -> int:
+        return SEQ.unpack_from(self._mm, SEQ_OFFSET)[0]
+
+    def read(self, known_seq: int = -1) -> Optional[Tuple[int, int, float, float, bytes]]:
+        """返回 (序号, 版本, 时间戳, 耗时, 数据)，序号与known_seq相同（未更新）时返回None"""
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            _, seq, version, timestamp, duration, length = HEADER.unpack_from(mm, 0)
+            if seq == known_seq:
+                return None
+            if seq & 1 or length > self.capacity:
+                sleep(0)
+                continue
+            payload = mm[DATA_OFFSET:DATA_OFFSET + length]
+            if SEQ.unpack_from(mm, SEQ_OFFSET)[0] == seq:
+                return seq, version, timestamp, duration, payload
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def slot_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f'{name}.shm')
+
+
+class SnapshotPublisher:
+    """主进程把快照及进程表、硬件清单写入共享槽，供工作进程读取"""
+
+    def __init__(self, directory: str, capacity: int = DEFAULT_CAPACITY):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.capacity = capacity
+        self._slots: Dict[str, Slot] = {}
+        self._lock = threading.Lock()
+        self._warned = set()
+        self.slot(SNAPSHOT_SLOT)
+
+    def slot(self, name: str) -> Slot:
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = Slot(slot_path(self.directory, name), self.capacity, create=True)
+        return slot
+
+    def _write(self, name: str, payload: bytes, *meta):
+        with self._lock:
+            if not self.slot(name).write(payload, *meta) and name not in self._warned:
+                self._warned.add(name)
+                logging.error(f"共享槽 {name} 容量不足（{len(payload)} > {self.capacity} 字节），"
+                              f"请调大 MONITOR_SHARED_SIZE_MB")
+
+    def publish_snapshot(self, snapshot: Snapshot):
+        """采样器监听器：直接写入快照已缓存的JSON，不重新编码"""
+        self._write(SNAPSHOT_SLOT, snapshot.json, snapshot.version, snapshot.timestamp, snapshot.duration)
+
+    def publish(self, name: str, value: Any):
+        self._write(name, json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'))
+
+    def close(self):
+        with self._lock:
+            for slot in self._slots.values():
+                slot.close()
+            self._slots.clear()
+
+
+class SharedSampler:
+    """工作进程中代替Sampler：跟随主进程发布的快照，不做任何采集
+
+    接口与Sampler相同（latest/recent/get/wait/subscribe/start/stop），快照版本号与主进程一致，
+    因此ETag、增量响应与SSE断线续传在各工作进程间通用。每个新版本只解析一次JSON，
+    快照的json字段直接使用共享内存中的字节。
+    """
+
+    scheduler = None
+
+    def __init__(self, directory: str, interval: float = DEFAULT_INTERVAL, recent: int = DEFAULT_RECENT,
+                 poll: float = DEFAULT_POLL):
+        self.directory = directory
+        self.interval = max(0.1, float(interval))
+        self.poll = min(poll, self.interval / 4)
+        self._slots: Dict[str, Slot] = {}
+        self._cache: Dict[str, Tuple[int, Any]] = {}
+        self._snapshot: Optional[Snapshot] = None
+        self._seq = -1
+        # 与primary相同（MONITOR_EPOCH），ETag与序号在各进程间通用
+        self.epoch = new_epoch()
+        self._recent = deque(maxlen=recent)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._listeners: List[Callable[[Snapshot], None]] = []
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='snapshot-follower', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def subscribe(self, listener: Callable[[Snapshot], None]):
+        self._listeners.append(listener)
+
+    def latest(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def recent(self, after_version: int = 0) -> List[Snapshot]:
+        with self._cond:
+            return [snapshot for snapshot in self._recent if snapshot.version > after_version]
+
+    def get(self, version: int) -> Optional[Snapshot]:
+        with self._cond:
+            if not self._recent:
+                return None
+            index = version - self._recent[0].version
+            if 0 <= index < len(self._recent) and self._recent[index].version == version:
+                return self._recent[index]
+            # 工作进程重启或读取时跳过了版本，版本号不连续，退回线性查找
+            for snapshot in self._recent:
+                if snapshot.version == version:
+                    return snapshot
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._snapshot is not None, timeout)
+            return self._snapshot
+
+    def _slot(self, name: str) -> Optional[Slot]:
+        slot = self._slots.get(name)
+        if slot is None:
+            try:
+                slot = self._slots[name] = Slot(slot_path(self.directory, name))
+            except (OSError, ValueError):
+                # 主进程尚未发布该槽
+                return None
+        return slot
+
+    def shared(self, name: str, default: Any = None) -> Any:
+        """读取主进程发布的其他数据（进程表、硬件清单），按序号缓存解析结果"""
+        slot = self._slot(name)
+        if slot is None:
+            return default
+        seq, value = self._cache.get(name, (-1, default))
+        result = slot.read(seq)
+        if result is not None:
+            try:
+                value = json.loads(result[4])
+                self._cache[name] = (result[0], value)
+            except ValueError:
+                instrumentation.record_exception(f'shared.{name}')
+        return value
+
+    def poll_once(self) -> Optional[Snapshot]:
+        """检查并发布新快照"""
+        slot = self._slot(SNAPSHOT_SLOT)
+        if slot is None:
+            return None
+        result = slot.read(self._seq)
+        if result is None:
+            return None
+        seq, version, timestamp, duration, payload = result
+        if version == 0:
+            self._seq = seq
+            return None
+        # 先解析再记下序号：解析失败时下次轮询重新读取，不会把未发布的快照当作已处理
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            instrumentation.record_exception(f'shared.{SNAPSHOT_SLOT}')
+            return None
+        self._seq = seq
+        snapshot = Snapshot(version, timestamp, duration, data, self.epoch)
+        # json为cached_property，直接放入共享内存中的原始字节，避免再次编码
+        snapshot.__dict__['json'] = payload
+        with self._cond:
+            self._snapshot = snapshot
+            self._recent.append(snapshot)
+            self._cond.notify_all()
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logging.error(f"快照监听器执行失败: {str(e)}")
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logging.error(f"读取共享快照失败: {str(e)}")
+            self._stop.wait(self.poll)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = 10):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class PrimaryClient:
+    """工作进程通过Unix socket把依赖主进程状态的请求（中心节点、CPU窗口统计等）转发给主进程
+
+    每个线程复用一个长连接，连接被关闭时重连一次。
+    """
+
+    def __init__(self, directory: str, timeout: float = 10):
+        self.path = os.path.join(directory, PRIMARY_SOCKET)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        headers = {name: value for name, value in (headers or {}).items() if name in FORWARD_REQUEST_HEADERS}
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = UnixHTTPConnection(self.path, self.timeout)
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    self._local.connection = None
+                return response.status, {name: response.getheader(name) for name in FORWARD_RESPONSE_HEADERS
+                                         if response.getheader(name)}, payload
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                if attempt == 1:
+                    raise
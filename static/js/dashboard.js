@@ -0,0 +1,1199 @@
+// 采样周期由页面 <body data-refresh-interval> 给出
+const REFRESH_INTERVAL = parseInt(document.body.dataset.refreshInterval, 10) || 1000;
+// 图表保留最近5分钟
+const HISTORY_LIMIT = Math.max(60, Math.round(300000 / REFRESH_INTERVAL));
+// SSE不可用时的轮询间隔
+const POLL_INTERVAL = Math.max(REFRESH_INTERVAL, 5000);
+const charts = {
+    cpu: null,
+    memory: null,
+    disk: null,
+    network: null,
+    gpu: null,
+    memoryDonut: null,
+    gpuUsageDonut: null,
+    gpuMemDonut: null
+};
+// 各折线图所在的面板（data-panel），面板不可见时不重绘
+const CHART_PANELS = { cpu: 'cpu', memory: 'memory', network: 'network', gpu: 'gpu' };
+
+let lastNet = null;
+let lastNetTime = Date.now();
+let lastGpuData = [];
+let networkSpeed = { rx: null, tx: null };
+
+const timeFormat = new Intl.DateTimeFormat('zh-CN', { hour12: false, hour: '2-digit', minute: '2-digit', second: '2-digit' });
+
+function updateTime() {
+    const now = new Date();
+    const timeString = now.toLocaleTimeString('zh-CN', { hour12: false });
+    const dateString = now.toLocaleDateString('zh-CN');
+    const timeElement = document.getElementById('current-time');
+    if (timeElement) {
+        timeElement.textContent = `${dateString} ${timeString}`;
+    }
+}
+
+// 定长环形缓冲区：时间戳与各序列的数值存放在类型化数组中，追加一个点为O(1)，不移动已有数据
+class ChartBuffer {
+    constructor(capacity, seriesCount, withMeta = false) {
+        this.capacity = capacity;
+        this.times = new Float64Array(capacity);
+        // 时间标签在追加时格式化一次，渲染时直接取用
+        this.labels = new Array(capacity);
+        this.values = Array.from({ length: seriesCount }, () => new Float32Array(capacity));
+        // 每个点的附加信息（最高使用率的核心编号），-1表示没有
+        this.meta = withMeta ? new Int32Array(capacity).fill(-1) : null;
+        this.head = 0;
+        this.length = 0;
+    }
+
+    // 第i个点（按时间顺序，0为最早）在数组中的位置
+    slot(i) {
+        return (this.head - this.length + i + this.capacity) % this.capacity;
+    }
+
+    lastTime() {
+        return this.length ? this.times[this.slot(this.length - 1)] : null;
+    }
+
+    // 时间不晚于最后一个点的数据（重连补发、历史与推送重叠）直接丢弃
+    push(timestamp, values, meta = null) {
+        if (this.length && timestamp <= this.lastTime()) return false;
+        const index = this.head;
+        this.times[index] = timestamp;
+        this.labels[index] = timeFormat.format(timestamp * 1000);
+        this.values.forEach((column, k) => {
+            column[index] = typeof values[k] === 'number' ? values[k] : NaN;
+        });
+        if (this.meta) this.meta[index] = meta ?? -1;
+        this.head = (index + 1) % this.capacity;
+        if (this.length < this.capacity) this.length += 1;
+        return true;
+    }
+}
+
+const chartBuffers = {};
+
+// 按绘图区宽度抽取要绘制的点：点数不超过像素宽度时全部绘制，否则每两个像素为一个区间，
+// 保留区间内各可见序列的最小值与最大值，尖峰不会因抽取而丢失
+function decimate(buffer, width, columns) {
+    const length = buffer.length;
+    const indexes = [];
+    if (length <= width) {
+        for (let i = 0; i < length; i++) indexes.push(i);
+        return indexes;
+    }
+    const buckets = Math.max(1, Math.floor(width / 2));
+    const size = length / buckets;
+    for (let b = 0; b < buckets; b++) {
+        const start = Math.floor(b * size);
+        const end = b === buckets - 1 ? length : Math.floor((b + 1) * size);
+        const picked = new Set(columns.length ? [] : [start]);
+        columns.forEach((column) => {
+            let minIndex = start;
+            let maxIndex = start;
+            let minValue = column[buffer.slot(start)];
+            let maxValue = minValue;
+            for (let i = start + 1; i < end; i++) {
+                const value = column[buffer.slot(i)];
+                if (value < minValue) {
+                    minValue = value;
+                    minIndex = i;
+                } else if (value > maxValue) {
+                    maxValue = value;
+                    maxIndex = i;
+                }
+            }
+            picked.add(minIndex).add(maxIndex);
+        });
+        if (b === buckets - 1) picked.add(length - 1);
+        Array.from(picked).sort((x, y) => x - y).forEach(i => indexes.push(i));
+    }
+    return indexes;
+}
+
+function createLineChart(canvasId, datasets, extraOptions = {}) {
+    const ctx = document.getElementById(canvasId);
+    if (!ctx) return null;
+    return new Chart(ctx.getContext('2d'), {
+        type: 'line',
+        data: {
+            labels: [],
+            datasets
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            animation: false,
+            normalized: true,
+            interaction: {
+                mode: 'nearest',
+                intersect: false
+            },
+            plugins: {
+                legend: {
+                    display: true,
+                    labels: {
+                        color: '#9bb0c3'
+                    }
+                }
+            },
+            scales: {
+                x: {
+                    ticks: { color: '#9bb0c3' },
+                    grid: { display: false }
+                },
+                y: {
+                    ticks: { color: '#9bb0c3' },
+                    grid: { color: 'rgba(255,255,255,0.05)' }
+                }
+            },
+            ...extraOptions
+        }
+    });
+}
+
+// 只写入环形缓冲区并标记图表待重绘，实际绘制在下一帧统一进行
+function pushChartPoint(name, timestamp, values, meta = null) {
+    const chart = charts[name];
+    if (!chart) return;
+    if (!chartBuffers[name]) {
+        chartBuffers[name] = new ChartBuffer(HISTORY_LIMIT, chart.data.datasets.length,
+            chart.data.datasets.some(dataset => Array.isArray(dataset.coreIndex)));
+    }
+    if (chartBuffers[name].push(timestamp, values, meta)) {
+        dirtyCharts.add(name);
+        scheduleFrame();
+    }
+}
+
+// 从环形缓冲区生成图表数据：按绘图区宽度抽取，隐藏的序列（未选中的GPU）不复制数据
+function renderChart(name) {
+    const chart = charts[name];
+    const buffer = chartBuffers[name];
+    if (!chart || !buffer) return;
+    const area = chart.chartArea;
+    const width = Math.max(2, Math.floor(area ? area.right - area.left : chart.canvas.clientWidth));
+    const datasets = chart.data.datasets;
+    const visible = datasets.map((dataset, k) => chart.isDatasetVisible(k));
+    const slots = decimate(buffer, width, buffer.values.filter((column, k) => visible[k]))
+        .map(i => buffer.slot(i));
+    chart.data.labels = slots.map(slot => buffer.labels[slot]);
+    datasets.forEach((dataset, k) => {
+        const column = buffer.values[k];
+        dataset.data = visible[k] ? slots.map(slot => column[slot]) : [];
+        if (Array.isArray(dataset.coreIndex) && buffer.meta) {
+            dataset.coreIndex = slots.map(slot => buffer.meta[slot] >= 0 ? buffer.meta[slot] : null);
+        }
+    });
+    chart.update('none');
+}
+
+// 面板可见性：折叠、隐藏或不在视口内的面板不更新
+const panels = {};
+const onScreen = new Set();
+let panelObserver = null;
+
+function isPanelVisible(name) {
+    const element = panels[name];
+    if (!element || element.hidden) return false;
+    const card = element.closest('.card');
+    if (card && (card.hidden || card.classList.contains('collapsed'))) return false;
+    return !panelObserver || onScreen.has(name);
+}
+
+function observePanels() {
+    document.querySelectorAll('[data-panel]').forEach((element) => {
+        panels[element.dataset.panel] = element;
+    });
+    if (!window.IntersectionObserver) return;
+    panelObserver = new IntersectionObserver((entries) => {
+        entries.forEach((entry) => {
+            if (entry.isIntersecting) onScreen.add(entry.target.dataset.panel);
+            else onScreen.delete(entry.target.dataset.panel);
+        });
+        onPanelsChanged();
+    }, { rootMargin: '200px 0px' });
+    Object.values(panels).forEach(element => panelObserver.observe(element));
+}
+
+const COLLAPSED_KEY = 'monitor.collapsedPanels';
+
+// 点击卡片标题折叠/展开，折叠状态保存在localStorage中
+function initCollapse() {
+    let collapsed = [];
+    try {
+        collapsed = JSON.parse(localStorage.getItem(COLLAPSED_KEY) || '[]');
+    } catch (error) {
+        collapsed = [];
+    }
+    document.querySelectorAll('.card[data-panel]').forEach((card) => {
+        const title = card.querySelector('.card-title');
+        if (!title) return;
+        const setCollapsed = (value) => {
+            card.classList.toggle('collapsed', value);
+            title.setAttribute('aria-expanded', String(!value));
+        };
+        const toggle = () => {
+            setCollapsed(!card.classList.contains('collapsed'));
+            const names = Array.from(document.querySelectorAll('.card.collapsed[data-panel]'))
+                .map(element => element.dataset.panel);
+            try {
+                localStorage.setItem(COLLAPSED_KEY, JSON.stringify(names));
+            } catch (error) {
+                // 隐私模式下localStorage不可用，只影响折叠状态的保存
+            }
+            onPanelsChanged();
+        };
+        title.setAttribute('role', 'button');
+        title.tabIndex = 0;
+        setCollapsed(collapsed.includes(card.dataset.panel));
+        title.addEventListener('click', toggle);
+        title.addEventListener('keydown', (event) => {
+            if (event.key === 'Enter' || event.key === ' ') {
+                event.preventDefault();
+                toggle();
+            }
+        });
+    });
+}
+
+// 面板重新可见时补画错过的更新，并刷新过期的表格
+function onPanelsChanged() {
+    scheduleFrame();
+    staleTables.forEach((name) => {
+        if (!document.hidden && isPanelVisible(name)) {
+            staleTables.delete(name);
+            TABLE_REFRESHERS[name]();
+        }
+    });
+}
+
+// 每帧最多绘制一次：同一帧内到达的多个快照只绘制最终状态；
+// 不可见的图表与面板保留待更新标记，重新可见时再绘制
+const dirtyCharts = new Set();
+const renderedVersion = {};
+let latestData = null;
+let dataVersion = 0;
+let frameRequested = false;
+
+function scheduleFrame() {
+    if (frameRequested) return;
+    frameRequested = true;
+    requestAnimationFrame(renderFrame);
+}
+
+function renderFrame() {
+    frameRequested = false;
+    dirtyCharts.forEach((name) => {
+        if (!isPanelVisible(CHART_PANELS[name])) return;
+        dirtyCharts.delete(name);
+        renderChart(name);
+    });
+    if (!latestData) return;
+    Object.entries(PANEL_RENDERERS).forEach(([name, render]) => {
+        if (renderedVersion[name] === dataVersion) return;
+        if (name !== 'header' && !isPanelVisible(name)) return;
+        renderedVersion[name] = dataVersion;
+        try {
+            render(latestData);
+        } catch (error) {
+            console.error('更新硬件数据失败:', error);
+        }
+    });
+}
+
+function formatSpeed(bytesPerSecond) {
+    if (bytesPerSecond < 1024) {
+        return `${bytesPerSecond.toFixed(1)} B/s`;
+    }
+    if (bytesPerSecond < 1024 * 1024) {
+        return `${(bytesPerSecond / 1024).toFixed(1)} KB/s`;
+    }
+    return `${(bytesPerSecond / 1024 / 1024).toFixed(1)} MB/s`;
+}
+
+// 核心温度：sysfs读取的条目带core字段，其他来源按名称中的 "Core N" 识别
+function getCoreTempEntries(temps) {
+    return Object.entries(temps || {})
+        .map(([name, value]) => {
+            const reading = typeof value === 'object' && value !== null ? value : {value};
+            let index = typeof reading.core === 'number' ? reading.core : null;
+            if (index === null && !('core' in reading)) {
+                const match = name.match(/core\s*(\d+)/i);
+                index = match ? parseInt(match[1], 10) : null;
+            }
+            // 多路CPU各插槽的核心编号都从0开始，按 (插槽, 编号) 排序
+            const pkg = typeof reading.package === 'number' ? reading.package : 0;
+            return {pkg, index, value: reading.value};
+        })
+        .filter(entry => entry.index !== null && typeof entry.value === 'number');
+}
+
+function calcAvgCoreTemp(temps) {
+    const entries = getCoreTempEntries(temps);
+    if (entries.length === 0) {
+        return null;
+    }
+    return entries.reduce((sum, entry) => sum + entry.value, 0) / entries.length;
+}
+
+function getSortedCoreTemps(temps) {
+    return getCoreTempEntries(temps)
+        .sort((a, b) => a.pkg - b.pkg || a.index - b.index)
+        .map(entry => entry.value);
+}
+
+function getGpuPalette(index) {
+    const base = (index * 60) % 360;
+    return {
+        load: `hsl(${base}, 80%, 60%)`,
+        mem: `hsl(${(base + 25) % 360}, 80%, 60%)`,
+        temp: `hsl(${(base + 50) % 360}, 80%, 65%)`,
+        loadBg: `hsla(${base}, 80%, 60%, 0.12)`,
+        memBg: `hsla(${(base + 25) % 360}, 80%, 60%, 0.12)`,
+        tempBg: `hsla(${(base + 50) % 360}, 80%, 65%, 0.12)`
+    };
+}
+
+function getSelectedGpuIndex() {
+    const selected = document.querySelector('.gpu-toggle:checked');
+    return selected ? parseInt(selected.dataset.gpuIndex, 10) : 0;
+}
+
+function createDonutChart(canvasId, color) {
+    const ctx = document.getElementById(canvasId);
+    if (!ctx) return null;
+    return new Chart(ctx.getContext('2d'), {
+        type: 'doughnut',
+        data: {
+            labels: ['使用', '剩余'],
+            datasets: [{
+                data: [0, 100],
+                backgroundColor: [color, 'rgba(255,255,255,0.08)'],
+                borderWidth: 0
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            animation: false,
+            cutout: '70%',
+            plugins: {
+                legend: { display: false },
+                tooltip: {
+                    callbacks: {
+                        label: (context) => `${context.label}: ${context.parsed}%`
+                    }
+                }
+            }
+        }
+    });
+}
+
+function updateGpuDonuts(selectedIndex) {
+    const gpu = lastGpuData[selectedIndex];
+    const usage = gpu && typeof gpu.load === 'number' ? gpu.load : 0;
+    const mem = gpu && gpu.memory && typeof gpu.memory.percent === 'number' ? gpu.memory.percent : 0;
+
+    if (charts.gpuUsageDonut) {
+        charts.gpuUsageDonut.data.datasets[0].data = [usage, Math.max(0, 100 - usage)];
+        charts.gpuUsageDonut.update('none');
+    }
+    if (charts.gpuMemDonut) {
+        charts.gpuMemDonut.data.datasets[0].data = [mem, Math.max(0, 100 - mem)];
+        charts.gpuMemDonut.update('none');
+    }
+    const usageEl = document.getElementById('gpu-usage-value');
+    if (usageEl) usageEl.textContent = `${usage.toFixed(1)}%`;
+    const memEl = document.getElementById('gpu-mem-value');
+    if (memEl) memEl.textContent = `${mem.toFixed(1)}%`;
+}
+
+function initCharts() {
+    charts.cpu = createLineChart('cpu-chart', [
+        {
+            label: 'CPU使用率',
+            data: [],
+            borderColor: '#4cc9f0',
+            backgroundColor: 'rgba(76, 201, 240, 0.15)',
+            tension: 0.3,
+            fill: true
+        },
+        {
+            label: '平均温度',
+            data: [],
+            borderColor: '#8b5cf6',
+            backgroundColor: 'rgba(139, 92, 246, 0.12)',
+            tension: 0.3,
+            fill: false,
+            yAxisID: 'y1'
+        },
+        {
+            label: '最高核心使用率',
+            data: [],
+            borderColor: '#ef4444',
+            backgroundColor: 'rgba(239, 68, 68, 0.12)',
+            tension: 0.3,
+            fill: false,
+            coreIndex: []
+        }
+    ], {
+        plugins: {
+            legend: {
+                display: true,
+                position: 'top',
+                align: 'center',
+                labels: {
+                    color: '#9bb0c3',
+                    boxWidth: 10,
+                    boxHeight: 10,
+                    padding: 6,
+                    font: {
+                        size: 10
+                    }
+                }
+            },
+            tooltip: {
+                callbacks: {
+                    label: (context) => {
+                        const dataset = context.dataset || {};
+                        const value = typeof context.parsed.y === 'number' ? context.parsed.y.toFixed(1) : context.formattedValue;
+                        let label = `${dataset.label}: ${value}`;
+                        if (Array.isArray(dataset.coreIndex)) {
+                            const coreIndex = dataset.coreIndex[context.dataIndex];
+                            if (coreIndex !== null && coreIndex !== undefined) {
+                                label += ` (Core ${coreIndex})`;
+                            }
+                        }
+                        return label;
+                    }
+                }
+            }
+        },
+        scales: {
+            y: {
+                min: 0,
+                max: 100,
+                title: {
+                    display: true,
+                    text: '使用率(%)',
+                    color: '#4cc9f0',
+                    font: { size: 10, weight: '600' }
+                },
+                ticks: {
+                    color: '#9bb0c3',
+                    callback: (value) => `${value}%`
+                }
+            },
+            y1: {
+                position: 'right',
+                min: 0,
+                max: 100,
+                grid: { drawOnChartArea: false },
+                title: {
+                    display: true,
+                    text: '温度(°C)',
+                    color: '#ffb74d',
+                    font: { size: 10, weight: '600' }
+                },
+                ticks: {
+                    color: '#9bb0c3',
+                    callback: (value) => `${value}°C`
+                }
+            }
+        }
+    });
+
+    charts.memory = createLineChart('memory-chart', [
+        {
+            label: '内存使用率',
+            data: [],
+            borderColor: '#ffb74d',
+            backgroundColor: 'rgba(255, 183, 77, 0.12)',
+            tension: 0.3,
+            fill: false
+        }
+    ], {
+        scales: {
+            y: {
+                beginAtZero: true,
+                max: 100,
+                ticks: {
+                    color: '#9bb0c3',
+                    callback: (value) => `${value}%`
+                },
+                title: {
+                    display: true,
+                    text: '使用率(%)',
+                    color: '#ffb74d',
+                    font: { size: 10, weight: '600' }
+                }
+            }
+        }
+    });
+
+    charts.disk = null;
+
+    charts.network = createLineChart('network-chart', [
+        {
+            label: '下载',
+            data: [],
+            borderColor: '#4cc9f0',
+            backgroundColor: 'rgba(76, 201, 240, 0.12)',
+            tension: 0.3,
+            fill: false
+        },
+        {
+            label: '上传',
+            data: [],
+            borderColor: '#20c997',
+            backgroundColor: 'rgba(32, 201, 151, 0.12)',
+            tension: 0.3,
+            fill: false
+        }
+    ], {
+        scales: {
+            y: {
+                beginAtZero: true,
+                title: {
+                    display: true,
+                    text: '速率(KB/s)',
+                    color: '#4cc9f0',
+                    font: { size: 10, weight: '600' }
+                },
+                ticks: {
+                    color: '#9bb0c3',
+                    callback: (value) => `${value} KB/s`
+                }
+            }
+        }
+    });
+
+        const gpuCanvas = document.getElementById('gpu-chart');
+    if (gpuCanvas) {
+        const toggles = Array.from(document.querySelectorAll('.gpu-toggle'));
+        const datasets = [];
+        toggles.forEach((toggle) => {
+            const gpuIndex = parseInt(toggle.dataset.gpuIndex, 10);
+            const palette = getGpuPalette(gpuIndex);
+            datasets.push({
+                label: `GPU${gpuIndex} 负载`,
+                data: [],
+                borderColor: palette.load,
+                backgroundColor: palette.loadBg,
+                tension: 0.3,
+                fill: false,
+                gpuIndex,
+                metric: 'load',
+                yAxisID: 'y',
+                hidden: !toggle.checked
+            });
+            datasets.push({
+                label: `GPU${gpuIndex} 显存利用率`,
+                data: [],
+                borderColor: palette.mem,
+                backgroundColor: palette.memBg,
+                tension: 0.3,
+                fill: false,
+                gpuIndex,
+                metric: 'mem',
+                yAxisID: 'y',
+                hidden: !toggle.checked
+            });
+            datasets.push({
+                label: `GPU${gpuIndex} 温度`,
+                data: [],
+                borderColor: palette.temp,
+                backgroundColor: palette.tempBg,
+                tension: 0.3,
+                fill: false,
+                gpuIndex,
+                metric: 'temp',
+                yAxisID: 'y1',
+                hidden: !toggle.checked
+            });
+        });
+        charts.gpu = createLineChart('gpu-chart', datasets, {
+            scales: {
+                y: {
+                    min: 0,
+                    max: 100,
+                    title: {
+                        display: true,
+                        text: '使用率(%)',
+                        color: '#4cc9f0',
+                        font: { size: 10, weight: '600' }
+                    },
+                    ticks: {
+                        color: '#9bb0c3',
+                        callback: (value) => `${value}%`
+                    }
+                },
+                y1: {
+                    position: 'right',
+                    min: 0,
+                    max: 100,
+                    grid: { drawOnChartArea: false },
+                    ticks: {
+                        color: '#9bb0c3',
+                        callback: (value) => `${value}°C`
+                    },
+                    title: {
+                        display: true,
+                        text: '温度(°C)',
+                        color: '#ffb74d',
+                        font: { size: 10, weight: '600' }
+                    }
+                }
+            }
+        });
+
+        const updateGpuVisibility = (selectedIndex) => {
+            if (!charts.gpu) return;
+            charts.gpu.data.datasets.forEach((dataset) => {
+                dataset.hidden = dataset.gpuIndex !== selectedIndex;
+            });
+            dirtyCharts.add('gpu');
+            renderedVersion.gpu = null;
+            scheduleFrame();
+        };
+
+        const selectedToggle = toggles.find((toggle) => toggle.checked);
+        if (selectedToggle) {
+            updateGpuVisibility(parseInt(selectedToggle.dataset.gpuIndex, 10));
+        }
+
+        toggles.forEach((toggle) => {
+            toggle.addEventListener('change', () => {
+                if (!toggle.checked) return;
+                updateGpuVisibility(parseInt(toggle.dataset.gpuIndex, 10));
+            });
+        });
+    }
+
+    charts.memoryDonut = createDonutChart('memory-usage-donut', '#20c997');
+    charts.gpuUsageDonut = createDonutChart('gpu-usage-donut', '#4cc9f0');
+    charts.gpuMemDonut = createDonutChart('gpu-mem-donut', '#20c997');
+}
+
+const PROCESS_LIMIT = 15;
+// 进程列表不在快照中，单独按较低频率轮询
+const PROCESS_INTERVAL = Math.max(REFRESH_INTERVAL, 3000);
+
+function escapeHtml(value) {
+    return String(value === null || value === undefined ? '' : value)
+        .replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+}
+
+function formatBytes(bytes) {
+    if (bytes >= 1024 * 1024 * 1024) return `${(bytes / 1024 / 1024 / 1024).toFixed(1)} GB`;
+    if (bytes >= 1024 * 1024) return `${(bytes / 1024 / 1024).toFixed(0)} MB`;
+    return `${(bytes / 1024).toFixed(0)} KB`;
+}
+
+// 表格面板不可见时不请求，记为过期，重新可见时立即刷新
+const staleTables = new Set();
+
+function shouldRefreshTable(name) {
+    if (isPanelVisible(name)) return true;
+    staleTables.add(name);
+    return false;
+}
+
+async function refreshProcesses() {
+    if (!shouldRefreshTable('processes')) return;
+    const selected = document.querySelector('input[name="process-sort"]:checked');
+    const sort = selected ? selected.value : 'cpu';
+    try {
+        const response = await fetch(`/api/processes?sort=${sort}&limit=${PROCESS_LIMIT}`, { cache: 'no-store' });
+        if (!response.ok) return;
+        const data = await response.json();
+        document.getElementById('process-summary').textContent =
+            `共 ${data.count} 个进程` + (data.duration !== null && data.duration !== undefined ? ` · 采集耗时 ${(data.duration * 1000).toFixed(0)} ms` : '');
+        document.getElementById('process-rows').innerHTML = data.processes.map(p => `
+            <tr>
+                <td class="num">${p.pid}</td>
+                <td class="process-name" title="${escapeHtml(p.name)}">${escapeHtml(p.name)}</td>
+                <td>${escapeHtml(p.username)}</td>
+                <td class="num">${p.cpu_percent.toFixed(1)}</td>
+                <td class="num">${formatBytes(p.rss)}</td>
+                <td class="num">${p.io_rate === null ? '-' : formatSpeed(p.io_rate)}</td>
+            </tr>`).join('');
+    } catch (error) {
+        console.error('获取进程列表失败:', error);
+    }
+}
+
+async function refreshCgroups() {
+    const card = document.getElementById('cgroup-card');
+    // 面板在确认cgroup v2可用之前是隐藏的，此时仍需请求一次
+    if (!card.hidden && !shouldRefreshTable('cgroups')) return;
+    const selected = document.querySelector('input[name="cgroup-sort"]:checked');
+    const sort = selected ? selected.value : 'cpu';
+    try {
+        const response = await fetch(`/api/cgroups?sort=${sort}&limit=${PROCESS_LIMIT}`, { cache: 'no-store' });
+        if (!response.ok) return;
+        const data = await response.json();
+        // 没有cgroup v2（或非Linux）时不显示该面板
+        card.hidden = !data.available;
+        if (!data.available) return;
+        document.getElementById('cgroup-summary').textContent =
+            `共 ${data.count} 个cgroup` + (data.duration !== null && data.duration !== undefined ? ` · 采集耗时 ${(data.duration * 1000).toFixed(0)} ms` : '')
+            + (data.truncated ? ' · 超出时间预算，分批读取' : '');
+        const value = (v, format) => v === null || v === undefined ? '-' : format(v);
+        document.getElementById('cgroup-rows').innerHTML = data.cgroups.map(c => `
+            <tr>
+                <td class="process-name" title="${escapeHtml(c.path)}">${escapeHtml(c.path)}</td>
+                <td class="num">${value(c.cpu_percent, v => v.toFixed(1))}</td>
+                <td class="num">${value(c.memory, formatBytes)}</td>
+                <td class="num">${value(c.io_read_rate, formatSpeed)}</td>
+                <td class="num">${value(c.io_write_rate, formatSpeed)}</td>
+                <td class="num">${value(c.pids, v => v)}</td>
+            </tr>`).join('');
+    } catch (error) {
+        console.error('获取cgroup列表失败:', error);
+    }
+}
+
+const TABLE_REFRESHERS = { processes: refreshProcesses, cgroups: refreshCgroups };
+
+function lastPointTime() {
+    const times = Object.values(chartBuffers).map(buffer => buffer.lastTime()).filter(time => time !== null);
+    return times.length ? Math.max(...times) : null;
+}
+
+// 从服务端历史一次性补齐趋势曲线：页面加载时取最近 HISTORY_LIMIT 个点，
+// 标签页重新可见时只取隐藏期间缺少的部分
+async function loadHistory() {
+    try {
+        const step = REFRESH_INTERVAL / 1000;
+        const last = lastPointTime();
+        let since = Math.floor(Date.now() / 1000) - HISTORY_LIMIT * step;
+        if (last !== null) since = Math.max(since, Math.floor(last) + 1);
+        const series = ['cpu.total', 'cpu.temperature', 'cpu.max_core', 'memory.percent', 'net.rx', 'net.tx', 'gpu.*'];
+        const response = await fetch(`/api/history?series=${encodeURIComponent(series.join(','))}&since=${since}&step=${step}`);
+        const history = await response.json();
+        const columns = history.series || {};
+        const column = (name) => columns[name] || [];
+        const valueAt = (name, index, scale = 1) => {
+            const value = column(name)[index];
+            return typeof value === 'number' ? value / scale : 0;
+        };
+
+        (history.timestamps || []).forEach((timestamp, index) => {
+            pushChartPoint('cpu', timestamp, [
+                valueAt('cpu.total', index),
+                valueAt('cpu.temperature', index),
+                valueAt('cpu.max_core', index)
+            ]);
+            pushChartPoint('memory', timestamp, [valueAt('memory.percent', index)]);
+            pushChartPoint('network', timestamp, [valueAt('net.rx', index, 1024), valueAt('net.tx', index, 1024)]);
+            if (charts.gpu) {
+                const metricNames = { load: 'load', mem: 'memory', temp: 'temperature' };
+                const values = charts.gpu.data.datasets.map((dataset) =>
+                    valueAt(`gpu.${dataset.gpuIndex}.${metricNames[dataset.metric]}`, index));
+                pushChartPoint('gpu', timestamp, values);
+            }
+        });
+    } catch (error) {
+        console.error('获取历史数据失败:', error);
+    }
+}
+
+let pollTimer = null;
+let lastSnapshot = null;
+let lastSeq = null;
+
+// 把服务端增量 {set, unset} 应用到上一次的完整数据上
+function applyDelta(data, delta) {
+    (delta.unset || []).forEach((path) => {
+        let target = data;
+        path.slice(0, -1).forEach((key) => { target = target[key]; });
+        if (Array.isArray(target)) target.splice(path[path.length - 1], 1);
+        else delete target[path[path.length - 1]];
+    });
+    (delta.set || []).forEach(([path, value]) => {
+        if (!path.length) {
+            data = value;
+            return;
+        }
+        let target = data;
+        path.slice(0, -1).forEach((key) => { target = target[key]; });
+        target[path[path.length - 1]] = value;
+    });
+    return data;
+}
+
+function rememberSnapshot(data, seq) {
+    lastSnapshot = data;
+    // 序号形如 '<epoch>-<N>'，服务重启后旧序号不再有效，服务端返回完整数据
+    lastSeq = seq || null;
+}
+
+// 轮询时只请求相对上一个快照的增量，未变化时服务端返回304
+async function refreshData() {
+    try {
+        const url = lastSeq !== null ? `/api/hardware_info?since_seq=${encodeURIComponent(lastSeq)}` : '/api/hardware_info';
+        const response = await fetch(url);
+        if (response.status === 304) return;
+        const body = await response.json();
+        const data = response.headers.get('X-Delta-Base') && lastSnapshot
+            ? applyDelta(lastSnapshot, body)
+            : body;
+        rememberSnapshot(data, response.headers.get('X-Snapshot-Seq'));
+        applyData(data);
+    } catch (error) {
+        console.error('获取硬件数据失败:', error);
+    }
+}
+
+function startPolling() {
+    if (pollTimer || document.hidden) return;
+    refreshData();
+    pollTimer = setInterval(refreshData, POLL_INTERVAL);
+}
+
+function stopPolling() {
+    if (!pollTimer) return;
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// 告警中的规则实例，键为 规则名|序列名
+const activeAlerts = new Map();
+
+function renderAlerts() {
+    document.getElementById('alert-banners').innerHTML = Array.from(activeAlerts.values()).map(alert => `
+        <div class="alert-banner">
+            <i class="fas fa-triangle-exclamation"></i>
+            <span><strong>${escapeHtml(alert.rule)}</strong> · ${escapeHtml(alert.series)} = ${escapeHtml(alert.value)}（阈值 ${escapeHtml(alert.threshold)}）</span>
+            <span class="meta muted">${alert.since ? '自 ' + new Date(alert.since * 1000).toLocaleTimeString('zh-CN', { hour12: false }) : ''}</span>
+        </div>`).join('');
+}
+
+function applyAlert(alert) {
+    const key = `${alert.rule}|${alert.series}`;
+    if (alert.state === 'firing') {
+        activeAlerts.set(key, alert);
+    } else {
+        activeAlerts.delete(key);
+    }
+    renderAlerts();
+}
+
+// 页面加载及SSE重连时同步一次当前告警，之后按推送的状态变化增量更新
+async function loadAlerts() {
+    try {
+        const response = await fetch('/api/alerts', { cache: 'no-store' });
+        if (!response.ok) return;
+        const data = await response.json();
+        activeAlerts.clear();
+        data.active.forEach(alert => activeAlerts.set(`${alert.rule}|${alert.series}`, alert));
+        renderAlerts();
+    } catch (error) {
+        console.error('获取告警失败:', error);
+    }
+}
+
+let streamSource = null;
+let reconnectTimer = null;
+
+// 优先使用SSE推送，连接断开期间退回轮询，重连成功后停止轮询；标签页隐藏时不连接
+function connectStream() {
+    if (document.hidden || streamSource) return;
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource('/api/stream');
+    streamSource = source;
+    source.addEventListener('open', () => {
+        stopPolling();
+        loadAlerts();
+    });
+    source.addEventListener('alert', (event) => {
+        try {
+            applyAlert(JSON.parse(event.data));
+        } catch (error) {
+            console.error('解析告警失败:', error);
+        }
+    });
+    source.addEventListener('snapshot', (event) => {
+        try {
+            const data = JSON.parse(event.data);
+            rememberSnapshot(data, event.lastEventId);
+            applyData(data);
+        } catch (error) {
+            console.error('解析推送数据失败:', error);
+        }
+    });
+    source.addEventListener('error', () => {
+        if (streamSource !== source) return;
+        startPolling();
+        if (source.readyState === EventSource.CLOSED) {
+            streamSource = null;
+            reconnectTimer = setTimeout(() => {
+                reconnectTimer = null;
+                connectStream();
+            }, POLL_INTERVAL);
+        }
+    });
+}
+
+function disconnectStream() {
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+    if (streamSource) {
+        streamSource.close();
+        streamSource = null;
+    }
+    stopPolling();
+}
+
+// 快照中该节的采集时间（服务端时钟，与历史数据一致），没有时用本地时间
+function sampleTime(data, section) {
+    const collected = data.collected && data.collected[section];
+    return collected && typeof collected.timestamp === 'number' ? collected.timestamp : Date.now() / 1000;
+}
+
+// 收到快照时只把数值写入环形缓冲区并记下最新数据，页面上的数值与图表在下一帧统一更新。
+// updateCharts 为 false 时不向图表追加点（用于页面内嵌的初始数据）
+function applyData(data, updateCharts = true) {
+    try {
+        if (data.cpu && updateCharts) {
+            let maxUsage = null;
+            let maxIndex = null;
+            if (Array.isArray(data.cpu.usage_per_core)) {
+                data.cpu.usage_per_core.forEach((usage, index) => {
+                    if (typeof usage !== 'number') return;
+                    if (maxUsage === null || usage > maxUsage) {
+                        maxUsage = usage;
+                        maxIndex = index;
+                    }
+                });
+            }
+            const avgTemp = calcAvgCoreTemp(data.temperatures);
+            pushChartPoint('cpu', sampleTime(data, 'cpu'), [
+                data.cpu.total_usage ?? 0,
+                avgTemp !== null ? avgTemp : 0,
+                maxUsage !== null ? maxUsage : 0
+            ], maxIndex);
+        }
+
+        if (data.memory && updateCharts) {
+            pushChartPoint('memory', sampleTime(data, 'memory'), [data.memory.percent ?? 0]);
+        }
+
+        if (data.network) {
+            let rxSpeed = data.network.rx_speed;
+            let txSpeed = data.network.tx_speed;
+            if (typeof rxSpeed !== 'number' || typeof txSpeed !== 'number') {
+                const now = Date.now();
+                if (lastNet) {
+                    const timeDiff = (now - lastNetTime) / 1000;
+                    if (timeDiff > 0) {
+                        rxSpeed = (data.network.rx_bytes - lastNet.rx_bytes) / timeDiff;
+                        txSpeed = (data.network.tx_bytes - lastNet.tx_bytes) / timeDiff;
+                    }
+                }
+                lastNet = { rx_bytes: data.network.rx_bytes, tx_bytes: data.network.tx_bytes };
+                lastNetTime = now;
+            }
+            networkSpeed = { rx: rxSpeed, tx: txSpeed };
+            if (updateCharts) {
+                pushChartPoint('network', sampleTime(data, 'network'), [
+                    typeof rxSpeed === 'number' ? rxSpeed / 1024 : 0,
+                    typeof txSpeed === 'number' ? txSpeed / 1024 : 0
+                ]);
+            }
+        }
+
+        if (data.gpu && Array.isArray(data.gpu) && charts.gpu) {
+            lastGpuData = data.gpu;
+            if (updateCharts) {
+                const values = charts.gpu.data.datasets.map((dataset) => {
+                    const gpu = data.gpu[dataset.gpuIndex];
+                    if (!gpu) return 0;
+                    if (dataset.metric === 'load') {
+                        return typeof gpu.load === 'number' ? gpu.load : 0;
+                    }
+                    if (dataset.metric === 'mem') {
+                        return gpu.memory && typeof gpu.memory.percent === 'number' ? gpu.memory.percent : 0;
+                    }
+                    if (dataset.metric === 'temp') {
+                        return typeof gpu.temperature === 'number' ? gpu.temperature : 0;
+                    }
+                    return 0;
+                });
+                pushChartPoint('gpu', sampleTime(data, 'gpu'), values);
+            }
+        }
+    } catch (error) {
+        console.error('更新硬件数据失败:', error);
+    }
+    latestData = data;
+    dataVersion += 1;
+    scheduleFrame();
+}
+
+// 核心网格的元素只查找一次，数值未变化时不写DOM
+let coreItems = null;
+
+function getCoreItems() {
+    if (!coreItems) {
+        coreItems = [];
+        document.querySelectorAll('.core-item').forEach((item) => {
+            coreItems[parseInt(item.dataset.coreIndex, 10)] = {
+                item,
+                usage: item.querySelector('.core-usage'),
+                temp: item.querySelector('.core-temp'),
+                level: null
+            };
+        });
+    }
+    return coreItems;
+}
+
+function setText(element, text) {
+    if (element && element.textContent !== text) element.textContent = text;
+}
+
+function renderCores(data) {
+    if (!data.cpu) return;
+    const items = getCoreItems();
+    if (Array.isArray(data.cpu.usage_per_core)) {
+        data.cpu.usage_per_core.forEach((usage, index) => {
+            const core = items[index];
+            if (!core || typeof usage !== 'number') return;
+            setText(core.usage, `${usage.toFixed(1)}%`);
+            const level = usage >= 80 ? 'core-high' : usage >= 50 ? 'core-medium' : 'core-low';
+            if (level !== core.level) {
+                core.item.classList.remove('core-high', 'core-medium', 'core-low');
+                core.item.classList.add(level);
+                core.level = level;
+            }
+        });
+    }
+    getSortedCoreTemps(data.temperatures).forEach((temp, index) => {
+        const core = items[index];
+        if (core && typeof temp === 'number') setText(core.temp, `${temp.toFixed(1)}°C`);
+    });
+}
+
+function renderMemory(data) {
+    if (!data.memory) return;
+    const memPercent = data.memory.percent ?? 0;
+    const totalBytes = data.memory.total ?? 0;
+    if (totalBytes) {
+        setText(document.getElementById('memory-total'), `${(totalBytes / 1073741824).toFixed(1)} GB`);
+    }
+    if (charts.memoryDonut) {
+        charts.memoryDonut.data.datasets[0].data = [memPercent, Math.max(0, 100 - memPercent)];
+        charts.memoryDonut.update('none');
+    }
+    setText(document.getElementById('memory-usage-value'), `${memPercent.toFixed(1)}%`);
+}
+
+function renderStorage(data) {
+    if (!data.disk || !Array.isArray(data.disk)) return;
+    const minBytes = 50 * 1024 * 1024 * 1024;
+    const skipFs = new Set(['squashfs', 'tmpfs', 'devtmpfs', 'overlay', 'proc', 'sysfs', 'cgroup', 'pstore', 'autofs', 'debugfs', 'tracefs', 'securityfs', 'mqueue']);
+    let total = 0;
+    let used = 0;
+    data.disk.forEach(disk => {
+        const fsType = (disk.filesystem || disk.fstype || '').toLowerCase();
+        if (skipFs.has(fsType)) return;
+        if (disk.total !== undefined && disk.used !== undefined) {
+            const t = typeof disk.total === 'number' ? disk.total : parseFloat(disk.total);
+            const u = typeof disk.used === 'number' ? disk.used : parseFloat(disk.used);
+            if (!Number.isNaN(t) && !Number.isNaN(u) && t >= minBytes) {
+                total += t;
+                used += u;
+            }
+        }
+    });
+    const percent = total > 0 ? (used / total) * 100 : 0;
+    setText(document.getElementById('disk-percent'), `${percent.toFixed(1)}%`);
+    const disksByMount = new Map(data.disk.map(disk => [disk.mountpoint, disk]));
+    document.querySelectorAll('.disk-item').forEach(item => {
+        const disk = disksByMount.get(item.dataset.mountpoint);
+        if (!disk || typeof disk.used !== 'number' || typeof disk.total !== 'number') return;
+        setText(item.querySelector('.disk-space'),
+            `${(disk.used / 1073741824).toFixed(1)} / ${(disk.total / 1073741824).toFixed(1)} GB`);
+        item.querySelector('.progress-bar').style.width = `${disk.percent || 0}%`;
+    });
+}
+
+// 页头始终可见
+function renderHeader(data) {
+    if (data.system && data.system.uptime) {
+        setText(document.getElementById('uptime'), data.system.uptime);
+    }
+    if (typeof networkSpeed.rx === 'number') setText(document.getElementById('network-down'), formatSpeed(networkSpeed.rx));
+    if (typeof networkSpeed.tx === 'number') setText(document.getElementById('network-up'), formatSpeed(networkSpeed.tx));
+}
+
+// 各面板中图表以外的部分，键为 data-panel
+const PANEL_RENDERERS = {
+    header: renderHeader,
+    cores: renderCores,
+    memory: renderMemory,
+    gpu: () => updateGpuDonuts(getSelectedGpuIndex()),
+    storage: renderStorage
+};
+
+const timers = {};
+
+function startTimers() {
+    updateTime();
+    timers.clock = setInterval(updateTime, 1000);
+    timers.processes = setInterval(refreshProcesses, PROCESS_INTERVAL);
+    timers.cgroups = setInterval(refreshCgroups, PROCESS_INTERVAL);
+}
+
+function stopTimers() {
+    Object.keys(timers).forEach((name) => {
+        clearInterval(timers[name]);
+        delete timers[name];
+    });
+}
+
+// 标签页隐藏时断开推送并停止所有轮询与定时器；重新可见时用一次历史请求补齐隐藏期间的曲线，
+// 再重新连接推送（连接后服务端立即推送最新快照）
+function handleVisibilityChange() {
+    if (document.hidden) {
+        stopTimers();
+        disconnectStream();
+        return;
+    }
+    if (timers.clock) return;
+    startTimers();
+    loadHistory().then(connectStream);
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    initCharts();
+    initCollapse();
+    observePanels();
+    // 页面内嵌了最近一次的快照，先显示，再加载历史并连接推送
+    try {
+        const initial = JSON.parse(document.getElementById('initial-data').textContent || 'null');
+        if (initial) applyData(initial, false);
+    } catch (error) {
+        console.error('解析初始数据失败:', error);
+    }
+    document.addEventListener('visibilitychange', handleVisibilityChange);
+    document.querySelectorAll('input[name="process-sort"]').forEach(input => {
+        input.addEventListener('change', refreshProcesses);
+    });
+    document.querySelectorAll('input[name="cgroup-sort"]').forEach(input => {
+        input.addEventListener('change', refreshCgroups);
+    });
+    if (document.hidden) return;
+    startTimers();
+    loadHistory().then(connectStream);
+    refreshProcesses();
+    refreshCgroups();
+});
@@ -0,0 +1,326 @@
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from time import monotonic
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 段文件头: 魔数、格式版本、记录长度
+HEADER = struct.Struct('<4sII4x')
+MAGIC = b'HWTS'
+FORMAT_VERSION = 1
+# 记录: 时间戳(uint32秒)、序列ID(uint32)、数值(float32)、前12字节的CRC32
+RECORD = struct.Struct('<IIfI')
+PAYLOAD = struct.Struct('<IIf')
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.tsd'
+SERIES_FILE = 'series.idx'
+
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_AGE = 7 * 86400
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 60
+
+
+def _encode(timestamp: int, series_id: int, value: float) -> Tuple[int, int, float, int]:
+    payload = PAYLOAD.pack(timestamp, series_id, value)
+    return timestamp, series_id, value, zlib.crc32(payload)
+
+
+class Segment:
+    """一个预分配的段文件，通过mmap读写定长记录"""
+
+    def __init__(self, path: str, first_ts: int, writable: bool = False, size: Optional[int] = None):
+        self.path = path
+        self.first_ts = first_ts
+        self.writable = writable
+        if size is not None:
+            # 新建段：预分配空间，写入文件头
+            with open(path, 'wb') as f:
+                f.truncate(size)
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+        self._file = open(path, 'r+b' if writable else 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, record_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"无法识别的段文件: {path}")
+        self.capacity = (len(self._mmap) - HEADER.size) // RECORD.size
+        self.count = self._recover()
+        self.last_ts = self._timestamp(self.count - 1) if self.count else first_ts
+
+    @property
+    def size(self) -> int:
+        return len(self._mmap)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + index * RECORD.size
+
+    def _timestamp(self, index: int) -> int:
+        return struct.unpack_from('<I', self._mmap, self._offset(index))[0]
+
+    def _valid(self, index: int) -> bool:
+        offset = self._offset(index)
+        crc = struct.unpack_from('<I', self._mmap, offset + PAYLOAD.size)[0]
+        return zlib.crc32(self._mmap[offset:offset + PAYLOAD.size]) == crc
+
+    def _recover(self) -> int:
+        """找出有效记录数
+
+        预分配区域全为0，已写入的记录是一段连续前缀；二分查找第一个全零记录，
+        再向前丢弃校验失败的残缺记录（进程崩溃时最后一条可能只写了一半）。
+        """
+        empty = bytes(RECORD.size)
+        lo, hi = 0, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self._offset(mid)
+            if self._mmap[offset:offset + RECORD.size] == empty:
+                hi = mid
+            else:
+                lo = mid + 1
+        count = lo
+        while count and not self._valid(count - 1):
+            count -= 1
+        if self.writable and count < lo:
+            # 清除残缺记录，后续写入从干净的位置开始
+            self._mmap[self._offset(count):self._offset(lo)] = bytes((lo - count) * RECORD.size)
+        return count
+
+    def append(self, timestamp: int, series_id: int, value: float):
+        RECORD.pack_into(self._mmap, self._offset(self.count), *_encode(timestamp, series_id, value))
+        self.count += 1
+        self.last_ts = timestamp
+
+    def search(self, timestamp: float) -> int:
+        """二分查找第一条时间戳 >= timestamp 的记录"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def scan(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Tuple[int, int, float]]:
+        """按时间顺序返回 (时间戳, 序列ID, 数值)，直接在mmap上解析，不复制数据"""
+        first = self.search(since) if since is not None else 0
+        count = self.count
+        view = memoryview(self._mmap)[self._offset(first):self._offset(count)]
+        try:
+            for timestamp, series_id, value, _ in RECORD.iter_unpack(view):
+                if until is not None and timestamp > until:
+                    break
+                yield timestamp, series_id, value
+        finally:
+            view.release()
+
+    def flush(self):
+        if self.writable:
+            self._mmap.flush()
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except (BufferError, ValueError):
+            pass
+        self._file.close()
+
+
+class SegmentStore:
+    """只追加的时序存储
+
+    每个样本写入预分配段文件中的一条定长记录（O(1)，不做fsync，由操作系统回写，
+    另按 flush_interval 定期msync）。段写满后轮转，按时间和总大小淘汰旧段。
+    段的起止时间在内存中建立索引，范围查询只扫描相关的段。
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES, max_age: float = DEFAULT_MAX_AGE,
+                 max_bytes: int = DEFAULT_MAX_BYTES, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.segment_bytes = max(HEADER.size + RECORD.size, segment_bytes)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._segments: List[Segment] = []
+        self._series_ids: Dict[str, int] = {}
+        self._series_names: Dict[int, str] = {}
+        self._lock = threading.RLock()
+        self._last_flush = monotonic()
+        os.makedirs(directory, exist_ok=True)
+        self._series_file = None
+        self._next_sequence = 0
+        self._load_series()
+        self._load_segments()
+
+    # ---- 序列名称 ----
+
+    def _load_series(self):
+        path = os.path.join(self.directory, SERIES_FILE)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        # 只接受以换行结尾的完整行，崩溃时写了一半的行丢弃
+        complete = data[:data.rfind(b'\n') + 1]
+        for line in complete.decode('utf-8', errors='replace').splitlines():
+            series_id, _, name = line.partition('\t')
+            if series_id.isdigit() and name:
+                self._series_ids[name] = int(series_id)
+                self._series_names[int(series_id)] = name
+        if len(complete) != len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(len(complete))
+        self._series_file = open(path, 'ab')
+
+    def _series_id(self, name: str) -> int:
+        series_id = self._series_ids.get(name)
+        if series_id is None:
+            series_id = len(self._series_ids)
+            self._series_file.write(f"{series_id}\t{name}\n".encode('utf-8'))
+            self._series_file.flush()
+            self._series_ids[name] = series_id
+            self._series_names[series_id] = name
+        return series_id
+
+    # ---- 段管理 ----
+
+    def _load_segments(self):
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX)):
+                continue
+            stem = filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            try:
+                first_ts, sequence = (int(part) for part in stem.split('-'))
+            except ValueError:
+                continue
+            self._next_sequence = max(self._next_sequence, sequence + 1)
+            try:
+                self._segments.append(Segment(os.path.join(self.directory, filename), first_ts))
+            except (OSError, ValueError) as e:
+                logging.warning(f"跳过损坏的段文件 {filename}: {str(e)}")
+        self._segments.sort(key=lambda segment: (segment.first_ts, segment.path))
+        if self._segments and not self._segments[-1].full:
+            # 重新以可写方式打开最后一个段，继续追加
+            last = self._segments.pop()
+            last.close()
+            self._segments.append(Segment(last.path, last.first_ts, writable=True))
+
+    def _rotate(self, timestamp: int):
+        if self._segments:
+            self._segments[-1].flush()
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{timestamp:010d}-{self._next_sequence:06d}{SEGMENT_SUFFIX}")
+        self._next_sequence += 1
+        self._segments.append(Segment(path, timestamp, writable=True, size=self.segment_bytes))
+        self._expire(timestamp)
+
+    def _expire(self, now: float):
+        total = sum(segment.size for segment in self._segments)
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            if oldest.last_ts >= now - self.max_age and total <= self.max_bytes:
+                break
+            self._segments.pop(0)
+            total -= oldest.size
+            oldest.close()
+            try:
+                os.remove(oldest.path)
+            except OSError as e:
+                logging.warning(f"删除过期段文件失败: {str(e)}")
+
+    @property
+    def active(self) -> Optional[Segment]:
+        if self._segments and self._segments[-1].writable:
+            return self._segments[-1]
+        return None
+
+    # ---- 写入与查询 ----
+
+    def append(self, timestamp: float, points: Iterable[Tuple[str, float]]):
+        """写入一次采集的所有序列"""
+        timestamp = int(timestamp)
+        with self._lock:
+            for name, value in points:
+                segment = self.active
+                if segment is None or segment.full:
+                    self._rotate(timestamp)
+                    segment = self.active
+                segment.append(timestamp, self._series_id(name), value)
+            if monotonic() - self._last_flush >= self.flush_interval:
+                self._last_flush = monotonic()
+                segment = self.active
+                if segment is not None:
+                    segment.flush()
+
+    def scan(self, since: Optional[float] = None, until: Optional[float] = None,
+             names: Optional[Iterable[str]] = None) -> Iterator[Tuple[int, str, float]]:
+        """按时间顺序返回 (时间戳, 序列名, 数值)"""
+        with self._lock:
+            # 段按起始时间排序，跳过结束早于since或开始晚于until的段
+            segments = list(self._segments)
+            series_names = dict(self._series_names)
+        if since is not None:
+            starts = [segment.last_ts for segment in segments]
+            segments = segments[bisect.bisect_left(starts, since):]
+        wanted = None
+        if names is not None:
+            wanted = {self._series_ids[name] for name in names if name in self._series_ids}
+        for segment in segments:
+            if until is not None and segment.first_ts > until:
+                break
+            try:
+                for timestamp, series_id, value in segment.scan(since, until):
+                    if wanted is None or series_id in wanted:
+                        yield timestamp, series_names.get(series_id, str(series_id)), value
+            except ValueError:
+                # 扫描期间该段已过期被关闭
+                continue
+
+    def replay(self, callback: Callable[[int, List[Tuple[str, float]]], None], since: Optional[float] = None):
+        """按采集时刻分组回放历史，用于重启后恢复内存中的趋势"""
+        current = None
+        points: List[Tuple[str, float]] = []
+        for timestamp, name, value in self.scan(since):
+            if timestamp != current and points:
+                callback(current, points)
+                points = []
+            current = timestamp
+            points.append((name, value))
+        if points:
+            callback(current, points)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'bytes': sum(segment.size for segment in self._segments),
+                'records': sum(segment.count for segment in self._segments),
+                'series': len(self._series_ids),
+                'first_ts': self._segments[0].first_ts if self._segments else None,
+                'last_ts': self._segments[-1].last_ts if self._segments else None,
+            }
+
+    def flush(self):
+        with self._lock:
+            segment = self.active
+            if segment is not None:
+                segment.flush()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments:
+                segment.flush()
+                segment.close()
+            self._segments = []
+            if self._series_file is not None:
+                self._series_file.close()
+                self._series_file = None
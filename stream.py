@@ -0,0 +1,129 @@
+import threading
+import json
+from collections import deque
+from time import monotonic
+from typing import Iterator, List, Optional
+
+from sampler import Sampler, Snapshot, parse_seq
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_HEARTBEAT = 15
+HEARTBEAT = b': ping\n\n'
+
+
+def format_event(data: bytes, event: Optional[str] = None, event_id: Optional[str] = None) -> bytes:
+    """按Server-Sent Events格式编码一条消息，data为单行JSON"""
+    parts = []
+    if event_id is not None:
+        parts.append(f'id: {event_id}\n'.encode())
+    if event:
+        parts.append(f'event: {event}\n'.encode())
+    parts.append(b'data: ' + data + b'\n\n')
+    return b''.join(parts)
+
+
+class Subscriber:
+    """单个SSE客户端的有界队列，慢客户端只丢弃最旧的消息，不拖慢其他客户端"""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.queue = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def put(self, message: bytes):
+        with self._cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(message)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> List[bytes]:
+        """取出全部排队消息，超时返回空列表"""
+        with self._cond:
+            if not self.queue and not self.closed:
+                self._cond.wait(timeout)
+            messages = list(self.queue)
+            self.queue.clear()
+            return messages
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class Broadcaster:
+    """把采样器发布的快照推送给所有SSE订阅者
+
+    每个快照只编码一次，然后放入各订阅者的队列；采集次数与订阅者数量无关。
+    """
+
+    def __init__(self, sampler: Sampler, queue_size: int = DEFAULT_QUEUE_SIZE, heartbeat: float = DEFAULT_HEARTBEAT):
+        self.sampler = sampler
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        sampler.subscribe(self.publish_snapshot)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    @staticmethod
+    def snapshot_event(snapshot: Snapshot) -> bytes:
+        return format_event(snapshot.json, 'snapshot', snapshot.seq)
+
+    def publish_snapshot(self, snapshot: Snapshot):
+        self.publish(self.snapshot_event(snapshot))
+
+    def publish_event(self, event: str, payload) -> None:
+        """推送任意JSON事件（不带id，不参与断线续传）"""
+        self.publish(format_event(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'), event))
+
+    def publish(self, message: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """注册订阅者，并根据Last-Event-ID补发错过的快照；其他启动的事件id视为首次连接"""
+        last_event_id = parse_seq(last_event_id, self.sampler.epoch)
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        missed = self.sampler.recent(last_event_id) if last_event_id is not None else []
+        if missed and missed[0].version == last_event_id + 1:
+            for snapshot in missed[-self.queue_size:]:
+                subscriber.put(self.snapshot_event(snapshot))
+        else:
+            # 首次连接、间隔太久或服务已重启，只发送最新快照
+            snapshot = self.sampler.latest()
+            if snapshot is not None and (last_event_id is None or snapshot.version != last_event_id):
+                subscriber.put(self.snapshot_event(snapshot))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.close()
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def stream(self, subscriber: Subscriber, retry_ms: int = 3000) -> Iterator[bytes]:
+        """SSE响应体生成器，空闲时定期发送心跳注释，客户端断开时自动退订"""
+        try:
+            yield f'retry: {retry_ms}\n\n'.encode()
+            last_sent = monotonic()
+            while not subscriber.closed:
+                messages = subscriber.get(self.heartbeat)
+                if messages:
+                    yield b''.join(messages)
+                    last_sent = monotonic()
+                elif monotonic() - last_sent >= self.heartbeat:
+                    yield HEARTBEAT
+                    last_sent = monotonic()
+        finally:
+            self.unsubscribe(subscriber)
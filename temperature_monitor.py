@@ -1,36 +1,58 @@
 import platform
 import psutil
 from datetime import datetime
+import instrumentation
+from backends import Backend, Unavailable
+from hwmon import HwmonReader, core_index, package_index, DEFAULT_ROOT as SYSFS_ROOT
+
+# sysfs下没有温度传感器时（如驱动仍在加载），过多少秒再检查一次
+SYSFS_RETRY_AFTER = 60
 
 class TemperatureMonitor:
-    def __init__(self):
+    def __init__(self, sysfs_root=SYSFS_ROOT):
         self.system = platform.system()
+        self.sysfs_root = sysfs_root
         self.temp_info = {}
-        
-        # Windows系统初始化
-        if self.system == "Windows":
-            try:
-                import wmi
-                self.wmi = wmi.WMI(namespace="root\\OpenHardwareMonitor")
-            except:
-                self.wmi = None
-        
-        # Linux系统初始化
-        elif self.system == "Linux":
-            try:
-                import sensors
-                sensors.init()
-                self.sensors = sensors
-            except:
-                self.sensors = None
+        self._hwmon = None
+        # 各数据源在第一次读取时才加载：Linux优先直接读取sysfs（传感器只扫描一次，每次采集只pread各输入文件），
+        # sysfs与psutil都读不到时才加载pysensors；Windows使用OpenHardwareMonitor的WMI接口
+        self.hwmon_backend = Backend('sysfs', self._load_hwmon, retry_after=SYSFS_RETRY_AFTER)
+        self.sensors_backend = Backend('pysensors', self._load_sensors)
+        self.wmi_backend = Backend('wmi', self._load_wmi)
+
+    def _load_hwmon(self):
+        if self.system != "Linux":
+            raise Unavailable('仅支持Linux')
+        # 重试时沿用同一个读取器：目录未变化时不重新扫描
+        if self._hwmon is None:
+            self._hwmon = HwmonReader(self.sysfs_root)
+        reader = self._hwmon
+        if not reader.available():
+            raise Unavailable(f'{self.sysfs_root} 下没有温度传感器')
+        return reader
+
+    @staticmethod
+    def _load_sensors():
+        import sensors
+        sensors.init()
+        return sensors
+
+    @staticmethod
+    def _load_wmi():
+        import wmi
+        return wmi.WMI(namespace="root\\OpenHardwareMonitor")
+
+    def backends(self):
+        return [self.hwmon_backend, self.sensors_backend, self.wmi_backend]
     
     def get_windows_temps(self):
         temps = {}
-        if not self.wmi:
+        wmi = self.wmi_backend.get()
+        if not wmi:
             return temps
             
         try:
-            for sensor in self.wmi.Sensor():
+            for sensor in wmi.Sensor():
                 if sensor.SensorType == 'Temperature':
                     name = sensor.Name
                     value = sensor.Value
@@ -41,18 +63,19 @@ class TemperatureMonitor:
                             'min': getattr(sensor, 'Min', None)
                         }
         except:
-            pass
+            instrumentation.record_exception('temperature.wmi')
         return temps
     
     def get_linux_temps(self):
         temps = {}
-        if not self.sensors:
+        sensors = self.sensors_backend.get()
+        if not sensors:
             return temps
             
         try:
-            for chip in self.sensors.iter_detected_chips():
+            for chip in sensors.iter_detected_chips():
                 for feature in chip:
-                    if feature.type == self.sensors.FEATURE_TEMP:
+                    if feature.type == sensors.FEATURE_TEMP:
                         name = f"{chip.prefix}_{feature.label}"
                         temps[name] = {
                             'value': round(feature.get_value(), 1),
@@ -60,7 +83,7 @@ class TemperatureMonitor:
                             'min': getattr(feature, 'min', None)
                         }
         except:
-            pass
+            instrumentation.record_exception('temperature.sensors')
         return temps
     
     def get_psutil_temps(self):
@@ -68,19 +91,36 @@ class TemperatureMonitor:
         try:
             temps_dict = psutil.sensors_temperatures()
             for name, entries in temps_dict.items():
+                # 多路CPU的coretemp条目依次为 Package id 0、各核心、Package id 1、各核心……
+                package = 0
                 for entry in entries:
                     label = entry.label or name
-                    temps[label] = {
+                    if package_index(label) is not None:
+                        package = package_index(label)
+                    key = label
+                    # 不同芯片（或不同CPU插槽）可能有相同标签，重名时加上芯片名与插槽号，避免互相覆盖
+                    if key in temps:
+                        key = f"{name} {label}"
+                    if key in temps:
+                        key = f"{name} package{package} {label}"
+                    temps[key] = {
                         'value': round(entry.current, 1),
                         'max': entry.high,
                         'min': None
                     }
+                    core = core_index(label)
+                    if core is not None:
+                        temps[key].update(core=core, package=package)
         except:
-            pass
+            instrumentation.record_exception('temperature.psutil')
         return temps
     
     def get_temperatures(self):
         """获取所有可用的温度信息"""
+        hwmon = self.hwmon_backend.get() if self.system == "Linux" else None
+        if hwmon is not None:
+            return hwmon.read()
+
         all_temps = {}
         
         # 获取psutil的温度信息
@@ -89,12 +129,16 @@ class TemperatureMonitor:
         # 根据操作系统获取额外的温度信息
         if self.system == "Windows":
             all_temps.update(self.get_windows_temps())
-        elif self.system == "Linux":
+        elif self.system == "Linux" and not all_temps:
+            # psutil读不到时才用pysensors，避免同一批传感器列举两次
             all_temps.update(self.get_linux_temps())
         
         return all_temps
     
     def __del__(self):
-        # 清理资源
-        if self.system == "Linux" and self.sensors:
-            self.sensors.cleanup() 
\ No newline at end of file
+        # 清理已加载的数据源，未加载的不触发加载
+        sensors = self.sensors_backend.peek()
+        if sensors:
+            sensors.cleanup()
+        if self._hwmon is not None:
+            self._hwmon.close()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# 仓库为平铺的模块结构，测试直接导入各模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakehost import FakeHost  # noqa: E402
+
+
+@pytest.fixture
+def fake_host():
+    """安装模拟主机（假nvidia-smi、sysfs、cgroup目录与psutil），测试结束后恢复"""
+    hosts = []
+
+    def install(**spec) -> FakeHost:
+        host = FakeHost(**spec).install()
+        hosts.append(host)
+        return host
+
+    yield install
+    for host in reversed(hosts):
+        host.uninstall()
@@ -0,0 +1,110 @@
+import os
+import shutil
+
+import pytest
+
+from backends import loaded
+from cgroup_collector import CgroupCollector, select_cgroups
+from hardware_info import HardwareInfo
+from scheduler import Scheduler
+
+
+def write(path, content: str):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def make_cgroup(root, path: str = '', usage: int = 0, memory: int = 1024, pids: int = 1):
+    directory = os.path.join(root, path)
+    os.makedirs(directory, exist_ok=True)
+    write(os.path.join(directory, 'cpu.stat'), f'usage_usec {usage}\nuser_usec {usage}\nthrottled_usec 0\n')
+    write(os.path.join(directory, 'memory.current'), f'{memory}\n')
+    write(os.path.join(directory, 'memory.stat'), 'anon 100\nfile 200\nshmem 0\n')
+    write(os.path.join(directory, 'io.stat'), '8:0 rbytes=4096 wbytes=0 rios=1 wios=0\n')
+    write(os.path.join(directory, 'pids.current'), f'{pids}\n')
+    return directory
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / 'cgroup')
+    make_cgroup(root)
+    write(os.path.join(root, 'cgroup.controllers'), 'cpu io memory pids\n')
+    for path in ('system.slice', 'system.slice/sshd.service', 'user.slice', 'user.slice/user-1000.slice'):
+        make_cgroup(root, path)
+    return root
+
+
+def paths(latest):
+    return sorted(entry['path'] for entry in latest['cgroups'])
+
+
+def test_reads_whole_tree_within_budget(tree):
+    latest = CgroupCollector(tree, budget=5).sample()
+    assert latest['available'] and not latest['truncated']
+    assert latest['count'] == 5 and latest['read'] == 5
+    assert paths(latest) == ['/', '/system.slice', '/system.slice/sshd.service', '/user.slice',
+                             '/user.slice/user-1000.slice']
+
+
+def test_budget_round_robin(tree):
+    # 预算为0时每次只读一个cgroup，依次轮流，几轮之后全部有结果
+    collector = CgroupCollector(tree, budget=0)
+    seen = []
+    for round_ in range(1, 6):
+        latest = collector.sample()
+        assert latest['read'] == 1 and latest['truncated']
+        assert len(latest['cgroups']) == round_
+        seen.append((set(paths(latest)) - set(seen)).pop())
+    assert sorted(seen) == paths(latest)
+    # 第二轮回到第一个cgroup，此时已有上次的计数器，可以算出CPU速率
+    write(os.path.join(tree, 'cpu.stat'), 'usage_usec 1000000\nthrottled_usec 0\n')
+    latest = collector.sample()
+    root = next(entry for entry in latest['cgroups'] if entry['path'] == '/')
+    assert root['cpu_percent'] > 0
+
+
+def test_removed_cgroup_dropped(tree):
+    collector = CgroupCollector(tree, budget=5, rescan_interval=3600)
+    assert collector.sample()['count'] == 5
+    shutil.rmtree(os.path.join(tree, 'user.slice'))
+    latest = collector.sample()
+    assert latest['count'] == 3
+    assert paths(latest) == ['/', '/system.slice', '/system.slice/sshd.service']
+    make_cgroup(tree, 'system.slice/nginx.service', usage=10, memory=4096)
+    latest = collector.sample()
+    assert '/system.slice/nginx.service' in paths(latest)
+    assert select_cgroups(latest, sort='memory', limit=1)['cgroups'][0]['path'] == '/system.slice/nginx.service'
+
+
+def test_hybrid_unified_mount(tmp_path):
+    root = str(tmp_path / 'cgroup')
+    make_cgroup(root, 'unified')
+    write(os.path.join(root, 'unified', 'cgroup.controllers'), 'cpu memory\n')
+    collector = CgroupCollector(root)
+    assert collector.root == os.path.join(root, 'unified')
+    assert collector.sample()['available']
+
+
+def registered(info: HardwareInfo):
+    scheduler = Scheduler()
+    try:
+        info.register_collectors(scheduler, 1)
+        return {collector.name: collector for collector in scheduler.collectors}
+    finally:
+        scheduler.shutdown()
+
+
+def test_registered_only_with_cgroup2(fake_host):
+    host = fake_host()
+    assert 'cgroups' not in registered(HardwareInfo.from_env())
+
+    root = os.environ['MONITOR_CGROUP_ROOT']
+    make_cgroup(root, 'system.slice')
+    write(os.path.join(root, 'cgroup.controllers'), 'cpu memory\n')
+    info = HardwareInfo.from_env()
+    collectors = registered(info)
+    # 注册时不创建采集器，第一次采集时才创建
+    assert not loaded(info, 'cgroup_collector')
+    assert collectors['cgroups'].func()['count'] == 2
+    assert info.cgroup_collector.root.startswith(host.directory)
@@ -0,0 +1,87 @@
+import os
+from time import monotonic, sleep
+
+import pytest
+
+from gpu_collector import GpuCollector, parse_line, QUERY_FIELDS
+
+
+def wait_for(predicate, timeout: float = 10) -> bool:
+    deadline = monotonic() + timeout
+    while monotonic() < deadline:
+        if predicate():
+            return True
+        sleep(0.02)
+    return predicate()
+
+
+def set_gpus(host, count: int):
+    """修改假nvidia-smi的GPU数量，下一轮输出生效，0 表示报错退出"""
+    with open(os.path.join(host.directory, 'bin', 'gpus'), 'w') as f:
+        f.write(str(count))
+
+
+@pytest.fixture
+def collector():
+    collector = GpuCollector(interval_ms=50)
+    yield collector
+    collector.stop(timeout=5)
+
+
+def test_parse_line_keeps_count():
+    line = ', '.join(['0', '2'] + ['1'] * (len(QUERY_FIELDS) - 2))
+    assert parse_line(line)['count'] == 2
+    line = ', '.join(['0', '[N/A]'] + ['1'] * (len(QUERY_FIELDS) - 2))
+    assert parse_line(line)['count'] is None
+
+
+def test_single_gpu_ready_after_first_cycle(fake_host, collector):
+    fake_host(gpus=1)
+    started = monotonic()
+    collector.start()
+    assert collector.wait_settled(5) == 'running'
+    # 只有一块GPU时首行即为完整的一轮，不需要等到下一轮的第一行
+    assert collector.wait_ready(5)
+    assert monotonic() - started < 2
+    assert [reading['index'] for reading in collector.readings()] == [0]
+
+
+def test_settles_failed_without_nvidia_smi(fake_host, collector):
+    fake_host(gpus=0)
+    collector.start()
+    assert collector.wait_settled(5) == 'failed'
+    assert collector.wait_ready(0)
+    assert collector.failed_starts == 1
+    assert collector.readings() == []
+
+
+def test_settles_failed_when_no_devices(fake_host, collector):
+    host = fake_host(gpus=1)
+    set_gpus(host, 0)
+    collector.start()
+    assert collector.wait_settled(5) == 'failed'
+    assert collector.failed_starts >= 1
+    assert collector.readings() == []
+
+
+def test_prunes_vanished_gpu(fake_host, collector):
+    host = fake_host(gpus=2)
+    collector.start()
+    assert collector.wait_ready(5)
+    assert [reading['index'] for reading in collector.readings()] == [0, 1]
+    set_gpus(host, 1)
+    assert wait_for(lambda: [reading['index'] for reading in collector.readings()] == [0])
+
+
+def test_restarts_after_nvidia_smi_exits(fake_host, collector):
+    host = fake_host(gpus=1)
+    collector.start()
+    assert collector.wait_settled(5) == 'running'
+    set_gpus(host, 0)
+    assert wait_for(lambda: collector.state == 'failed')
+    assert collector.restarts >= 1
+    failed_at = collector.readings()[0]['timestamp']
+    set_gpus(host, 1)
+    assert wait_for(lambda: collector.state == 'running')
+    assert collector.failed_starts == 0
+    assert wait_for(lambda: collector.readings()[0]['timestamp'] > failed_at)
@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+import sys
+from time import time
+
+import pytest
+
+from agent import Pusher
+from fakehost import FakeHost
+from hub import Hub, PushError, decode_push
+
+
+def payload(host: str, cpu: float, samples: int = 3, **extra):
+    now = time()
+    return {
+        'host': host,
+        'series': ['cpu.total', 'cpu.core.0', 'memory.percent', 'gpu.0.load'],
+        'samples': [[now - samples + i, cpu + i, 1.0, 50.0, None] for i in range(samples)],
+        **extra,
+    }
+
+
+def test_ingest_keeps_agents_apart():
+    hub = Hub()
+    for index, name in enumerate(['node-2', 'node-1', 'node-3']):
+        assert hub.ingest(payload(name, cpu=10.0 * index), address=f'10.0.0.{index}') == \
+            {'ok': True, 'need_inventory': True}
+    hosts = hub.hosts()
+    assert [host['host'] for host in hosts] == ['node-1', 'node-2', 'node-3']
+    assert {host['host']: host['cpu'] for host in hosts} == {'node-2': 2.0, 'node-1': 12.0, 'node-3': 22.0}
+    assert all(host['gpu_count'] == 0 and not host['stale'] for host in hosts)
+    history = hub.host('node-1').history.query(['cpu.total'])
+    assert history['series']['cpu.total'] == [10.0, 11.0, 12.0]
+    assert hub.host('node-1').address == '10.0.0.1'
+    assert hub.host('node-1').samples == 3
+
+
+def test_ingest_stores_only_configured_series():
+    hub = Hub()
+    hub.ingest(payload('node-1', cpu=5.0))
+    # 每核CPU不在默认序列中；值为None的GPU负载不写入
+    assert hub.host('node-1').history.series_names() == ['cpu.total', 'memory.percent']
+
+
+def test_inventory_requested_until_sent():
+    hub = Hub()
+    assert hub.ingest(payload('node-1', cpu=1.0))['need_inventory']
+    assert not hub.ingest(payload('node-1', cpu=1.0, inventory={'cpu': {'name': 'Test CPU'}}))['need_inventory']
+    assert hub.hosts()[0]['cpu_name'] == 'Test CPU'
+
+
+def test_max_hosts():
+    hub = Hub(max_hosts=1)
+    hub.ingest(payload('node-1', cpu=1.0))
+    with pytest.raises(PushError):
+        hub.ingest(payload('node-2', cpu=1.0))
+
+
+@pytest.mark.parametrize('bad', [
+    {'host': 7},
+    {'host': 'node-1', 'series': 'cpu.total'},
+    {'host': 'node-1', 'series': ['cpu.total', 3]},
+    {'host': 'node-1', 'series': ['cpu.total'], 'samples': {'0': [1.0, 2.0]}},
+    {'host': 'node-1', 'series': ['cpu.total'], 'samples': [1.0]},
+    {'host': 'node-1', 'series': ['cpu.total'], 'samples': [['yesterday', 2.0]]},
+    {'host': 'node-1', 'series': ['cpu.total'], 'samples': [[1.0, '2.0']]},
+    {'host': 'node-1', 'series': ['cpu.total'], 'samples': [[1.0, True]]},
+    {'host': 'node-1', 'latest': [1, 2]},
+    {'host': 'node-1', 'inventory': 'none'},
+])
+def test_wrong_types_rejected_before_writing(bad):
+    hub = Hub()
+    with pytest.raises(PushError):
+        hub.ingest(bad)
+    assert hub.hosts() == []
+
+
+def test_decode_push():
+    body = json.dumps(payload('node-1', cpu=1.0)).encode()
+    assert decode_push(gzip.compress(body), 'gzip')['host'] == 'node-1'
+    for bad, encoding in [(b'not json', ''), (b'plain', 'gzip'), (b'[1, 2]', ''), (b'{"host": ""}', '')]:
+        with pytest.raises(PushError):
+            decode_push(bad, encoding)
+
+
+@pytest.fixture(scope='module')
+def monitor():
+    """以中心节点模式导入 app（模拟主机上），只在本模块中导入一次"""
+    host = FakeHost().install()
+    saved = os.environ.get('MONITOR_HUB')
+    os.environ['MONITOR_HUB'] = '1'
+    try:
+        import app as monitor
+        yield monitor
+        monitor.sampler.stop(timeout=5)
+    finally:
+        if saved is None:
+            os.environ.pop('MONITOR_HUB', None)
+        else:
+            os.environ['MONITOR_HUB'] = saved
+        host.uninstall()
+        sys.modules.pop('app', None)
+
+
+def push(client, body, encoding='gzip'):
+    data = json.dumps(body).encode()
+    if encoding == 'gzip':
+        data = gzip.compress(data)
+    return client.post('/api/hub/push', data=data, headers={'Content-Encoding': encoding,
+                                                            'Content-Type': 'application/json'})
+
+
+def test_push_route(monitor):
+    client = monitor.app.test_client()
+    now = time()
+    for name in ('agent-a', 'agent-b'):
+        pusher = Pusher('http://hub:5000', name, monitor.hardware_info)
+        body = pusher.build([(now - 1, {'cpu.total': 20.0}), (now, {'cpu.total': 30.0, 'net.rx': 100.0})], None)
+        response = push(client, body)
+        assert response.status_code == 200
+        assert response.get_json() == {'ok': True, 'need_inventory': False}
+    hosts = {host['host']: host for host in client.get('/api/hub/hosts').get_json()['hosts']}
+    assert {'agent-a', 'agent-b'} <= set(hosts)
+    assert hosts['agent-a']['cpu'] == 30.0
+
+
+@pytest.mark.parametrize('body, encoding', [
+    ({'host': 'agent-c', 'series': ['cpu.total'], 'samples': [[1.0, 'high']]}, 'gzip'),
+    ({'host': 'agent-c', 'series': ['cpu.total'], 'samples': [['now', 1.0]]}, ''),
+    ({'series': ['cpu.total'], 'samples': []}, 'gzip'),
+])
+def test_push_route_rejects_malformed(monitor, body, encoding):
+    response = push(monitor.app.test_client(), body, encoding)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert monitor.hub.host('agent-c') is None
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from hardware_info import HardwareInfo
+from hwmon import HwmonReader, core_temperatures
+
+
+def write(path, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def add_chip(root, hwmon: str, name: str, device: str, inputs):
+    """在 root 下生成一个 hwmon 芯片，inputs 为 [(标签, 毫摄氏度或None)]，None 表示读取为空"""
+    path = os.path.join(root, 'class', 'hwmon', hwmon)
+    write(os.path.join(path, 'name'), name + '\n')
+    device_path = os.path.join(root, 'devices', 'platform', device)
+    os.makedirs(device_path, exist_ok=True)
+    os.symlink(device_path, os.path.join(path, 'device'))
+    for index, (label, value) in enumerate(inputs, start=1):
+        write(os.path.join(path, f'temp{index}_input'), '' if value is None else f'{value}\n')
+        if label:
+            write(os.path.join(path, f'temp{index}_label'), label + '\n')
+    return path
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    root = str(tmp_path)
+    os.makedirs(os.path.join(root, 'class', 'thermal'))
+    return root
+
+
+def test_cores_keyed_by_package(sysfs):
+    # 两路CPU，hwmon编号与插槽顺序相反，核心编号在各插槽内都从0开始
+    add_chip(sysfs, 'hwmon3', 'coretemp', 'coretemp.0',
+             [('Package id 0', 50000), ('Core 0', 41000), ('Core 1', 42000)])
+    add_chip(sysfs, 'hwmon2', 'coretemp', 'coretemp.1',
+             [('Package id 1', 60000), ('Core 0', 51000), ('Core 1', 52000)])
+    temps = HwmonReader(sysfs).read()
+    assert temps['coretemp:coretemp.0/temp2']['value'] == 41.0
+    assert temps['coretemp:coretemp.1/temp2']['package'] == 1
+    assert [(key, value) for key, _, value in core_temperatures(temps)] == [
+        ((0, 0), 41.0), ((0, 1), 42.0), ((1, 0), 51.0), ((1, 1), 52.0)]
+
+
+def test_package_from_device_name_without_label(sysfs):
+    add_chip(sysfs, 'hwmon0', 'coretemp', 'coretemp.1', [('Core 0', 45000)])
+    temps = HwmonReader(sysfs).read()
+    assert temps['coretemp:coretemp.1/temp1']['package'] == 1
+
+
+def test_failing_sensor_skipped_without_rescan(sysfs):
+    add_chip(sysfs, 'hwmon0', 'coretemp', 'coretemp.0', [('Package id 0', 50000), ('Core 0', 41000)])
+    nvme = add_chip(sysfs, 'hwmon1', 'nvme', 'nvme0', [('Composite', None)])
+    # rescan_interval=0：每次读取都检查目录，失败的传感器每次都重试
+    reader = HwmonReader(sysfs, rescan_interval=0)
+    for _ in range(3):
+        temps = reader.read()
+        assert 'nvme:nvme0/temp1' not in temps
+        assert temps['coretemp:coretemp.0/temp2']['value'] == 41.0
+    assert reader.scans == 1
+
+    write(os.path.join(nvme, 'temp1_input'), '38000\n')
+    assert reader.read()['nvme:nvme0/temp1']['value'] == 38.0
+    assert reader.scans == 1
+
+
+def test_failing_sensor_waits_for_retry(sysfs):
+    nvme = add_chip(sysfs, 'hwmon0', 'nvme', 'nvme0', [('Composite', None)])
+    reader = HwmonReader(sysfs, rescan_interval=60)
+    assert reader.read() == {}
+    write(os.path.join(nvme, 'temp1_input'), '38000\n')
+    # 未到重试时间前不再读取
+    assert reader.read() == {}
+    reader.sensors[0].retry_at = 0
+    assert reader.read()['nvme:nvme0/temp1']['value'] == 38.0
+
+
+def test_hotplug_triggers_rescan(sysfs):
+    add_chip(sysfs, 'hwmon0', 'coretemp', 'coretemp.0', [('Core 0', 41000)])
+    reader = HwmonReader(sysfs, rescan_interval=0)
+    assert list(reader.read()) == ['coretemp:coretemp.0/temp1']
+    add_chip(sysfs, 'hwmon1', 'nvme', 'nvme0', [('Composite', 38000)])
+    assert sorted(reader.read()) == ['coretemp:coretemp.0/temp1', 'nvme:nvme0/temp1']
+    assert reader.scans == 2
+
+
+def test_fake_host_temperatures(fake_host):
+    host = fake_host(cores=4, sensors=6)
+    info = HardwareInfo.from_env()
+    temps = info.temp_monitor.get_temperatures()
+    # 一个coretemp芯片（Package + 4个核心）与一个nvme芯片
+    assert len(temps) == 6
+    assert [key for key, _, _ in core_temperatures(temps)] == [(0, 0), (0, 1), (0, 2), (0, 3)]
+    write(os.path.join(host.directory, 'sys', 'class', 'hwmon', 'hwmon0', 'temp3_input'), '')
+    temps = info.temp_monitor.get_temperatures()
+    assert len(temps) == 5
+    assert info.temp_monitor.hwmon_backend.get().scans == 1
@@ -0,0 +1,62 @@
+from time import monotonic, sleep
+
+import pytest
+
+from scheduler import Scheduler, parse_intervals
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(max_workers=2)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_next_due_counts_from_submit_time(scheduler):
+    collector = scheduler.register('slow_start', lambda: sleep(0.05), interval=1)
+    now = monotonic()
+    deadlines = scheduler.submit_due(now)
+    collector.future.result(timeout=5)
+    assert collector in deadlines
+    # 工作线程开始执行晚于提交，下一次到期时间仍以提交时间为基准
+    assert collector.next_due == pytest.approx(now + 1)
+    assert collector.due(now + 1)
+
+
+def test_overrun_schedules_from_finish(scheduler):
+    collector = scheduler.register('overrun', lambda: sleep(0.2), interval=0.1)
+    scheduler.submit_due()
+    collector.future.result(timeout=5)
+    assert collector.next_due == collector.finished_at
+
+
+def test_collects_every_tick_at_sampler_interval(scheduler):
+    """周期与采样周期相同的数据源每个节拍都应采集一次，而不是隔轮采集"""
+    interval, ticks = 0.2, 10
+    calls = []
+    scheduler.register('cpu', lambda: calls.append(monotonic()), interval=interval)
+    next_tick = monotonic()
+    for _ in range(ticks):
+        # 与 Sampler._run 相同的节拍：collect 最多等待半个周期，然后睡到下一个节拍
+        scheduler.collect(max_wait=interval / 2)
+        next_tick += interval
+        sleep(max(0.0, next_tick - monotonic()))
+    assert len(calls) >= ticks - 1
+
+
+def test_failure_backs_off(scheduler):
+    def fail():
+        raise RuntimeError('boom')
+
+    collector = scheduler.register('broken', fail, interval=1)
+    now = monotonic()
+    scheduler.submit_due(now)
+    collector.future.result(timeout=5)
+    assert collector.failures == 1
+    assert collector.error == 'boom'
+    assert not collector.due(now + 1.5)
+    assert collector.stale(monotonic())
+
+
+def test_parse_intervals():
+    assert parse_intervals('disk=30, temperatures=5,bad=x,,') == {'disk': 30.0, 'temperatures': 5.0}